@@ -0,0 +1,145 @@
+"""
+Compare the time taken to link the biosphere exchanges of large inventories, as each importer
+did before the registry of biosphere flows (reading `dict_biosphere.txt`, then linking the
+exchanges), and with :meth:`BaseInventoryImport.add_biosphere_links`, which uses the registry
+read once per process (see :mod:`premise.biosphere`).
+
+The inventories are either an Excel inventory (given with `--inventory`), or synthetic
+inventories, with biosphere exchanges to random flows.
+
+Usage:
+
+    python benchmarks/bench_biosphere.py --inventory my-inventories.xlsx
+    python benchmarks/bench_biosphere.py --sizes 1000 10000 100000 --exchanges 20
+
+`premise` must be importable (e.g., installed with `pip install -e .`).
+"""
+
+import argparse
+import contextlib
+import copy
+import csv
+import gc
+import os
+import random
+import time
+from pathlib import Path
+
+from prettytable import PrettyTable
+
+from premise.biosphere import BiosphereRegistry, get_biosphere_registry
+from premise.inventory_imports import (
+    FILEPATH_BIOSPHERE_FLOWS,
+    AdditionalInventory,
+    BaseInventoryImport,
+)
+
+
+class Inventory:
+    """Inventory already loaded, as `import_db`."""
+
+    def __init__(self, data):
+        self.data = data
+
+
+def generate_inventory(n_datasets, n_exchanges, seed=0):
+    """Return datasets with biosphere exchanges to random flows, with categories as in Excel files."""
+    rnd = random.Random(seed)
+    keys = get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS).keys
+    datasets = []
+    for i in range(n_datasets):
+        exchanges = []
+        for name, category, subcategory, unit in rnd.choices(keys, k=n_exchanges):
+            categories = category if subcategory == "unspecified" else category + "::" + subcategory
+            exchanges.append(
+                {"name": name, "categories": categories, "unit": unit, "amount": 1.0, "type": "biosphere"}
+            )
+        datasets.append({"name": "dataset {}".format(i), "exchanges": exchanges})
+    return datasets
+
+
+def link_with_file(datasets):
+    """Read the file of biosphere flows, and link the biosphere exchanges, as each importer did."""
+    biosphere_dict = {}
+    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
+        for row in csv.reader(f, delimiter=";"):
+            biosphere_dict[(row[0], row[1], row[2], row[3])] = row[4]
+
+    for x in datasets:
+        for y in x["exchanges"]:
+            if y["type"] == "biosphere":
+                if isinstance(y["categories"], str):
+                    y["categories"] = tuple(y["categories"].split("::"))
+                subcategory = y["categories"][1] if len(y["categories"]) > 1 else "unspecified"
+                y["input"] = (
+                    "biosphere3",
+                    biosphere_dict[(y["name"], y["categories"][0], subcategory, y["unit"])],
+                )
+
+
+def bench(label, datasets):
+    n_exchanges = sum(
+        1 for ds in datasets for exc in ds["exchanges"] if exc["type"] == "biosphere"
+    )
+
+    # Collections of the garbage collector are triggered before each measure, not during it
+    reference = copy.deepcopy(datasets)
+    gc.collect()
+    start = time.perf_counter()
+    link_with_file(reference)
+    file_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    BiosphereRegistry(FILEPATH_BIOSPHERE_FLOWS)
+    read_duration = time.perf_counter() - start
+
+    importer = BaseInventoryImport([], "3.7.1", Path("."), import_db=Inventory(copy.deepcopy(datasets)))
+    gc.collect()
+    start = time.perf_counter()
+    importer.add_biosphere_links()
+    registry_duration = time.perf_counter() - start
+
+    return {
+        "inventory": label,
+        "datasets": len(datasets),
+        "biosphere exchanges": n_exchanges,
+        "file and links (s)": round(file_duration, 3),
+        "reading the flows (s)": round(read_duration, 4),
+        "registry and links (s)": round(registry_duration, 3),
+        "same links": importer.import_db.data == reference,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--inventory", type=Path, default=None,
+                        help="Excel file of inventories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="number of datasets of the synthetic inventories")
+    parser.add_argument("--exchanges", type=int, default=20,
+                        help="number of biosphere exchanges per dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # The registry is read before the measures, as by the first importer of a run
+    get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS)
+
+    records = []
+    if args.inventory:
+        with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
+            datasets = AdditionalInventory([], "3.7.1", args.inventory).import_db.data
+        records.append(bench(args.inventory.name, datasets))
+    else:
+        for size in args.sizes:
+            records.append(
+                bench("synthetic", generate_inventory(size, args.exchanges, args.seed))
+            )
+
+    t = PrettyTable(list(records[0]))
+    for r in records:
+        t.add_row(list(r.values()))
+    print(t)
+
+
+if __name__ == "__main__":
+    main()
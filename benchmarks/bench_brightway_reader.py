@@ -0,0 +1,85 @@
+"""
+Compare the time taken to extract a brightway2 database by `wurst.extract_brightway2_databases`,
+through the ORM of brightway, and by :func:`premise.brightway_reader.extract_brightway_database`,
+with bulk SQLite queries, and check that both give the same datasets.
+
+The database is either a database of an existing brightway project (given with `--project`
+and `--database`), or a synthetic database shaped like ecoinvent
+(see :mod:`premise.synthetic_database`), written in a temporary project.
+
+Usage:
+
+    python benchmarks/bench_brightway_reader.py --project default --database ecoinvent
+    python benchmarks/bench_brightway_reader.py --sizes 1000 20000 --workers 2 4
+
+`premise` must be importable (e.g., installed with `pip install -e .`).
+"""
+
+import argparse
+import time
+
+import bw2data
+from prettytable import PrettyTable
+from wurst.brightway.extract_database import extract_brightway2_databases
+
+from premise.brightway_reader import extract_brightway_database
+from premise.synthetic_database import generate_database, write_brightway_database
+
+BENCHMARK_PROJECT = "premise-benchmark"
+
+
+def bench(label, database, workers):
+    start = time.perf_counter()
+    reference = extract_brightway2_databases(database)
+    reference_duration = time.perf_counter() - start
+
+    records = []
+    for n in [1] + workers:
+        start = time.perf_counter()
+        data = extract_brightway_database(database, max_workers=n)
+        duration = time.perf_counter() - start
+        records.append(
+            {
+                "database": label,
+                "datasets": len(data),
+                "workers": n,
+                "wurst (s)": round(reference_duration, 2),
+                "bulk (s)": round(duration, 2),
+                "speed-up": round(reference_duration / duration, 2),
+                "same datasets": data == reference,
+            }
+        )
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--project", default=None, help="existing brightway project")
+    parser.add_argument("--database", default="ecoinvent", help="database of the project")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000])
+    parser.add_argument("--workers", type=int, nargs="*", default=[4])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    records = []
+    if args.project:
+        bw2data.projects.set_current(args.project)
+        records += bench(args.database, args.database, args.workers)
+    else:
+        for size in args.sizes:
+            bw2data.projects.set_current(BENCHMARK_PROJECT)
+            write_brightway_database(generate_database(size, seed=args.seed))
+            try:
+                records += bench("synthetic", "ecoinvent", args.workers)
+            finally:
+                bw2data.projects.set_current("default")
+                bw2data.projects.delete_project(BENCHMARK_PROJECT, delete_dir=True)
+
+    t = PrettyTable(list(records[0]))
+    for r in records:
+        t.add_row(list(r.values()))
+    print(t)
+
+
+if __name__ == "__main__":
+    main()
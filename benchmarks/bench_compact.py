@@ -0,0 +1,93 @@
+"""
+Compare the memory taken by a database stored as a list of dictionaries, and by the same
+database with compact exchanges (see :mod:`premise.compact`).
+
+The database is either a database cached by premise (e.g., a full ecoinvent database,
+given with `--cache-file`), or synthetic databases shaped like ecoinvent
+(see :mod:`premise.synthetic_database`). The memory is measured twice: as the size of
+all the objects the database references, and as the memory allocated, with `tracemalloc`.
+The allocated memory includes the growth of the table of interned strings of the interpreter,
+a few megabytes that weigh on the reduction measured for small databases only.
+
+Usage:
+
+    python benchmarks/bench_compact.py --cache-file ~/.cache/premise/<key>.pickle
+    python benchmarks/bench_compact.py --sizes 1000 20000 100000
+
+`premise` must be importable (e.g., installed with `pip install -e .`).
+"""
+
+import argparse
+import gc
+import pickle
+import time
+import tracemalloc
+from pathlib import Path
+
+from prettytable import PrettyTable
+
+from premise.compact import compact_database, get_size
+from premise.synthetic_database import DATABASE_SIZES, generate_database
+
+
+def bench(label, data):
+    """
+    Load the pickled database `data`, as a list of dictionaries, then compact it.
+
+    :param data: a pickled database
+    :type data: bytes
+    :return: the record of the benchmark
+    :rtype: dict
+    """
+    size = get_size(pickle.loads(data))
+
+    gc.collect()
+    tracemalloc.start()
+    db = pickle.loads(data)
+    allocated = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    compact_database(db)
+    duration = time.perf_counter() - start
+    gc.collect()
+    compact_allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    compact_size = get_size(db)
+
+    return {
+        "database": label,
+        "datasets": len(db),
+        "exchanges": sum(len(ds["exchanges"]) for ds in db),
+        "size (MB)": round(size / 1e6, 1),
+        "compact size (MB)": round(compact_size / 1e6, 1),
+        "allocated (MB)": round(allocated / 1e6, 1),
+        "compact allocated (MB)": round(compact_allocated / 1e6, 1),
+        "reduction (%)": round(100 * (1 - compact_allocated / allocated), 1),
+        "compaction time (s)": round(duration, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cache-file", type=Path, default=None,
+                        help="database pickled in the cache of premise")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DATABASE_SIZES.values()))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    records = []
+    if args.cache_file:
+        records.append(bench(args.cache_file.name, args.cache_file.read_bytes()))
+    else:
+        for size in args.sizes:
+            # Pickled and loaded, so that strings are not shared more than in a cached database
+            data = pickle.dumps(generate_database(size, seed=args.seed))
+            records.append(bench("synthetic", data))
+
+    t = PrettyTable(list(records[0]))
+    for r in records:
+        t.add_row(list(r.values()))
+    print(t)
+
+
+if __name__ == "__main__":
+    main()
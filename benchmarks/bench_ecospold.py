@@ -0,0 +1,95 @@
+"""
+Compare the time taken to extract an ecospold2 database by `bw2io.SingleOutputEcospold2Importer`,
+on a single core and with `use_mp=True` (which parses the files in a pool of one process per
+processor, then applies the strategies on a single core), and by
+:class:`premise.ecospold.ParallelEcospold2Importer`, which also applies the strategies that
+modify each dataset in the pool of processes, and check that they give the same datasets.
+The speed-ups are given against `use_mp=True`, the default of `bw2io`.
+
+The database is either an ecoinvent database (the `datasets` directory of an ecospold2
+release, given with `--dirpath`), or synthetic ecospold2 files
+(see :func:`premise.synthetic_database.write_ecospold_files`).
+
+Usage:
+
+    python benchmarks/bench_ecospold.py --dirpath ~/ecoinvent_3.7.1_cutoff_ecoSpold02/datasets
+    python benchmarks/bench_ecospold.py --datasets 5000 --workers 2 4 8
+
+`premise` must be importable (e.g., installed with `pip install -e .`).
+"""
+
+import argparse
+import multiprocessing
+from pathlib import Path
+import tempfile
+import time
+
+import bw2io
+from prettytable import PrettyTable
+
+from premise.ecospold import ParallelEcospold2Importer
+from premise.synthetic_database import write_ecospold_files
+
+
+def extract(dirpath, max_workers=None, use_mp=True):
+    """
+    Extract the ecospold2 files of `dirpath` and apply the strategies of the importer.
+
+    :param max_workers: number of processes of the importer of `premise`. With None, the importer
+        of `bw2io` is used, with `use_mp`.
+    :type max_workers: int
+    :return: the datasets, and the time taken, in seconds
+    :rtype: tuple
+    """
+    start = time.perf_counter()
+    if max_workers is None:
+        ei = bw2io.SingleOutputEcospold2Importer(str(dirpath), "bench", use_mp=use_mp)
+    else:
+        ei = ParallelEcospold2Importer(str(dirpath), "bench", max_workers=max_workers)
+    ei.apply_strategies()
+    return ei.data, time.perf_counter() - start
+
+
+def bench(dirpath, workers):
+    reference, reference_duration = extract(dirpath, use_mp=True)
+    runs = [("bw2io (use_mp=False)", 1, extract(dirpath, use_mp=False))]
+    runs.append(("bw2io (use_mp=True)", multiprocessing.cpu_count(), (reference, reference_duration)))
+    runs.extend(("premise (parallel)", n, extract(dirpath, n)) for n in workers)
+    return [
+        {
+            "importer": importer,
+            "workers": n,
+            "datasets": len(data),
+            "time (s)": round(duration, 2),
+            "speed-up": round(reference_duration / duration, 2),
+            "same datasets": data == reference,
+        }
+        for importer, n, (data, duration) in runs
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dirpath", type=Path, default=None,
+                        help="directory of the ecospold2 files")
+    parser.add_argument("--datasets", type=int, default=2000,
+                        help="number of synthetic datasets, without --dirpath")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.dirpath:
+        records = bench(args.dirpath, args.workers)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            write_ecospold_files(Path(directory), args.datasets, seed=args.seed)
+            records = bench(Path(directory), args.workers)
+
+    t = PrettyTable(list(records[0]))
+    for r in records:
+        t.add_row(list(r.values()))
+    print(t)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Compare the memory used by worker processes that transform a scenario database when:
+
+* `fork`: the workers are forked after the base database is built, and inherit it
+  through copy-on-write memory pages (`NewDatabase.update_all(fork=True)`),
+* `pickle`: the workers receive a pickled copy of the database
+  (`NewDatabase.update_all(max_workers=...)`),
+* `deepcopy`: the workers inherit the database, but transform a deep copy of it,
+  as `NewDatabase` did before scenario databases shared their datasets.
+
+Each worker modifies the exchanges of a fraction of the datasets, as a transformation would.
+
+Usage:
+
+    python benchmarks/bench_fork_workers.py --datasets 20000 --workers 4
+
+`premise` must be importable (e.g., installed with `pip install -e .`).
+"""
+
+import argparse
+import copy
+import gc
+import multiprocessing
+import random
+import time
+
+from prettytable import PrettyTable
+
+from premise.copy_on_write import copy_on_write_database
+from premise.utils import get_memory_usage
+
+_STATE = {}
+
+
+def build_database(n_datasets, n_exchanges=15, seed=0):
+    """
+    Return a database of `n_datasets` datasets, each with `n_exchanges` technosphere exchanges.
+    The same `seed` gives the same database.
+    """
+    rnd = random.Random(seed)
+    names = ["market for product {}".format(i) for i in range(n_datasets // 10 + 1)]
+    locations = ["RER", "GLO", "CH", "DE", "FR", "US", "CN", "RoW"]
+    db = []
+    for i in range(n_datasets):
+        name = rnd.choice(names)
+        location = rnd.choice(locations)
+        ds = {
+            "name": name,
+            "reference product": name.replace("market for ", ""),
+            "location": location,
+            "unit": "kilogram",
+            "database": "ecoinvent",
+            "code": "%032x" % rnd.getrandbits(128),
+            "comment": "synthetic dataset {}".format(i),
+            "exchanges": [
+                {
+                    "name": name,
+                    "product": name.replace("market for ", ""),
+                    "location": location,
+                    "unit": "kilogram",
+                    "amount": 1.0,
+                    "type": "production",
+                }
+            ],
+        }
+        for _ in range(n_exchanges):
+            supplier = rnd.choice(names)
+            ds["exchanges"].append(
+                {
+                    "name": supplier,
+                    "product": supplier.replace("market for ", ""),
+                    "location": rnd.choice(locations),
+                    "unit": "kilogram",
+                    "amount": rnd.random(),
+                    "type": "technosphere",
+                    "uncertainty type": 0,
+                }
+            )
+        db.append(ds)
+    return db
+
+
+def transform(db, share):
+    """Scale the exchanges of a share of the datasets, and add a few datasets."""
+    step = max(int(1 / share), 1) if share else 0
+    if step:
+        for ds in db[::step]:
+            for exc in ds["exchanges"]:
+                if exc["type"] == "technosphere":
+                    exc["amount"] *= 0.9
+    db.extend(copy.deepcopy(dict(ds)) for ds in db[: len(db) // 100])
+    return len(db)
+
+
+def run_forked(index):
+    before = get_memory_usage()
+    db = copy_on_write_database(_STATE["db"])
+    transform(db, _STATE["share"])
+    after = get_memory_usage()
+    return before, after
+
+
+def run_deepcopy(index):
+    before = get_memory_usage()
+    db = copy.deepcopy(_STATE["db"])
+    transform(db, _STATE["share"])
+    after = get_memory_usage()
+    return before, after
+
+
+def run_pickled(db, share):
+    before = get_memory_usage()
+    transform(db, share)
+    after = get_memory_usage()
+    return before, after
+
+
+def benchmark(mode, db, workers, share):
+    context = multiprocessing.get_context("fork")
+    if mode != "pickle":
+        _STATE.update({"db": db, "share": share})
+    gc.collect()
+    gc.freeze()
+    start = time.perf_counter()
+    try:
+        with context.Pool(processes=workers, maxtasksperchild=1) as pool:
+            if mode == "fork":
+                results = pool.map(run_forked, range(workers), chunksize=1)
+            elif mode == "deepcopy":
+                results = pool.map(run_deepcopy, range(workers), chunksize=1)
+            else:
+                results = pool.starmap(
+                    run_pickled, [(db, share)] * workers, chunksize=1
+                )
+    finally:
+        gc.unfreeze()
+        _STATE.clear()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--datasets", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--share",
+        type=float,
+        default=0.1,
+        help="share of the datasets modified by each worker",
+    )
+    args = parser.parse_args()
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise SystemExit("This benchmark requires the `fork` start method.")
+
+    db = build_database(args.datasets)
+    print("Base database: {} datasets, {} MB RSS in the parent process.".format(
+        len(db), get_memory_usage()["RSS"]
+    ))
+
+    t = PrettyTable(
+        ["Mode", "Wall time (s)", "Private memory at end (MB, mean)",
+         "Private memory at end (MB, max)", "Peak RSS (MB, max)"]
+    )
+    for mode in ("fork", "pickle", "deepcopy"):
+        elapsed, results = benchmark(mode, db, args.workers, args.share)
+        private = [after["private"] for _, after in results]
+        peak = [after["peak RSS"] for _, after in results]
+        t.add_row(
+            [
+                mode,
+                round(elapsed, 2),
+                round(sum(private) / len(private), 1) if None not in private else "n/a",
+                max(private) if None not in private else "n/a",
+                max(peak),
+            ]
+        )
+    print(t)
+
+
+if __name__ == "__main__":
+    main()
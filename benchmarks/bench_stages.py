@@ -0,0 +1,208 @@
+"""
+Time each transformation (`update_*`) and each export (`write_db_to_*`) on synthetic databases
+shaped like ecoinvent (see :mod:`premise.synthetic_database`), of increasing size.
+
+For each stage, the wall time, the CPU time, the increase of the peak resident set size,
+and the throughput (datasets and exchanges of the scenario database processed per second)
+are reported. The resident set size is also sampled at regular intervals during the whole run,
+to follow memory over time.
+
+The IAM data is read from a synthetic REMIND file, unless `--iam-filepath` is given.
+A stage that fails is reported as such, and the benchmark moves on to the next one.
+
+Usage:
+
+    python benchmarks/bench_stages.py --sizes 1000 20000 100000 --output bench.json
+
+`premise` must be importable (e.g., installed with `pip install -e .`).
+"""
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from prettytable import PrettyTable
+
+from premise.copy_on_write import copy_on_write_database
+from premise.data_collection import IAMDataCollection
+from premise.ecoinvent_modification import export_scenario, transform_scenario
+from premise.profiling import Profiler
+from premise.synthetic_database import DATABASE_SIZES, generate_database, write_iam_file
+from premise.utils import get_memory_usage
+
+STAGES = ["update_electricity", "update_solar_PV", "update_cement", "update_steel"]
+EXPORTS = ["matrices", "simapro"]
+
+
+class MemorySampler(threading.Thread):
+    """
+    Thread that records the resident set size of the process every `interval` seconds,
+    with the stage running at that time.
+    """
+
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stage = None
+        self.samples = []
+        self.stopped = threading.Event()
+        self.start_time = time.perf_counter()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.samples.append(
+                (
+                    round(time.perf_counter() - self.start_time, 3),
+                    get_memory_usage()["RSS"],
+                    self.stage,
+                )
+            )
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_stage(sampler, scenario, name, function):
+    """Run a stage and return its record, with its throughput."""
+    sampler.stage = name
+    n_datasets = len(scenario["database"])
+    n_exchanges = sum(len(ds["exchanges"]) for ds in scenario["database"])
+    try:
+        function()
+        status = "ok"
+    except Exception as e:
+        status = "{}: {}".format(type(e).__name__, e)[:60]
+    finally:
+        sampler.stage = None
+
+    records = scenario.get("profile", [])
+    if records and records[-1]["stage"] == name:
+        record = dict(records[-1])
+    else:
+        # The stage failed before being recorded
+        record = {"stage": name, "wall time (s)": None, "CPU time (s)": None,
+                  "peak RSS delta (MB)": None}
+
+    wall_time = record["wall time (s)"]
+    record.update(
+        {
+            "datasets": n_datasets,
+            "exchanges": n_exchanges,
+            "datasets/s": round(n_datasets / wall_time) if wall_time else None,
+            "exchanges/s": round(n_exchanges / wall_time) if wall_time else None,
+            "status": status,
+        }
+    )
+    return record
+
+
+def bench(size, stages, exports, year, iam_filepath, directory, sampler, seed=0):
+    print("\n/////////////////// {} DATASETS ////////////////////".format(size))
+
+    sampler.stage = "generate_database"
+    start = time.perf_counter()
+    db = generate_database(size, seed=seed)
+    sampler.stage = None
+    print("Database generated in {:.1f} s.".format(time.perf_counter() - start))
+
+    scenario = {
+        "model": "remind",
+        "pathway": "SSP2-Base",
+        "year": year,
+        "external data": IAMDataCollection("remind", "SSP2-Base", year, iam_filepath),
+        "database": copy_on_write_database(db),
+    }
+    profiler = Profiler()
+    records = []
+
+    for stage in stages:
+        records.append(
+            run_stage(
+                sampler, scenario, stage,
+                lambda: transform_scenario(scenario, "3.7.1", [stage], profiler=profiler),
+            )
+        )
+
+    for fmt in exports:
+        name = "write_db_to_" + fmt
+        records.append(
+            run_stage(
+                sampler, scenario, name,
+                lambda: export_scenario(scenario, fmt, directory, profiler),
+            )
+        )
+
+    for record in records:
+        record["size"] = size
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DATABASE_SIZES.values()))
+    parser.add_argument("--stages", nargs="+", default=STAGES)
+    parser.add_argument("--exports", nargs="+", default=EXPORTS)
+    parser.add_argument("--year", type=int, default=2030)
+    parser.add_argument("--iam-filepath", type=Path, default=None,
+                        help="directory with a remind_SSP2-Base.mif file")
+    parser.add_argument("--interval", type=float, default=0.1,
+                        help="interval between two memory samples, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None,
+                        help="JSON file to write the records and the memory samples to")
+    args = parser.parse_args()
+
+    sampler = MemorySampler(args.interval)
+    sampler.start()
+    records = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        iam_filepath = args.iam_filepath
+        if iam_filepath is None:
+            iam_filepath = directory
+            write_iam_file(directory)
+
+        for size in args.sizes:
+            records.extend(
+                bench(size, args.stages, args.exports, args.year, iam_filepath,
+                      directory, sampler, args.seed)
+            )
+
+    sampler.stop()
+
+    t = PrettyTable(
+        ["Size", "Stage", "Wall time (s)", "CPU time (s)", "Peak RSS delta (MB)",
+         "Datasets/s", "Exchanges/s", "Status"]
+    )
+    for r in records:
+        t.add_row(
+            [r["size"], r["stage"], r["wall time (s)"], r["CPU time (s)"],
+             r["peak RSS delta (MB)"], r["datasets/s"], r["exchanges/s"], r["status"]]
+        )
+    print(t)
+    print("Peak RSS: {} MB".format(get_memory_usage()["peak RSS"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "records": records,
+                    "memory samples": [
+                        {"time (s)": t, "RSS (MB)": rss, "stage": stage}
+                        for t, rss, stage in sampler.samples
+                    ],
+                },
+                f,
+                indent=2,
+            )
+        print("Records written to {}.".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
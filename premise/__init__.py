@@ -2,7 +2,9 @@ __all__ = (
     "NewDatabase",
     "Geomap",
     "DATA_DIR",
-    "INVENTORY_DIR"
+    "INVENTORY_DIR",
+    "clear_cache",
+    "clear_checkpoints",
 )
 __version__ = (0, 2, 1)
 
@@ -13,3 +15,5 @@ INVENTORY_DIR = Path(__file__).resolve().parent / "data" / "additional_inventori
 
 from .ecoinvent_modification import NewDatabase
 from .geomap import Geomap
+from .cache import clear_cache
+from .checkpoint import clear_checkpoints
@@ -1,9 +1,42 @@
 from . import DATA_DIR
+from .database_index import IndexedDatabase
+import bisect
 import csv
 
 REMIND_TO_ECOINVENT_EMISSION_FILEPATH = (DATA_DIR / "ecoinvent_to_gains_emission_mappping.csv")
 
 
+class SortedFieldIndex:
+    """
+    Values of a field of the datasets of a database, sorted, so that the datasets whose value
+    equals or starts with a string are found by bisection instead of a scan of the database.
+
+    :ivar values: the values of the field, sorted
+    :vartype values: list
+    :ivar positions: for each sorted value, the position of its dataset in the database
+    :vartype positions: list
+    """
+
+    def __init__(self, db, field):
+        pairs = sorted((act[field], i) for i, act in enumerate(db))
+        self.values = [v for v, _ in pairs]
+        self.positions = [i for _, i in pairs]
+
+    def equals(self, value):
+        """Return the positions of the datasets whose value is `value`, in the order of the database."""
+        start = bisect.bisect_left(self.values, value)
+        end = bisect.bisect_right(self.values, value, start)
+        return sorted(self.positions[start:end])
+
+    def startswith(self, prefix):
+        """Return the positions of the datasets whose value starts with `prefix`, in the order of the database."""
+        start = bisect.bisect_left(self.values, prefix)
+        end = start
+        while end < len(self.values) and self.values[end].startswith(prefix):
+            end += 1
+        return sorted(self.positions[start:end])
+
+
 class InventorySet:
     """
     Hosts different filter sets to for ecoinvent activities and exchanges.
@@ -16,6 +49,9 @@ class InventorySet:
     The functions :func:`generate_material_map` and :func:`generate_powerplant_map` can
     be used to extract the actual activity objects as dictionaries.
     These functions return the result of applying :func:`act_fltr` to the filter dictionaries.
+
+    If the database is a :class:`premise.database_index.IndexedDatabase`, the maps are computed
+    once for each version of the database, and shared by all the instances built on it.
     """
 
     material_filters = {
@@ -506,7 +542,7 @@ class InventorySet:
         return csv_dict
 
     @staticmethod
-    def act_fltr(db, fltr=None, mask=None, filter_exact=False, mask_exact=False):
+    def act_fltr(db, fltr=None, mask=None, filter_exact=False, mask_exact=False, indexes=None):
         """Filter `db` for activities matching field contents given by `fltr` excluding strings in `mask`.
         `fltr`: string, list of strings or dictionary.
         If a string is provided, it is used to match the name field from the start (*startswith*).
@@ -525,6 +561,9 @@ class InventorySet:
         :type filter_exact: bool
         :param mask_exact: requires exact match when true.
         :type mask_exact: bool
+        :param indexes: sorted values of the fields of `db`, by field, built as needed.
+            Can be shared between calls on the same database.
+        :type indexes: dict
         :return: list of activity data set names
         :rtype: list
 
@@ -533,6 +572,8 @@ class InventorySet:
             fltr = {}
         if mask is None:
             mask = {}
+        if indexes is None:
+            indexes = {}
         result = []
 
         # default field is name
@@ -541,11 +582,14 @@ class InventorySet:
         if type(mask) == list or type(mask) == str:
             mask = {"name": mask}
 
-        def like(a, b):
+        def like(field, b):
+            if field not in indexes:
+                indexes[field] = SortedFieldIndex(db, field)
             if filter_exact:
-                return a == b
+                positions = indexes[field].equals(b)
             else:
-                return a.startswith(b)
+                positions = indexes[field].startswith(b)
+            return [db[i] for i in positions]
 
         def notlike(a, b):
             if mask_exact:
@@ -559,9 +603,9 @@ class InventorySet:
             if type(condition) == list:
                 for el in condition:
                     # this is effectively connecting the statements by *or*
-                    result.extend([act for act in db if like(act[field], el)])
+                    result.extend(like(field, el))
             else:
-                result.extend([act for act in db if like(act[field], condition)])
+                result.extend(like(field, condition))
 
         for field in mask:
             condition = mask[field]
@@ -584,7 +628,32 @@ class InventorySet:
             and a set of activity data set names as values.
         :rtype: dict
         """
-        techs = {tech: self.act_fltr(self.db, **fltr) for tech, fltr in filtr.items()}
-        return {
-            tech: set([act["name"] for act in actlst]) for tech, actlst in techs.items()
-        }
+        def generate_sets():
+            indexes = self.get_indexes()
+            techs = {
+                tech: self.act_fltr(self.db, **fltr, indexes=indexes)
+                for tech, fltr in filtr.items()
+            }
+            return {
+                tech: set([act["name"] for act in actlst]) for tech, actlst in techs.items()
+            }
+
+        if not isinstance(self.db, IndexedDatabase):
+            return generate_sets()
+
+        sets = self.db.memoize(
+            ("InventorySet", tuple((k, repr(v)) for k, v in filtr.items())), generate_sets
+        )
+        return {tech: set(names) for tech, names in sets.items()}
+
+    def get_indexes(self):
+        """
+        Return a dictionary in which :meth:`act_fltr` stores the sorted values of the fields
+        of the database. It is shared by all the instances built on the same version
+        of an indexed database.
+
+        :rtype: dict
+        """
+        if isinstance(self.db, IndexedDatabase):
+            return self.db.memoize("SortedFieldIndex", dict)
+        return {}
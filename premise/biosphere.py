@@ -0,0 +1,91 @@
+"""
+Registry of the biosphere flows, read once per process.
+
+The inventory imports link their biosphere exchanges with `dict_biosphere.txt`, and the export
+indexes the rows of the B matrix with `flows_biosphere_37.csv`. Each importer read the first
+file again, and each export read the second one several times. :func:`get_biosphere_registry`
+reads a file the first time it is needed, and returns the same :class:`BiosphereRegistry`
+afterwards.
+"""
+import csv
+from pathlib import Path
+
+# Registries already read, by path of their file
+_REGISTRIES = {}
+
+
+class BiosphereRegistry:
+    """
+    Biosphere flows listed in a file, with their (name, category, subcategory, unit)
+    and their code, indexed in both directions.
+
+    The dictionaries are shared by all the users of the registry, and must not be modified.
+    When a key or a code appears several times in the file, the last row is kept, as
+    when the files were read in dictionaries.
+
+    :ivar keys: (name, category, subcategory, unit) of the flows, in the order of the file
+    :vartype keys: list
+    :ivar codes: codes of the flows, in the order of the file
+    :vartype codes: list
+    :ivar code_by_key: codes of the flows, by key
+    :vartype code_by_key: dict
+    :ivar key_by_code: keys of the flows, by code
+    :vartype key_by_code: dict
+    :ivar index_by_key: rows of the flows in the file, by key
+    :vartype index_by_key: dict
+    :ivar index_by_code: rows of the flows in the file, by code
+    :vartype index_by_code: dict
+    """
+
+    def __init__(self, filepath):
+        filepath = Path(filepath)
+        if not filepath.is_file():
+            raise FileNotFoundError(
+                "The dictionary of biosphere flows could not be found."
+            )
+
+        with open(filepath) as f:
+            rows = list(csv.reader(f, delimiter=";"))
+
+        self.keys = [tuple(row[:4]) for row in rows]
+        self.codes = [row[-1] for row in rows]
+        self.code_by_key = dict(zip(self.keys, self.codes))
+        self.key_by_code = dict(zip(self.codes, self.keys))
+        self.index_by_key = {key: i for i, key in enumerate(self.keys)}
+        self.index_by_code = {code: i for i, code in enumerate(self.codes)}
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def get_biosphere_registry(filepath):
+    """
+    Return the registry of the biosphere flows of `filepath`, read the first time it is requested.
+
+    :param filepath: path to a file of biosphere flows (name;category;subcategory;unit;code)
+    :type filepath: str or Path
+    :rtype: BiosphereRegistry
+    """
+    filepath = Path(filepath)
+    registry = _REGISTRIES.get(filepath)
+    if registry is None:
+        registry = _REGISTRIES[filepath] = BiosphereRegistry(filepath)
+    return registry
+
+
+def get_flow_key(exc):
+    """
+    Return the (name, category, subcategory, unit) of the biosphere flow of the exchange `exc`.
+    The subcategory of the exchanges with a single category is "unspecified".
+
+    :param exc: biosphere exchange, with `categories` as a tuple
+    :type exc: dict
+    :rtype: tuple
+    """
+    categories = exc["categories"]
+    return (
+        exc["name"],
+        categories[0],
+        categories[1] if len(categories) > 1 else "unspecified",
+        exc["unit"],
+    )
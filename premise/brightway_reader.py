@@ -0,0 +1,261 @@
+"""
+Bulk extraction of a brightway2 database from the SQLite file of the project.
+
+`wurst.extract_brightway2_databases` reads the activities and the exchanges through the
+ORM of brightway, one row object at a time, and fetches the suppliers from other databases
+(e.g., biosphere3) with one query each. :func:`extract_brightway_database` reads the
+`activitydataset` and `exchangedataset` tables with a few large queries, unpickles their
+`data` column in batch, optionally in chunks read by a pool of processes, and returns the
+same list of datasets as wurst, with the name, product, unit and location of the suppliers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import pickle
+import sqlite3
+
+try:
+    from bw2data.backends.peewee import sqlite3_lci_db
+except ImportError:
+    from bw2data.backends import sqlite3_lci_db
+
+# Fields of the exchanges copied from their `data` column, as wurst does
+UNCERTAINTY_FIELDS = (
+    "uncertainty type",
+    "loc",
+    "scale",
+    "shape",
+    "minimum",
+    "maximum",
+    "amount",
+    "pedigree",
+)
+
+
+def get_sqlite_filepath():
+    """Return the path to the SQLite file of the databases of the current brightway project."""
+    return sqlite3_lci_db.db.database
+
+
+def connect(filepath):
+    """Open the SQLite file `filepath` in read-only mode."""
+    return sqlite3.connect("file:{}?mode=ro".format(filepath), uri=True)
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+def _list_or_dict(obj):
+    """Return the parameters of an activity as a list, as wurst does."""
+    if isinstance(obj, dict):
+        parameters = []
+        for key, value in obj.items():
+            parameter = copy.deepcopy(value)
+            parameter["name"] = key
+            parameters.append(parameter)
+        return parameters
+    return list(obj)
+
+
+def read_activities(connection, database_names):
+    """
+    Return the activities of the databases `database_names`, in the format of wurst, without exchanges.
+
+    :rtype: list
+    """
+    rows = connection.execute(
+        "SELECT database, code, location, name, product, type, data FROM activitydataset "
+        "WHERE database IN ({})".format(_placeholders(database_names)),
+        database_names,
+    )
+    activities = []
+    for database, code, location, name, product, kind, data in rows:
+        data = pickle.loads(data)
+        parameters = data.get("parameters", [])
+        activities.append(
+            {
+                "classifications": data.get("classifications", []),
+                "comment": data.get("comment", ""),
+                "location": location,
+                "database": database,
+                "code": code,
+                "categories": data.get("categories"),
+                "name": name,
+                "reference product": product,
+                "unit": data.get("unit", ""),
+                "exchanges": [],
+                "parameters": {p["name"]: p["amount"] for p in _list_or_dict(parameters)},
+                "parameters full": _list_or_dict(parameters),
+                "type": kind,
+            }
+        )
+    return activities
+
+
+def read_exchanges(filepath, database_names, bounds=None):
+    """
+    Return the exchanges of the activities of the databases `database_names`,
+    in the format of wurst, with the key of the activity they belong to.
+
+    :param filepath: path to the SQLite file
+    :type filepath: str
+    :param database_names: names of the databases
+    :type database_names: list
+    :param bounds: if given, only the exchanges whose row id is in ]start, end] are read
+    :type bounds: tuple
+    :return: a list of tuples (key of the activity, exchange)
+    :rtype: list
+    """
+    # The unary `+` keeps SQLite from using the index on the output: scanning the table
+    # reads the rows in the order of their ids, without random accesses or sorting
+    query = (
+        "SELECT output_database, output_code, input_database, input_code, type, data "
+        "FROM exchangedataset WHERE +output_database IN ({})".format(_placeholders(database_names))
+    )
+    parameters = list(database_names)
+    if bounds is not None:
+        query += " AND id > ? AND id <= ?"
+        parameters += list(bounds)
+
+    connection = connect(filepath)
+    try:
+        rows = connection.execute(query + " ORDER BY id", parameters).fetchall()
+    finally:
+        connection.close()
+
+    exchanges = []
+    for output_database, output_code, input_database, input_code, kind, data in rows:
+        data = pickle.loads(data)
+        exc = {key: data[key] for key in UNCERTAINTY_FIELDS if key in data}
+        if "amount" not in exc:
+            raise ValueError(
+                "Exchange of {} has no `amount` field".format((output_database, output_code))
+            )
+        if "uncertainty type" not in exc:
+            exc["uncertainty type"] = 0
+            exc["loc"] = exc["amount"]
+        exc["type"] = kind
+        exc["production volume"] = data.get("production volume")
+        exc["input"] = (input_database, input_code)
+        exchanges.append(((output_database, output_code), exc))
+    return exchanges
+
+
+def get_exchange_chunks(connection, database_names, n_chunks):
+    """Split the row ids of the exchanges of `database_names` in `n_chunks` ranges."""
+    start, end = connection.execute(
+        "SELECT MIN(id), MAX(id) FROM exchangedataset WHERE output_database IN ({})".format(
+            _placeholders(database_names)
+        ),
+        database_names,
+    ).fetchone()
+    if start is None:
+        return []
+    start -= 1
+    size = -(-(end - start) // n_chunks)
+    return [(s, min(s + size, end)) for s in range(start, end, size)]
+
+
+def read_suppliers(connection, keys):
+    """
+    Return the name, product, unit, location and categories of the activities `keys`
+    of other databases, read with one query per database.
+
+    :param keys: keys (database, code) of the activities
+    :type keys: set
+    :return: a dictionary with keys as keys and dictionaries as values
+    :rtype: dict
+    """
+    suppliers = {}
+    for database in sorted(set(k[0] for k in keys)):
+        rows = connection.execute(
+            "SELECT database, code, name, product, location, data FROM activitydataset "
+            "WHERE database = ?",
+            (database,),
+        )
+        for db, code, name, product, location, data in rows:
+            if (db, code) in keys:
+                data = pickle.loads(data)
+                suppliers[(db, code)] = {
+                    "name": name,
+                    "product": product,
+                    "unit": data.get("unit"),
+                    "location": location,
+                    "database": db,
+                    "categories": data.get("categories"),
+                }
+    return suppliers
+
+
+def extract_brightway_database(database_names, max_workers=None, filepath=None):
+    """
+    Return the datasets of the brightway2 databases `database_names`, as
+    `wurst.extract_brightway2_databases` does, read in bulk from the SQLite file of the current project.
+
+    :param database_names: name of a database, or list of names
+    :type database_names: str or list
+    :param max_workers: if greater than 1, the exchanges are read and unpickled in as many chunks,
+        by a pool of processes.
+    :type max_workers: int
+    :param filepath: path to the SQLite file. Defaults to the file of the current brightway project.
+    :type filepath: str
+    :return: a list of datasets
+    :rtype: list
+    """
+    if isinstance(database_names, str):
+        database_names = [database_names]
+    database_names = list(database_names)
+    filepath = filepath or get_sqlite_filepath()
+
+    connection = connect(filepath)
+    try:
+        print("Getting activity data")
+        activities = read_activities(connection, database_names)
+
+        print("Adding exchange data to activities")
+        if max_workers and max_workers > 1:
+            chunks = get_exchange_chunks(connection, database_names, max_workers)
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                results = [
+                    pool.submit(read_exchanges, filepath, database_names, bounds)
+                    for bounds in chunks
+                ]
+                exchanges = [exc for result in results for exc in result.result()]
+        else:
+            exchanges = read_exchanges(filepath, database_names)
+
+        lookup = {(ds["database"], ds["code"]): ds for ds in activities}
+        for output, exc in exchanges:
+            lookup[output]["exchanges"].append(exc)
+
+        print("Filling out exchange data")
+        external = set(
+            exc["input"] for _, exc in exchanges if exc["input"][0] not in database_names
+        )
+        suppliers = read_suppliers(connection, external)
+    finally:
+        connection.close()
+
+    for _, exc in exchanges:
+        key = exc["input"]
+        if key[0] in database_names:
+            # Suppliers of the same databases: the key of the supplier is removed, as wurst does
+            supplier = lookup[key]
+            exc["product"] = supplier.get("reference product")
+            exc["name"] = supplier.get("name")
+            exc["unit"] = supplier.get("unit")
+            exc["location"] = supplier.get("location")
+            exc["database"] = supplier.get("database")
+            if exc["type"] == "biosphere":
+                exc["categories"] = supplier.get("categories")
+            del exc["input"]
+        else:
+            if key not in suppliers:
+                raise KeyError("The supplier {} is not in the brightway project.".format(key))
+            supplier = suppliers[key]
+            for field in ("name", "product", "unit", "location", "database"):
+                exc[field] = supplier[field]
+            if exc["type"] == "biosphere":
+                exc["categories"] = supplier["categories"]
+
+    return activities
@@ -0,0 +1,261 @@
+from . import DATA_DIR, INVENTORY_DIR, __version__
+from pathlib import Path
+import hashlib
+import os
+import pickle
+
+import appdirs
+
+# Cache directory of the user, outside of the package directory, which is often read-only
+# or shared. It can be changed with the environment variable `PREMISE_CACHE_DIR`.
+CACHE_DIR = Path(os.environ.get("PREMISE_CACHE_DIR") or appdirs.user_cache_dir("premise"))
+CACHE_EXTENSION = ".pickle"
+# Default upper bound for the total size of the cache directory: 20 GB
+MAX_CACHE_SIZE = 20 * 1024 ** 3
+# Files that the cleaned database depends on, on top of the inventories: the code that
+# cleans the source database and imports the inventories (with the migration maps),
+# and the data files it reads, such as the biosphere flows the inventories are linked to
+DEPENDENCIES = [
+    Path(__file__).resolve().parent / filename
+    for filename in (
+        "clean_datasets.py",
+        "ecospold.py",
+        "brightway_reader.py",
+        "inventory_imports.py",
+        "biosphere.py",
+        "ecoinvent_modification.py",
+    )
+] + [DATA_DIR / "dict_biosphere.txt", DATA_DIR / "fix_names.csv"]
+
+
+def hash_file(filepath):
+    """
+    Return the SHA-256 hash of the content of a file.
+
+    :param filepath: path to the file to hash
+    :type filepath: str or Path
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint_directory(filepath, pattern="*.spold"):
+    """
+    Return a fingerprint of a directory of ecospold files, based on the name,
+    size and modification time of each file. Hashing the content of ~19k XML files
+    would cost as much as parsing them, hence the use of file metadata.
+
+    :param filepath: path to the directory
+    :type filepath: str or Path
+    :param pattern: glob pattern of the files to consider
+    :type pattern: str
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    for f in sorted(Path(filepath).glob(pattern)):
+        stat = f.stat()
+        h.update("{};{};{}\n".format(f.name, stat.st_size, stat.st_mtime_ns).encode())
+    return h.hexdigest()
+
+
+def fingerprint_brightway_database(source_db):
+    """
+    Return a fingerprint of a brightway2 database, based on its name and on the
+    `modified` timestamp brightway stores in the database metadata.
+
+    :param source_db: name of the brightway2 database
+    :type source_db: str
+    :return: a string identifying the current state of the database
+    :rtype: str
+    """
+    from bw2data import databases, projects
+
+    metadata = databases.get(source_db, {})
+    return "{};{};{}".format(projects.current, source_db, metadata.get("modified", ""))
+
+
+def get_cache_key(
+    source_db, source_type, source_file_path, version, additional_inventories=None
+):
+    """
+    Return a content-addressed key for the cleaned and inventory-augmented database.
+    The key changes whenever one of the inputs of :meth:`NewDatabase.clean_database`
+    or :meth:`NewDatabase.import_inventories` changes: the source database, its version,
+    the version of `premise`, the code and data files listed in :data:`DEPENDENCIES`,
+    the bundled inventory files or the user-defined inventories.
+
+    :param source_db: name of the source database
+    :type source_db: str
+    :param source_type: `brightway` or `ecospold`
+    :type source_type: str
+    :param source_file_path: directory of the ecospold files, if `source_type` == `ecospold`
+    :type source_file_path: str or Path
+    :param version: version of the ecoinvent source database
+    :type version: str
+    :param additional_inventories: list of user-defined inventories to import
+    :type additional_inventories: list
+    :return: hexadecimal key
+    :rtype: str
+    """
+    h = hashlib.sha256()
+
+    if source_type == "ecospold":
+        source = fingerprint_directory(source_file_path)
+    else:
+        source = fingerprint_brightway_database(source_db)
+
+    h.update("{};{};{}\n".format(source_type, source, version).encode())
+    h.update("premise {}\n".format(".".join(str(v) for v in __version__)).encode())
+
+    for f in DEPENDENCIES:
+        h.update("{};{}\n".format(f.name, hash_file(f)).encode())
+
+    for f in sorted(INVENTORY_DIR.glob("*.xlsx")):
+        h.update("{};{}\n".format(f.name, hash_file(f)).encode())
+
+    for inventory in additional_inventories or []:
+        h.update(
+            "{};{};{}\n".format(
+                Path(inventory["filepath"]).name,
+                inventory["ecoinvent version"],
+                hash_file(inventory["filepath"]),
+            ).encode()
+        )
+
+    return h.hexdigest()
+
+
+def get_cache_filepath(key, directory=None):
+    return Path(directory or CACHE_DIR) / (key + CACHE_EXTENSION)
+
+
+def get_cache_entries(directory=None):
+    """Return the files of the cached databases."""
+    return list(Path(directory or CACHE_DIR).glob("*" + CACHE_EXTENSION))
+
+
+def load_database_from_cache(key, directory=None):
+    """
+    Load a cached database. The file is touched on a hit, so that eviction
+    removes the least recently used entries first.
+
+    :param key: cache key, as returned by :func:`get_cache_key`
+    :type key: str
+    :param directory: cache directory. Defaults to :data:`CACHE_DIR`.
+    :type directory: Path
+    :return: the database as a list of dictionaries, or None if it is not cached
+    :rtype: list
+    """
+    filepath = get_cache_filepath(key, directory)
+
+    if not filepath.is_file():
+        return None
+
+    try:
+        with open(filepath, "rb") as f:
+            db = pickle.load(f)
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        # Corrupted or incompatible entry: drop it and rebuild
+        print("The cached database {} could not be read and will be rebuilt.".format(filepath.name))
+        filepath.unlink()
+        return None
+
+    os.utime(filepath)
+    return db
+
+
+def save_database_to_cache(key, db, max_size=MAX_CACHE_SIZE, directory=None):
+    """
+    Store a database in the cache, then evict the least recently used entries
+    if the cache grows beyond `max_size`.
+
+    :param key: cache key, as returned by :func:`get_cache_key`
+    :type key: str
+    :param db: the database, as a list of dictionaries
+    :type db: list
+    :param max_size: maximum size of the cache directory, in bytes
+    :type max_size: int
+    :param directory: cache directory. Defaults to :data:`CACHE_DIR`.
+    :type directory: Path
+    """
+    directory = Path(directory or CACHE_DIR)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    filepath = get_cache_filepath(key, directory)
+    # Write to a temporary file first, so that an interrupted run
+    # does not leave a truncated entry behind
+    tmp_filepath = filepath.with_suffix(".tmp")
+    with open(tmp_filepath, "wb") as f:
+        pickle.dump(db, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_filepath, filepath)
+
+    evict_cache(max_size, keep=key, directory=directory)
+
+
+def evict_cache(max_size=MAX_CACHE_SIZE, keep=None, directory=None):
+    """
+    Remove the least recently used cached databases until the total size
+    of the cache directory is below `max_size`.
+
+    :param max_size: maximum size of the cache directory, in bytes
+    :type max_size: int
+    :param keep: key of an entry that should not be evicted
+    :type keep: str
+    :param directory: cache directory. Defaults to :data:`CACHE_DIR`.
+    :type directory: Path
+    :return: list of evicted keys
+    :rtype: list
+    """
+    directory = Path(directory or CACHE_DIR)
+    if not directory.is_dir():
+        return []
+
+    entries = sorted(get_cache_entries(directory), key=lambda f: f.stat().st_mtime)
+    total_size = sum(f.stat().st_size for f in entries)
+
+    evicted = []
+    for f in entries:
+        if total_size <= max_size:
+            break
+        if f.stem == keep:
+            continue
+        total_size -= f.stat().st_size
+        f.unlink()
+        evicted.append(f.stem)
+
+    return evicted
+
+
+def clear_cache(key=None, directory=None):
+    """
+    Invalidate cached databases.
+
+    :param key: key of the entry to remove. If None, the whole cache is emptied.
+    :type key: str
+    :param directory: cache directory. Defaults to :data:`CACHE_DIR`.
+    :type directory: str or Path
+    :return: number of entries removed
+    :rtype: int
+    """
+    if not Path(directory or CACHE_DIR).is_dir():
+        return 0
+
+    if key is not None:
+        entries = [get_cache_filepath(key, directory)]
+    else:
+        entries = get_cache_entries(directory)
+
+    count = 0
+    for f in entries:
+        if f.is_file():
+            f.unlink()
+            count += 1
+
+    return count
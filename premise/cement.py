@@ -1,9 +1,11 @@
 import copy
 import uuid
 import numpy as np
-import wurst
 from wurst import searching as ws
 from .activity_maps import InventorySet
+from .columnar import ColumnarExchanges
+from .database_index import IndexedDatabase
+from .filters import compile_filter, contains, either, equals
 from .geomap import Geomap
 from .utils import *
 from datetime import date
@@ -17,7 +19,7 @@ class Cement:
     """
 
     def __init__(self, db, model, scenario, iam_data, year, version):
-        self.db = db
+        self.db = IndexedDatabase.wrap(db)
         self.model = model
         self.scenario = scenario
         self.iam_data = iam_data
@@ -31,6 +33,9 @@ class Cement:
         self.fuels_co2 = get_fuel_co2_emission_factors()
         mapping = InventorySet(self.db)
         self.emissions_map = mapping.get_remind_to_ecoinvent_emissions()
+        self.emissions_filter = compile_filter(
+            either(*[contains("name", x) for x in self.emissions_map])
+        )
         self.fuel_map = mapping.generate_fuel_map()
 
     def fetch_proxies(self, name, ref_prod):
@@ -46,10 +51,9 @@ class Cement:
 
         d_map = {
             self.geo.ecoinvent_to_iam_location(d['location']): d['location']
-            for d in ws.get_many(
-                self.db,
-                ws.equals("name", name),
-                ws.equals("reference product", ref_prod)
+            for d in self.db.get_many(
+                equals("name", name),
+                equals("reference product", ref_prod)
             )
         }
 
@@ -64,11 +68,10 @@ class Cement:
 
         for d in d_iam_to_eco:
             try:
-                ds = ws.get_one(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.equals("reference product", ref_prod),
-                    ws.equals("location", d_iam_to_eco[d]),
+                ds = self.db.get_one(
+                    equals("name", name),
+                    equals("reference product", ref_prod),
+                    equals("location", d_iam_to_eco[d]),
                 )
 
                 d_act[d] = copy.deepcopy(ds)
@@ -88,8 +91,8 @@ class Cement:
                     prod.pop("input")
 
         deleted_markets = [
-            (act['name'], act['reference product'], act['location']) for act in self.db
-                   if (act["name"], act['reference product']) == (name, ref_prod)
+            (act['name'], act['reference product'], act['location'])
+            for act in self.db.get_many(equals("name", name), equals("reference product", ref_prod))
         ]
 
         with open(DATA_DIR / "logs/log deleted cement datasets {} {} {}-{}.csv".format(
@@ -102,8 +105,9 @@ class Cement:
                     writer.writerow(line)
 
         # Remove old datasets
-        self.db = [act for act in self.db
-                   if (act["name"], act['reference product']) != (name, ref_prod)]
+        self.db.remove_datasets(
+            lambda act: (act["name"], act['reference product']) == (name, ref_prod)
+        )
 
         return d_act
 
@@ -140,39 +144,33 @@ class Cement:
         :rtype: list
         """
         if look_for_locations_in == "ecoinvent":
-            return ws.get_many(
-                    self.db,
+            return self.db.get_many(
+                either(
                     *[
-                        ws.either(
-                            *[
-                                ws.contains("name", supplier)
-                                for supplier in ecoinvent_technologies
-                            ]
-                        ),
-                        ws.either(
-                            *[
-                                ws.equals("location", loc)
-                                for loc in self.geo.iam_to_ecoinvent_location(iam_region)
-                            ]
-                        ),
-                        ws.equals("unit", unit),
-                        ws.equals("reference product", reference_product),
+                        contains("name", supplier)
+                        for supplier in ecoinvent_technologies
                     ]
-                )
+                ),
+                either(
+                    *[
+                        equals("location", loc)
+                        for loc in self.geo.iam_to_ecoinvent_location(iam_region)
+                    ]
+                ),
+                equals("unit", unit),
+                equals("reference product", reference_product),
+            )
         else:
-            return ws.get_many(
-                self.db,
-                *[
-                    ws.either(
-                        *[
-                            ws.contains("name", supplier)
-                            for supplier in ecoinvent_technologies
-                        ]
-                    ),
-                    ws.equals("location", look_for_locations_in),
-                    ws.equals("unit", unit),
-                    ws.equals("reference product", reference_product),
-                ]
+            return self.db.get_many(
+                either(
+                    *[
+                        contains("name", supplier)
+                        for supplier in ecoinvent_technologies
+                    ]
+                ),
+                equals("location", look_for_locations_in),
+                equals("unit", unit),
+                equals("reference product", reference_product),
             )
 
     @staticmethod
@@ -200,43 +198,50 @@ class Cement:
 
         return dict_act
 
-    def update_pollutant_emissions(self, ds):
+    def update_pollutant_emissions(self, datasets):
         """
         Update pollutant emissions based on GAINS data.
-        :return:
+
+        :param datasets: datasets whose emissions are updated, in place
+        :type datasets: list
+        :return: the datasets
+        :rtype: list
         """
 
-        # Update biosphere exchanges according to GAINS emission values
-        for exc in ws.biosphere(
-                ds, ws.either(*[ws.contains("name", x) for x in self.emissions_map])
-            ):
-            iam_emission_label = self.emissions_map[exc["name"]]
+        datasets = list(datasets)
+        exchanges = ColumnarExchanges(datasets)
 
-            try:
-                iam_emission = self.iam_data.cement_emissions.loc[
-                    dict(
-                        region=ds["location"],
-                        pollutant=iam_emission_label
-                    )
-                ].values.item(0)
-            except KeyError:
-                # TODO: fix this.
-                # GAINS does not have a 'World' region, hence we use Europe as a temporary fix
-                iam_emission = self.iam_data.cement_emissions.loc[
-                    dict(
-                        region=self.geo.iam_to_GAINS_region("World"),
-                        pollutant=iam_emission_label
-                    )
-                ].values.item(0)
+        # Update biosphere exchanges according to GAINS emission values
+        emissions = exchanges.select(self.emissions_filter, types=("biosphere",))
+        values = np.zeros(len(exchanges.amount))
+        cache = {}
+        for i in np.flatnonzero(emissions):
+            location = datasets[exchanges.consumer[i]]["location"]
+            iam_emission_label = self.emissions_map[exchanges.suppliers[exchanges.supplier[i]][0]]
+
+            if (location, iam_emission_label) not in cache:
+                try:
+                    cache[(location, iam_emission_label)] = self.iam_data.cement_emissions.loc[
+                        dict(
+                            region=location,
+                            pollutant=iam_emission_label
+                        )
+                    ].values.item(0)
+                except KeyError:
+                    # TODO: fix this.
+                    # GAINS does not have a 'World' region, hence we use Europe as a temporary fix
+                    cache[(location, iam_emission_label)] = self.iam_data.cement_emissions.loc[
+                        dict(
+                            region=self.geo.iam_to_GAINS_region("World"),
+                            pollutant=iam_emission_label
+                        )
+                    ].values.item(0)
 
+            values[i] = cache[(location, iam_emission_label)]
 
-            if exc["amount"] == 0:
-                wurst.rescale_exchange(
-                    exc, iam_emission / 1, remove_uncertainty=True
-                )
-            else:
-                wurst.rescale_exchange(exc, iam_emission / exc["amount"])
-        return ds
+        exchanges.rescale_to(values, emissions)
+        exchanges.write_back()
+        return datasets
 
     def build_clinker_market_datasets(self):
         # Fetch clinker market activities and store them in a dictionary
@@ -502,7 +507,7 @@ class Cement:
                         ) + v["comment"]
 
         # TODO: not sure about the GAINS unit. Check first.
-        #d_act_clinker = {k:self.update_pollutant_emissions(v) for k,v in d_act_clinker.items()}
+        #self.update_pollutant_emissions(d_act_clinker.values())
 
         return d_act_clinker
 
@@ -516,37 +521,41 @@ class Cement:
         :type name: str
         """
 
-        list_ds = [(ds["name"], ds["reference product"], ds["location"]) for ds in self.db]
-
-        for act in self.db:
-            for exc in act['exchanges']:
-                if "name" in exc and "product" in exc and exc["type"] == "technosphere":
-                    if (exc['name'], exc.get('product')) == (name, ref_product):
-                        if (name, ref_product, act["location"]) in list_ds:
-                            exc["location"] = act["location"]
-                        else:
-                            try:
-                                new_loc = self.geo.ecoinvent_to_iam_location(act["location"])
-                            except KeyError:
-                                new_loc = ""
-
-                            if (name, ref_product, new_loc) in list_ds:
-                                exc["location"] = new_loc
-                            else:
-                                # new location in ei3.7, not yet defined in `constructive_geometries`
-                                if act["location"] in ("North America without Quebec", "US only"):
-                                    new_loc = self.geo.ecoinvent_to_iam_location("US")
-                                    exc["location"] = new_loc
-
-                                elif act["location"] in ("RoW", "GLO"):
-                                    new_loc = self.geo.ecoinvent_to_iam_location("CN")
-                                    exc["location"] = new_loc
-                                else:
-                                    print("Issue with {} used in {}: cannot find the IAM equiavlent for "
-                                          "the location {}".format(name, act["name"], act["location"]))
-
-                        if "input" in exc:
-                            exc.pop("input")
+        # Locations in which the dataset is available
+        locations = set(
+            ds["location"]
+            for ds in self.db.get_many(
+                equals("name", name), equals("reference product", ref_product)
+            )
+        )
+
+        for act, exc in self.db.get_consumers(
+            equals("name", name), equals("product", ref_product)
+        ):
+            if exc["type"] != "technosphere":
+                continue
+
+            if act["location"] in locations:
+                new_loc = act["location"]
+            else:
+                try:
+                    new_loc = self.geo.ecoinvent_to_iam_location(act["location"])
+                except KeyError:
+                    new_loc = ""
+
+                if new_loc not in locations:
+                    # new location in ei3.7, not yet defined in `constructive_geometries`
+                    if act["location"] in ("North America without Quebec", "US only"):
+                        new_loc = self.geo.ecoinvent_to_iam_location("US")
+
+                    elif act["location"] in ("RoW", "GLO"):
+                        new_loc = self.geo.ecoinvent_to_iam_location("CN")
+                    else:
+                        print("Issue with {} used in {}: cannot find the IAM equiavlent for "
+                              "the location {}".format(name, act["name"], act["location"]))
+                        new_loc = None
+
+            self.db.relink_exchange(act, exc, location=new_loc)
 
     def adjust_clinker_ratio(self, d_act):
         """ Adjust the cement suppliers composition for "cement, unspecified", in order to reach
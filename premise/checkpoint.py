@@ -0,0 +1,227 @@
+from .cache import (
+    CACHE_DIR,
+    MAX_CACHE_SIZE,
+    get_cache_filepath,
+    hash_file,
+    load_database_from_cache,
+    save_database_to_cache,
+)
+from pathlib import Path
+from itertools import combinations
+import hashlib
+import numpy as np
+import xarray as xr
+
+CHECKPOINT_DIR = CACHE_DIR / "checkpoints"
+
+
+def update_fingerprint(h, obj):
+    """
+    Feed `obj` to the hash object `h`. Arrays are hashed with their coordinates,
+    dictionaries regardless of the order of their keys, and paths to files by their content.
+    """
+    if isinstance(obj, xr.DataArray):
+        h.update(repr(obj.dims).encode())
+        for dim in obj.dims:
+            h.update(np.asarray(obj[dim].values).astype(str).tobytes())
+        h.update(np.ascontiguousarray(obj.values).tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.shape, obj.dtype.str)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=str):
+            update_fingerprint(h, k)
+            update_fingerprint(h, obj[k])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for v in obj:
+            update_fingerprint(h, v)
+        h.update(b"]")
+    elif isinstance(obj, Path) and obj.is_file():
+        h.update(hash_file(obj).encode())
+    else:
+        h.update(repr(obj).encode())
+    h.update(b";")
+
+
+def fingerprint(obj):
+    """
+    Return a fingerprint of the data consumed by a stage.
+
+    :param obj: arrays, dictionaries, lists, paths or scalars
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    update_fingerprint(h, obj)
+    return h.hexdigest()
+
+
+def get_stage_fingerprints(scenario, stages, names):
+    """
+    Return the fingerprint of the external data each stage of `names` consumes for `scenario`,
+    and of the code and data files it depends on (see :attr:`premise.scheduler.Stage.dependencies`).
+
+    :param scenario: a scenario, with its `external data`
+    :type scenario: dict
+    :param stages: the stages, by name
+    :type stages: dict
+    :param names: names of the stages
+    :type names: list
+    :return: fingerprints, by stage name
+    :rtype: dict
+    """
+    return {
+        name: fingerprint(
+            [
+                stages[name].inputs(scenario) if stages[name].inputs is not None else None,
+                [(path.name, path) for path in stages[name].dependencies],
+            ]
+        )
+        for name in names
+    }
+
+
+def get_checkpoint_key(database_key, scenario, fingerprints, applied):
+    """
+    Return the key of the checkpoint of `scenario` once the stages `applied` have been applied.
+    Stages are applied in an order compatible with their dependencies, which does not change
+    the result: the key only depends on the set of stages and on their fingerprints.
+
+    :param database_key: key of the database the scenario database was copied from
+    :type database_key: str
+    :param scenario: the scenario
+    :type scenario: dict
+    :param fingerprints: fingerprints, by stage name
+    :type fingerprints: dict
+    :param applied: names of the stages applied
+    :type applied: list
+    :return: hexadecimal key
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    h.update(
+        "{};{};{};{}\n".format(
+            database_key, scenario["model"], scenario["pathway"], scenario["year"]
+        ).encode()
+    )
+    for name in sorted(applied):
+        h.update("{};{}\n".format(name, fingerprints[name]).encode())
+    return h.hexdigest()
+
+
+def is_closed(scheduler, names, subset):
+    """
+    Return True if `subset` contains, for each of its stages, the stages requested
+    before it that it conflicts with, i.e., if `subset` can be applied first.
+    """
+    for i, name in enumerate(names):
+        if name in subset:
+            stage = scheduler.stages[name]
+            for other in names[:i]:
+                if other not in subset and stage.conflicts_with(
+                    scheduler.stages[other]
+                ):
+                    return False
+    return True
+
+
+def find_checkpoint(scheduler, names, database_key, scenario, fingerprints):
+    """
+    Return the largest set of stages of `names` that can be applied first
+    and for which a checkpoint exists, with the key of that checkpoint.
+
+    :return: a tuple with the names of the stages, in the order of `names`, and the key
+    :rtype: tuple
+    """
+    for size in range(len(names), 0, -1):
+        for subset in combinations(names, size):
+            if not is_closed(scheduler, names, set(subset)):
+                continue
+            key = get_checkpoint_key(database_key, scenario, fingerprints, subset)
+            if get_cache_filepath(key, CHECKPOINT_DIR).is_file():
+                return list(subset), key
+    return [], None
+
+
+def run_with_checkpoints(
+    scheduler, scenario, version, names, database_key, max_size=MAX_CACHE_SIZE
+):
+    """
+    Apply the stages `names` to `scenario`, reusing the result of a previous run in which
+    some of the stages consumed the same external data.
+
+    The state of the database is saved after each stage. On a re-run, the stages whose
+    fingerprint changed, and the stages that depend on them, are moved to the end of the
+    chain: the database is loaded from the checkpoint saved after the other stages,
+    and only the former are recomputed.
+
+    :param scheduler: the scheduler
+    :type scheduler: premise.scheduler.StageScheduler
+    :param scenario: a scenario, with its `database` and `external data`
+    :type scenario: dict
+    :param version: version of the ecoinvent source database
+    :type version: str
+    :param names: names of the stages, in the order they would run serially
+    :type names: list
+    :param database_key: key of the database the scenario database was copied from
+    :type database_key: str
+    :param max_size: maximum size of the checkpoint directory, in bytes
+    :type max_size: int
+    :return: the transformed scenario
+    :rtype: dict
+    """
+    names = [n for n in names if n not in scenario.get("exclude", [])]
+    fingerprints = get_stage_fingerprints(scenario, scheduler.stages, names)
+
+    applied, key = find_checkpoint(
+        scheduler, names, database_key, scenario, fingerprints
+    )
+
+    if applied:
+        db = load_database_from_cache(key, CHECKPOINT_DIR)
+        if db is None:
+            applied = []
+        else:
+            print(
+                "Checkpoint loaded for {}, {}, {}: {} reused.".format(
+                    scenario["model"],
+                    scenario["pathway"],
+                    scenario["year"],
+                    ", ".join(applied),
+                )
+            )
+            scenario["database"] = db
+            for name in applied:
+                scheduler.record(scenario, scheduler.stages[name])
+
+    def save_checkpoint(scenario, wave):
+        applied.extend(wave)
+        save_database_to_cache(
+            get_checkpoint_key(database_key, scenario, fingerprints, applied),
+            scenario["database"],
+            max_size,
+            CHECKPOINT_DIR,
+        )
+
+    remaining = [n for n in names if n not in applied]
+    return scheduler.run(scenario, version, remaining, callback=save_checkpoint)
+
+
+def clear_checkpoints():
+    """
+    Remove all checkpoints.
+
+    :return: number of checkpoints removed
+    :rtype: int
+    """
+    if not CHECKPOINT_DIR.is_dir():
+        return 0
+
+    count = 0
+    for f in CHECKPOINT_DIR.glob("*"):
+        f.unlink()
+        count += 1
+    return count
@@ -1,8 +1,9 @@
 from . import DATA_DIR
+from .brightway_reader import extract_brightway_database
+from .ecospold import ParallelEcospold2Importer
 
 from wurst import searching as ws
 import csv
-import pprint
 import wurst
 import bw2io
 from bw2data.database import DatabaseChooser
@@ -22,20 +23,27 @@ class DatabaseCleaner:
     :vartype source_db: str
     :ivar source_file_path: filepath of the database if `source_type` == 'ecospold'.
     :vartype source_file_path: str
+    :ivar max_workers: number of processes that extract the ecospold files if `source_type` == 'ecospold'.
+        If None or 1, the files are extracted by `bw2io`, on a single core.
+        If `source_type` == 'brightway', the exchanges are read by a pool of processes only if it is greater than 1.
+    :vartype max_workers: int
 
     """
 
-    def __init__(self, source_db, source_type, source_file_path):
+    def __init__(self, source_db, source_type, source_file_path, max_workers=None):
 
         if source_type == 'brightway':
             # Check that database exists
             if len(DatabaseChooser(source_db)) == 0:
                 raise NameError('The database selected is empty. Make sure the name is correct')
-            self.db = wurst.extract_brightway2_databases(source_db)
+            self.db = extract_brightway_database(source_db, max_workers=max_workers)
 
         if source_type == 'ecospold':
             # The ecospold data needs to be formatted
-            ei = bw2io.SingleOutputEcospold2Importer(source_file_path, source_db)
+            if max_workers is None or max_workers <= 1:
+                ei = bw2io.SingleOutputEcospold2Importer(source_file_path, source_db)
+            else:
+                ei = ParallelEcospold2Importer(source_file_path, source_db, max_workers=max_workers)
             ei.apply_strategies()
             self.db = ei.data
             # Location field is added to exchanges
@@ -191,6 +199,24 @@ class DatabaseCleaner:
         for x in self.db:
             x['parameters'] = {k['name']: k['amount'] for k in x['parameters']}
 
+    def get_locations_index(self, matching_fields=("name", "unit")):
+        """
+        Return a dictionary with, for each combination of values of `matching_fields`,
+        the locations of the datasets in :attr:`db` that have these values, in the order of :attr:`db`.
+        A lookup in this dictionary returns what :meth:`find_location_given_lookup_dict` returns,
+        without going through the whole database.
+
+        :param matching_fields: fields of the datasets to index
+        :type matching_fields: tuple
+        :return: a dictionary with tuples of values as keys and lists of location names as values
+        :rtype: dict
+        """
+        index = {}
+        for ds in self.db:
+            key = tuple(ds.get(k) for k in matching_fields)
+            index.setdefault(key, []).append(ds.get("location"))
+        return index
+
     # Functions to clean up Wurst import and additional technologies
     def fix_unset_technosphere_and_production_exchange_locations(
             self, matching_fields=("name", "unit")
@@ -200,10 +226,18 @@ class DatabaseCleaner:
         they belong to.
         Modifies in place (does not return anything).
 
+        The locations of the suppliers are looked up in an index of the datasets
+        (see :meth:`get_locations_index`), built once. Exchanges for which no unique location
+        is found are left unchanged, and listed in a single summary.
+
         :param matching_fields: filter conditions
         :type matching_fields: tuple
 
         """
+        locations = self.get_locations_index(matching_fields)
+        # Exchanges without a unique location, by name and unit
+        unresolved = {}
+
         for ds in self.db:
 
             # collect production exchanges that simply do not have a location key and set it to
@@ -214,15 +248,25 @@ class DatabaseCleaner:
 
             for exc in wurst.technosphere(ds):
                 if "location" not in exc:
-                    locs = self.find_location_given_lookup_dict({k: exc.get(k) for k in matching_fields})
+                    key = tuple(exc.get(k) for k in matching_fields)
+                    locs = locations.get(key, [])
                     if len(locs) == 1:
                         exc["location"] = locs[0]
                     else:
-                        print(
-                            "No unique location found for exchange:\n{}\nFound: {}".format(
-                                pprint.pformat(exc), locs
-                            )
-                        )
+                        unresolved.setdefault(key, [locs, 0])[1] += 1
+
+        if unresolved:
+            print(
+                "No unique location found for {} exchange(s) of {} supplier(s):".format(
+                    sum(n for _, n in unresolved.values()), len(unresolved)
+                )
+            )
+            for key, (locs, n) in unresolved.items():
+                print(
+                    "{} ({} exchange(s)). Found: {}".format(
+                        dict(zip(matching_fields, key)), n, locs
+                    )
+                )
 
     def prepare_datasets(self):
         """
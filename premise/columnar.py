@@ -0,0 +1,143 @@
+"""
+Columnar (struct-of-arrays) view of the exchanges of a list of datasets, for bulk numeric transformations.
+
+The sector classes rescale exchange amounts one dictionary at a time, e.g., with
+`wurst.change_exchanges_by_constant_factor`. :class:`ColumnarExchanges` stores, for all the
+exchanges of a list of datasets, the position of their dataset, the id of their supplier,
+the code of their type and their amount in NumPy arrays, with the suppliers and types
+in tables. Exchanges are selected with the filters of :mod:`premise.filters`, evaluated once
+per supplier, and rescaled in one vectorised operation. The amounts that changed are written
+back to the exchanges with :meth:`ColumnarExchanges.write_back`.
+"""
+import numpy as np
+
+from .filters import Columns, mask
+
+# Fields that identify the supplier of an exchange
+SUPPLIER_FIELDS = ("name", "product", "location", "unit", "categories")
+# Uncertainty fields removed when an amount is rescaled, as `wurst.rescale_exchange` does
+UNCERTAINTY_FIELDS = ("scale", "minimum", "maximum")
+
+
+class ColumnarExchanges:
+    """
+    Struct-of-arrays view of the exchanges of `datasets`.
+
+    :ivar datasets: the datasets
+    :vartype datasets: list
+    :ivar exchanges: the exchanges, in the order of the arrays
+    :vartype exchanges: list
+    :ivar consumer: position, in :attr:`datasets`, of the dataset of each exchange
+    :vartype consumer: numpy.ndarray
+    :ivar supplier: position, in :attr:`suppliers`, of the supplier of each exchange
+    :vartype supplier: numpy.ndarray
+    :ivar type: position, in :attr:`types`, of the type of each exchange
+    :vartype type: numpy.ndarray
+    :ivar amount: amount of each exchange
+    :vartype amount: numpy.ndarray
+    :ivar suppliers: name, product, location, unit and categories of each supplier
+    :vartype suppliers: list
+    :ivar types: types of exchanges
+    :vartype types: list
+    """
+
+    def __init__(self, datasets):
+        self.datasets = list(datasets)
+        self.exchanges = []
+        consumer, supplier, types, amount = [], [], [], []
+        supplier_ids, type_ids = {}, {}
+
+        for i, ds in enumerate(self.datasets):
+            for exc in ds["exchanges"]:
+                key = tuple(exc.get(f) for f in SUPPLIER_FIELDS)
+                self.exchanges.append(exc)
+                consumer.append(i)
+                supplier.append(supplier_ids.setdefault(key, len(supplier_ids)))
+                types.append(type_ids.setdefault(exc["type"], len(type_ids)))
+                amount.append(exc["amount"])
+
+        self.suppliers = list(supplier_ids)
+        self.types = list(type_ids)
+        self.consumer = np.array(consumer, dtype=np.int32)
+        self.supplier = np.array(supplier, dtype=np.int32)
+        self.type = np.array(types, dtype=np.int8)
+        self.amount = np.array(amount, dtype=float)
+        # Exchanges whose amount has been rescaled and must be written back
+        self.modified = np.zeros(len(self.exchanges), dtype=bool)
+
+    def select(self, *funcs, types=None):
+        """
+        Return a mask of the exchanges whose supplier passes all the filters `funcs`
+        (tested on its name, product, location, unit and categories), and whose type is in `types`.
+
+        :param types: types of exchanges to select, e.g. ("technosphere",). All by default.
+        :type types: tuple
+        :return: a boolean array
+        :rtype: numpy.ndarray
+        """
+        if funcs:
+            columns = Columns([dict(zip(SUPPLIER_FIELDS, s)) for s in self.suppliers])
+            selected = np.ones(len(self.suppliers), dtype=bool)
+            for fltr in funcs:
+                selected &= mask(fltr, columns)
+            result = selected[self.supplier]
+        else:
+            result = np.ones(len(self.exchanges), dtype=bool)
+
+        if types is not None:
+            codes = [self.types.index(t) for t in types if t in self.types]
+            result &= np.isin(self.type, codes)
+        return result
+
+    def rescale(self, factors, where):
+        """
+        Multiply the amounts of the exchanges selected by `where` by `factors`.
+
+        :param factors: a factor, or one factor per dataset, or one factor per exchange
+        :type factors: float or numpy.ndarray
+        :param where: mask of the exchanges to rescale
+        :type where: numpy.ndarray
+        """
+        factors = np.asarray(factors, dtype=float)
+        if factors.ndim == 1 and len(factors) == len(self.datasets):
+            factors = factors[self.consumer]
+        self.amount[where] *= factors[where] if factors.ndim else factors
+        self.modified |= where
+
+    def rescale_to(self, values, where):
+        """
+        Set the amounts of the exchanges selected by `where` to `values`, the way the sector classes
+        do with `wurst.rescale_exchange(exc, value / exc["amount"])`: exchanges with an amount of 0
+        are multiplied by the value instead, and stay at 0.
+
+        :param values: one value per exchange
+        :type values: numpy.ndarray
+        :param where: mask of the exchanges to rescale
+        :type where: numpy.ndarray
+        """
+        amount = self.amount[where]
+        values = np.asarray(values, dtype=float)[where]
+        is_zero = amount == 0
+        factors = np.where(is_zero, values, values / np.where(is_zero, 1, amount))
+        self.amount[where] = amount * factors
+        self.modified |= where
+
+    def write_back(self):
+        """
+        Write the rescaled amounts back to the exchanges, and remove their uncertainty,
+        as `wurst.rescale_exchange` does.
+
+        :return: the number of exchanges written
+        :rtype: int
+        """
+        positions = np.flatnonzero(self.modified)
+        for i in positions:
+            exc = self.exchanges[i]
+            exc["amount"] = float(self.amount[i])
+            exc["uncertainty type"] = 0
+            exc["loc"] = exc["amount"]
+            for field in UNCERTAINTY_FIELDS:
+                if field in exc:
+                    del exc[field]
+        self.modified[:] = False
+        return len(positions)
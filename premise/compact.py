@@ -0,0 +1,328 @@
+"""
+Compact representation of the exchanges of a database, to reduce the memory it takes.
+
+A wurst database stores each exchange as a dictionary, and repeats strings such as
+"market group for electricity, high voltage", "kilowatt hour" or "technosphere" in
+hundreds of thousands of them. :func:`compact_database` replaces each exchange by a
+:class:`CompactExchange`, which stores its fields in slots instead of a hash table,
+stores the type and unit as small integer codes, and shares a single copy of the
+names, products and locations. Compact exchanges are dictionaries for wurst,
+the sector classes and the exporters. As the hash table of the dictionary is left empty,
+serializers that read it directly (e.g., the C encoder of `json`) write them as `{}`:
+:func:`expand_database` converts them back, and the exports of premise call it
+before writing the databases. :func:`compact_database` warns about it, as the datasets
+it returns are then read directly.
+"""
+from collections.abc import ItemsView, KeysView, ValuesView
+import sys
+import warnings
+
+from .copy_on_write import CopyOnWriteDataset
+
+# Fields of most exchanges, stored in slots. Other fields are stored in a dictionary.
+EXCHANGE_FIELDS = (
+    "name",
+    "product",
+    "location",
+    "unit",
+    "amount",
+    "type",
+    "input",
+    "uncertainty type",
+    "loc",
+    "scale",
+    "categories",
+    "production volume",
+)
+# Fields of the exchanges and of the datasets whose values are interned
+INTERNED_FIELDS = ("name", "product", "reference product", "location")
+# Fields of the exchanges whose values, tuples of strings, are shared between exchanges
+SHARED_FIELDS = ("input", "categories")
+# Fields of the exchanges stored as codes
+CODED_FIELDS = ("type", "unit")
+
+_SLOTS = {field: "_" + field.replace(" ", "_") for field in EXCHANGE_FIELDS}
+# For each coded field, the values, and the code of each value
+_CODES = {field: ([], {}) for field in CODED_FIELDS}
+
+
+def encode(field, value):
+    """Return the code of `value` for a field stored as codes."""
+    values, codes = _CODES[field]
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(values)
+        values.append(value)
+    return code
+
+
+def decode(field, code):
+    """Return the value of `code` for a field stored as codes."""
+    return _CODES[field][0][code]
+
+
+# Single copy of the tuples of the shared fields
+_SHARED_TUPLES = {}
+
+
+def intern(value):
+    """Return the interned copy of `value` if it is a string, `value` otherwise."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def share(value):
+    """
+    Return a single copy of `value`, with its strings interned, if it is a tuple
+    (e.g., the `input` or `categories` of an exchange), `value` otherwise.
+    """
+    if type(value) is not tuple:
+        return value
+    shared = _SHARED_TUPLES.get(value)
+    if shared is None:
+        shared = _SHARED_TUPLES[value] = tuple(intern(v) for v in value)
+    return shared
+
+
+class CompactExchange(dict):
+    """
+    Exchange that stores its fields in slots, and leaves the hash table of the dictionary empty.
+    It is a dictionary, as wurst requires, and all accesses go through the methods below.
+
+    Codes are only valid in the process that created them: compact exchanges are pickled
+    and copied as the dictionary of their fields, and compacted again when loaded.
+    """
+
+    __slots__ = tuple(_SLOTS.values()) + ("_extra",)
+
+    def __init__(self, exc=(), **kwargs):
+        super().__init__()
+        self._extra = None
+        self.update(exc, **kwargs)
+
+    def __getitem__(self, key):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        try:
+            value = getattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+        if key in _CODES:
+            return decode(key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        if key in _CODES:
+            value = encode(key, value)
+        elif key in INTERNED_FIELDS:
+            value = intern(value)
+        elif key in SHARED_FIELDS:
+            value = share(value)
+        setattr(self, slot, value)
+
+    def __delitem__(self, key):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+            return
+        try:
+            delattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        slot = _SLOTS.get(key)
+        if slot is None:
+            return self._extra is not None and key in self._extra
+        return hasattr(self, slot)
+
+    def __iter__(self):
+        # Overriding `__iter__` also makes `dict(exc)` and `{**exc}` go through `__getitem__`
+        for field, slot in _SLOTS.items():
+            if hasattr(self, slot):
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return KeysView(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def popitem(self):
+        key = list(self)[-1]
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def copy(self):
+        return CompactExchange(self)
+
+    def __reduce_ex__(self, protocol):
+        # Pickled and copied with decoded values, as codes are specific to a process
+        return CompactExchange, (dict(self.items()),)
+
+    def __eq__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        return dict(self.items()) == (
+            dict(other.items()) if isinstance(other, CompactExchange) else other
+        )
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def compact_dataset(ds):
+    """
+    Replace, in place, the exchanges of `ds` by :class:`CompactExchange` objects,
+    and intern the strings of its name, reference product, location and code.
+
+    :param ds: a dataset
+    :type ds: dict
+    :return: the dataset
+    :rtype: dict
+    """
+    for field in INTERNED_FIELDS:
+        if field in ds:
+            ds[field] = intern(ds[field])
+    if "code" in ds:
+        # Shared with the `input` of the exchanges that point at the dataset
+        ds["code"] = intern(ds["code"])
+    ds["exchanges"] = [
+        exc if isinstance(exc, CompactExchange) else CompactExchange(exc)
+        for exc in ds["exchanges"]
+    ]
+    return ds
+
+
+def compact_database(db):
+    """
+    Compact, in place, the exchanges of the datasets of `db`. See :class:`CompactExchange`.
+    Emits a `UserWarning`: the compact exchanges must be expanded with :func:`expand_database`
+    before `db` is given to serializers that read the hash table of dictionaries.
+
+    :param db: a database, as a list of dictionaries
+    :type db: list
+    :return: the database
+    :rtype: list
+    """
+    for ds in db:
+        compact_dataset(ds)
+    warnings.warn(
+        "The exchanges of the database are stored as compact exchanges, which serializers "
+        "that read the hash table of dictionaries (e.g., `json.dumps`) write as `{}`. "
+        "The exports of premise expand them: call `premise.compact.expand_database` "
+        "before serializing the databases otherwise.",
+        UserWarning,
+        stacklevel=2,
+    )
+    return db
+
+
+def expand_database(db):
+    """
+    Return the datasets of `db` with their exchanges as dictionaries.
+    Datasets without compact exchanges are returned as they are, the others are copied,
+    so that `db` and the datasets it shares with other databases are left unchanged.
+
+    :param db: a database
+    :type db: list
+    :return: a list of dictionaries
+    :rtype: list
+    """
+    datasets = []
+    for ds in db:
+        exchanges = (
+            ds._peek("exchanges") if isinstance(ds, CopyOnWriteDataset) else ds["exchanges"]
+        )
+        if any(isinstance(exc, CompactExchange) for exc in exchanges):
+            ds = dict(ds._peek_items()) if isinstance(ds, CopyOnWriteDataset) else dict(ds)
+            ds["exchanges"] = [
+                dict(exc.items()) if isinstance(exc, CompactExchange) else exc
+                for exc in exchanges
+            ]
+        datasets.append(ds)
+    return datasets
+
+
+def get_size(obj):
+    """
+    Return the memory taken by `obj` and all the objects it references, in bytes.
+    Objects referenced several times, such as interned strings, are counted once.
+
+    :rtype: int
+    """
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, CopyOnWriteDataset):
+            stack.extend(k for k in dict.__iter__(obj))
+            stack.extend(v for _, v in obj._peek_items())
+        elif isinstance(obj, CompactExchange):
+            # The stored values: codes, and not the values they decode to
+            for slot in CompactExchange.__slots__:
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
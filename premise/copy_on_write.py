@@ -0,0 +1,194 @@
+from collections.abc import ItemsView, ValuesView
+import copy
+
+# Placeholder stored in place of the fields that are still shared with the base dataset
+_SHARED = object()
+
+
+class CopyOnWriteDataset(dict):
+    """
+    Dataset that shares its mutable fields (`exchanges`, `parameters`, etc.) with a dataset
+    of the base database until they are accessed.
+
+    Immutable fields (name, location, unit, code, etc.) are copied when the dataset is created,
+    which costs next to nothing since strings are shared. Mutable fields are replaced by a
+    placeholder and copied from the base dataset the first time they are read. As the sector
+    classes filter datasets on their name, location or unit before reading their exchanges,
+    only the datasets a transformation actually touches are materialized.
+
+    Any access goes through :meth:`__getitem__`, :meth:`get`, :meth:`items` or :meth:`values`,
+    so that the base dataset can never be modified through a scenario database.
+
+    :ivar _base: the mutable fields of the base dataset that have not been copied yet
+    :vartype _base: dict
+    """
+
+    __slots__ = ("_base",)
+
+    def __init__(self, base):
+        super().__init__()
+        self._base = {}
+        # A copy-on-write dataset can itself be the base, without copying its shared fields
+        items = (
+            base._peek_items() if isinstance(base, CopyOnWriteDataset) else base.items()
+        )
+        for k, v in items:
+            if isinstance(v, (list, dict, set)):
+                self._base[k] = v
+                dict.__setitem__(self, k, _SHARED)
+            else:
+                dict.__setitem__(self, k, v)
+
+    def _materialize(self, key):
+        value = copy.deepcopy(self._base.pop(key))
+        dict.__setitem__(self, key, value)
+        return value
+
+    def _peek(self, key):
+        """Return the value of `key` without copying it. The value must not be modified."""
+        value = dict.__getitem__(self, key)
+        return self._base[key] if value is _SHARED else value
+
+    def _peek_items(self):
+        return ((k, self._peek(k)) for k in dict.__iter__(self))
+
+    @property
+    def is_modified(self):
+        """True if at least one of the mutable fields has been copied from the base dataset."""
+        return any(
+            k not in self._base
+            for k in dict.__iter__(self)
+            if isinstance(dict.__getitem__(self, k), (list, dict, set))
+        )
+
+    def copied_fields(self):
+        """Return the names of the mutable fields copied from the base dataset or replaced."""
+        return [
+            k
+            for k in dict.__iter__(self)
+            if k not in self._base
+            and isinstance(dict.__getitem__(self, k), (list, dict, set))
+        ]
+
+    def materialize(self):
+        """
+        Copy all the fields still shared with the base dataset.
+
+        :return: the dataset itself
+        :rtype: CopyOnWriteDataset
+        """
+        for k in list(self._base):
+            if dict.__getitem__(self, k) is _SHARED:
+                self._materialize(k)
+        return self
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if value is _SHARED:
+            value = self._materialize(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        self._base.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._base.pop(key, None)
+        dict.__delitem__(self, key)
+
+    def __iter__(self):
+        # Overriding `__iter__` prevents CPython from merging this dictionary
+        # into another one (`dict(ds)`, `{**ds}`, `d.update(ds)`) by reading
+        # its internal storage directly: it has to go through `__getitem__`.
+        return dict.__iter__(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        key = next(reversed(self.keys()))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def copy(self):
+        return dict(self.items())
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self._peek_items()), memo)
+
+    def __reduce_ex__(self, protocol):
+        # Pickled as a regular dictionary, without the reference to the base dataset
+        return dict, (dict(self._peek_items()),)
+
+    def __eq__(self, other):
+        if isinstance(other, CopyOnWriteDataset):
+            other = dict(other._peek_items())
+        if not isinstance(other, dict):
+            return NotImplemented
+        return dict(self._peek_items()) == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self._peek_items()))
+
+
+def copy_on_write_database(db):
+    """
+    Return a copy of a database in which each dataset shares its exchanges and other
+    mutable fields with `db` until a transformation reads them.
+
+    Datasets can be added to or removed from the returned list without affecting `db`.
+
+    :param db: the base database, as a list of dictionaries
+    :type db: list
+    :return: a list of :class:`CopyOnWriteDataset`
+    :rtype: list
+    """
+    return [CopyOnWriteDataset(ds) for ds in db]
+
+
+def count_materialized_datasets(db):
+    """
+    Return the number of datasets of a scenario database that no longer share
+    all of their fields with the base database.
+
+    :param db: a scenario database, as returned by :func:`copy_on_write_database`
+    :type db: list
+    :return: number of datasets with private copies, and total number of datasets
+    :rtype: tuple
+    """
+    return (
+        sum(1 for ds in db if not isinstance(ds, CopyOnWriteDataset) or ds.is_modified),
+        len(db),
+    )
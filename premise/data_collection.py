@@ -1,7 +1,10 @@
 from . import DATA_DIR
 import pandas as pd
 from pathlib import Path
+import functools
+import copy
 import csv
+import os
 
 IAM_ELEC_MARKETS = DATA_DIR / "electricity" / "electricity_markets.csv"
 IAM_ELEC_EFFICIENCIES = DATA_DIR / "electricity" / "electricity_efficiencies.csv"
@@ -10,19 +13,97 @@ GAINS_TO_IAM_FILEPATH = DATA_DIR / "GAINS_emission_factors" / "GAINStoREMINDtech
 GNR_DATA = DATA_DIR / "cement" / "additional_data_GNR.csv"
 
 
+def read_iam_file(model, filepath):
+    """
+    Read an IAM result file and return an `xarray` with dimensions region, variable and year.
+    Files are parsed once per process: scenarios that share a pathway, for different years,
+    share the array. The array must therefore not be modified.
+
+    :param model: "remind" or "image"
+    :type model: str
+    :param filepath: path to the IAM result file
+    :type filepath: Path
+    :return: an multi-dimensional array with IAM data
+    :rtype: xarray.core.dataarray.DataArray
+    """
+    return _read_iam_file(model, str(filepath), os.stat(filepath).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_iam_file(model, filepath, mtime):
+    if model == "remind":
+        df = pd.read_csv(
+            filepath, sep=";", index_col=["Region", "Variable", "Unit"]
+        ).drop(columns=["Model", "Scenario"])
+
+        # Filter the dataframe
+        list_var = ("SE", "Tech", "FE", "Production", "Emi|CCO2", "Emi|CO2")
+
+    elif model == "image":
+        df = pd.read_excel(filepath, index_col=[2, 3, 4]).drop(
+            columns=["Model", "Scenario"]
+        )
+
+        # Filter the dataframe
+        list_var = (
+            "Secondary Energy",
+            "Efficiency",
+            "Final Energy",
+        )
+    else:
+        raise ValueError("The IAM model name {} is not valid. Currently supported: 'remind' or 'image'".format(model))
+
+    if len(df.columns == 20):
+        df.drop(columns=df.columns[-1], inplace=True)
+    df.columns = df.columns.astype(int)
+    df = df.reset_index()
+
+    df = df.loc[df["Variable"].str.startswith(list_var)]
+
+    df = df.rename(
+        columns={"Region": "region", "Variable": "variables", "Unit": "unit"}
+    )
+
+    array = (
+        df.melt(
+            id_vars=["region", "variables", "unit"],
+            var_name="year",
+            value_name="value",
+        )[["region", "variables", "year", "value"]]
+        .groupby(["region", "variables", "year"])["value"]
+        .mean()
+        .to_xarray()
+    )
+
+    return array
+
+
 class IAMDataCollection:
     """
     Class that extracts data from IAM output files.
 
     :ivar pathway: name of a IAM pathway
     :vartype pathway: str
+    :ivar year: year, or list of years (see :meth:`for_years`)
+    :vartype year: int
 
     """
 
+    # Attributes interpolated for :attr:`year`. The other ones do not depend on the year.
+    YEAR_DEPENDENT_ATTRIBUTES = (
+        "gnr_data",
+        "electricity_markets",
+        "electricity_efficiencies",
+        "electricity_emissions",
+        "cement_emissions",
+        "steel_emissions",
+    )
+
     def __init__(self, model, pathway, year, filepath_iam_files):
         self.model = model
         self.pathway = pathway
         self.year = year
+        self.years = list(year) if isinstance(year, (list, tuple)) else [year]
         self.filepath_iam_files = filepath_iam_files
         self.data = self.get_iam_data()
         self.regions = [r for r in self.data.region.values if r != "World"]
@@ -44,6 +125,46 @@ class IAMDataCollection:
         self.cement_emissions = self.get_gains_cement_emissions()
         self.steel_emissions = self.get_gains_steel_emissions()
 
+    @classmethod
+    def for_years(cls, model, pathway, years, filepath_iam_files):
+        """
+        Return one data collection per year, for a given pathway. The IAM file is parsed once,
+        the year-dependent data is interpolated for all the years at once, and the other
+        attributes are shared between the collections.
+
+        :param model: name of the IAM
+        :type model: str
+        :param pathway: name of the IAM pathway
+        :type pathway: str
+        :param years: years
+        :type years: list
+        :param filepath_iam_files: directory of the IAM files
+        :type filepath_iam_files: Path
+        :return: data collections, by year
+        :rtype: dict
+        """
+        batch = cls(model, pathway, sorted(set(years)), filepath_iam_files)
+        return {year: batch.select_year(year) for year in batch.years}
+
+    def select_year(self, year):
+        """
+        Return a data collection for one of the years in :attr:`years`.
+
+        :param year: year
+        :type year: int
+        :return: a data collection, sharing the year-independent attributes with this one
+        :rtype: IAMDataCollection
+        """
+        collection = copy.copy(self)
+        collection.year = year
+        collection.years = [year]
+        for attr in self.YEAR_DEPENDENT_ATTRIBUTES:
+            array = getattr(self, attr)
+            if "year" in array.dims:
+                array = array.sel(year=year)
+            setattr(collection, attr, array)
+        return collection
+
     def get_iam_electricity_emission_labels(self):
         """
         Loads a csv file into a dictionary. This dictionary contains labels of electricity emissions
@@ -117,53 +238,10 @@ class IAMDataCollection:
 
         filepath = Path(self.filepath_iam_files) / file_ext[self.model]
 
-        if self.model == "remind":
-            df = pd.read_csv(
-                filepath, sep=";", index_col=["Region", "Variable", "Unit"]
-            ).drop(columns=["Model", "Scenario"])
-
-            # Filter the dataframe
-            list_var = ("SE", "Tech", "FE", "Production", "Emi|CCO2", "Emi|CO2")
-
-        elif self.model == "image":
-            df = pd.read_excel(filepath, index_col=[2, 3, 4]).drop(
-                columns=["Model", "Scenario"]
-            )
-
-            # Filter the dataframe
-            list_var = (
-                "Secondary Energy",
-                "Efficiency",
-                "Final Energy",
-            )
-        else:
-            raise ValueError("The IAM model name {} is not valid. Currently supported: 'remind' or 'image'".format(self.model))
-
-        if len(df.columns == 20):
-            df.drop(columns=df.columns[-1], inplace=True)
-        df.columns = df.columns.astype(int)
-        df = df.reset_index()
-
-        df = df.loc[df["Variable"].str.startswith(list_var)]
-
-        df = df.rename(
-            columns={"Region": "region", "Variable": "variables", "Unit": "unit"}
-        )
-
-        array = (
-            df.melt(
-                id_vars=["region", "variables", "unit"],
-                var_name="year",
-                value_name="value",
-            )[["region", "variables", "year", "value"]]
-            .groupby(["region", "variables", "year"])["value"]
-            .mean()
-            .to_xarray()
-        )
-
-        return array
+        return read_iam_file(self.model, filepath)
 
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_gains_data():
         """
         Read the GAINS emissions csv file and return an `xarray` with dimensions:
@@ -172,6 +250,8 @@ class IAMDataCollection:
         * sector
         * year
 
+        The file is read once per process, and the array is shared: it must not be modified.
+
         :return: an multi-dimensional array with GAINS emissions data
         :rtype: xarray.core.dataarray.DataArray
 
@@ -217,17 +297,14 @@ class IAMDataCollection:
 
         return array / 8760  # per TWha --> per TWh
 
-    def get_gnr_data(self):
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def read_gnr_data():
         """
-        Read the GNR csv file on cement production and return an `xarray` with dimensions:
-        * region
-        * year
-        * variables
+        Read the GNR csv file on cement production, once per process.
 
-        :return: an multi-dimensional array with GNR data
+        :return: an multi-dimensional array with GNR data, for all the years available
         :rtype: xarray.core.dataarray.DataArray
-
-        :return:
         """
         df = pd.read_csv(GNR_DATA)
         df = df[["region", "year", "variables", "value"]]
@@ -235,10 +312,23 @@ class IAMDataCollection:
         gnr_array = (
             df.groupby(["region", "year", "variables"]).mean()["value"].to_xarray()
         )
-        gnr_array = gnr_array.interpolate_na(
+        return gnr_array.interpolate_na(
             dim="year", method="linear", fill_value="extrapolate"
         )
-        gnr_array = gnr_array.interp(year=self.year)
+
+    def get_gnr_data(self):
+        """
+        Read the GNR csv file on cement production and return an `xarray` with dimensions:
+        * region
+        * year
+        * variables
+
+        :return: an multi-dimensional array with GNR data
+        :rtype: xarray.core.dataarray.DataArray
+
+        :return:
+        """
+        gnr_array = self.read_gnr_data().interp(year=self.year)
         gnr_array = gnr_array.fillna(0)
 
         return gnr_array
@@ -267,8 +357,8 @@ class IAMDataCollection:
 
         # If the year specified is not contained within the range of years given by the IAM
         if (
-            self.year < self.data.year.values.min()
-            or self.year > self.data.year.values.max()
+            min(self.years) < self.data.year.values.min()
+            or max(self.years) > self.data.year.values.max()
         ):
             raise KeyError("year not valid, must be between 2005 and 2100")
 
@@ -306,8 +396,8 @@ class IAMDataCollection:
 
         # If the year specified is not contained within the range of years given by the IAM
         if (
-            self.year < self.data.year.values.min()
-            or self.year > self.data.year.values.max()
+            min(self.years) < self.data.year.values.min()
+            or max(self.years) > self.data.year.values.max()
         ):
             raise KeyError("year not valid, must be between 2005 and 2100")
 
@@ -335,8 +425,8 @@ class IAMDataCollection:
         """
         # If the year specified is not contained within the range of years given by the IAM
         if (
-            self.year < self.gains_data.year.values.min()
-            or self.year > self.gains_data.year.values.max()
+            min(self.years) < self.gains_data.year.values.min()
+            or max(self.years) > self.gains_data.year.values.max()
         ):
             raise KeyError("year not valid, must be between 2005 and 2100")
 
@@ -358,8 +448,8 @@ class IAMDataCollection:
         """
         # If the year specified is not contained within the range of years given by the IAM
         if (
-            self.year < self.gains_data.year.values.min()
-            or self.year > self.gains_data.year.values.max()
+            min(self.years) < self.gains_data.year.values.min()
+            or max(self.years) > self.gains_data.year.values.max()
         ):
             raise KeyError("year not valid, must be between 2005 and 2100")
 
@@ -379,8 +469,8 @@ class IAMDataCollection:
         """
         # If the year specified is not contained within the range of years given by the IAM
         if (
-            self.year < self.gains_data.year.values.min()
-            or self.year > self.gains_data.year.values.max()
+            min(self.years) < self.gains_data.year.values.min()
+            or max(self.years) > self.gains_data.year.values.max()
         ):
             raise KeyError("year not valid, must be between 2005 and 2100")
 
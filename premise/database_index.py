@@ -0,0 +1,427 @@
+from .copy_on_write import CopyOnWriteDataset
+from .filters import Either, Equals, In, compile_filter, filter_rows
+import itertools
+import wurst.searching as ws
+
+# Fields of the datasets that are indexed
+INDEXED_FIELDS = ("name", "reference product", "location", "unit")
+# Pairs of fields indexed together, for queries on both
+INDEXED_PAIRS = (("name", "location"),)
+# Maximum number of combinations of values looked up in an index of pairs
+MAX_PAIR_LOOKUPS = 10000
+# Types of exchanges that do not link a dataset to a supplier
+NON_CONSUMER_EXCHANGES = ("production", "biosphere")
+
+
+class IndexedDatabase(list):
+    """
+    Database (a list of datasets) that keeps hash indexes of its datasets on their name,
+    reference product, location and unit, and on their (name, location) pair, up to date
+    as datasets are appended or removed.
+
+    Queries made with :meth:`get_many` and :meth:`get_one` and the filters of :mod:`premise.filters`
+    are answered from the indexes, in a time proportional to the number of matches instead
+    of the size of the database. Filters that cannot be answered from the indexes
+    (e.g., `contains`, or wurst's filters) are applied to the datasets the other filters selected,
+    or to the whole database if none can be answered from the indexes.
+
+    Datasets are indexed on the values of their fields when they are added. If one of these fields
+    is modified in place afterwards, the dataset must be indexed again with :meth:`reindex`.
+
+    Lists built from the database (e.g., with a list comprehension) are not indexed:
+    datasets should be removed with :meth:`remove_datasets` instead.
+
+    :attr:`version` is incremented every time datasets are added, removed or indexed again,
+    and :meth:`memoize` keeps values derived from the datasets (e.g., the maps of
+    :class:`premise.activity_maps.InventorySet`) until the next change.
+
+    The database also keeps a reverse index from suppliers, identified by the name, product,
+    location and unit of the exchanges that point at them, to the datasets that consume them.
+    It is built the first time :meth:`get_consumers` is called. Exchanges relinked with
+    :meth:`relink_exchange` are kept up to date in it, so that relinking costs in proportion
+    to the number of consumers instead of the total number of exchanges.
+    """
+
+    def __init__(self, datasets=()):
+        super().__init__()
+        self._indexes = {field: {} for field in INDEXED_FIELDS + INDEXED_PAIRS}
+        # Rank of each dataset, to return results in the order of the database
+        self._ranks = {}
+        self._count = 0
+        # Keys of each dataset in the indexes, by id, to unindex it after it was modified
+        self._keys = {}
+        # Supplier name -> (product, location, unit) -> consumers, by id. Built on demand.
+        self._consumers = None
+        # (name, key) entries of each dataset in the index of consumers, by id
+        self._consumer_keys = {}
+        self.version = 0
+        self._memo = {}
+        self.extend(datasets)
+
+    @classmethod
+    def wrap(cls, db):
+        """
+        Return `db` if it is already indexed, or an indexed database with its datasets.
+
+        If `db` is already indexed, its index of consumers is dropped, as the exchanges
+        may have been modified since, and will be built again when needed.
+
+        :param db: a database
+        :type db: list
+        :rtype: IndexedDatabase
+        """
+        if isinstance(db, cls):
+            db._consumers = None
+            db._consumer_keys = {}
+            return db
+        return cls(db)
+
+    @staticmethod
+    def _key(ds, field):
+        if isinstance(field, tuple):
+            return tuple(ds.get(f) for f in field)
+        return ds.get(field)
+
+    def _index(self, ds, rank=None):
+        if rank is None:
+            rank = self._count
+            self._count += 1
+        self._ranks[id(ds)] = rank
+        self.version += 1
+        keys = self._keys[id(ds)] = tuple(self._key(ds, field) for field in self._indexes)
+        for index, key in zip(self._indexes.values(), keys):
+            index.setdefault(key, {})[id(ds)] = ds
+        if self._consumers is not None:
+            self._index_consumer(ds)
+
+    def _unindex(self, ds):
+        if self._ranks.pop(id(ds), None) is None:
+            return
+        self.version += 1
+        # The keys the dataset was indexed on, which its fields may no longer have
+        for index, key in zip(self._indexes.values(), self._keys.pop(id(ds))):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(id(ds), None)
+                if not bucket:
+                    del index[key]
+        self._unindex_consumer(ds)
+
+    def reindex(self, ds):
+        """
+        Index `ds` again, after its name, reference product, location or unit,
+        or its exchanges, have been modified in place.
+        Only the entries of `ds` are updated, and it keeps its rank in the database.
+
+        :param ds: a dataset of the database
+        :type ds: dict
+        """
+        rank = self._ranks[id(ds)]
+        self._unindex(ds)
+        self._index(ds, rank)
+
+    def memoize(self, key, function):
+        """
+        Return the value of `function()`, computed once for each version of the database.
+
+        :param key: identifies the value
+        :type key: hashable
+        :param function: function without arguments that computes the value
+        :type function: callable
+        """
+        version, value = self._memo.get(key, (None, None))
+        if version != self.version:
+            value = function()
+            self._memo[key] = (self.version, value)
+        return value
+
+    # List methods that add or remove datasets
+
+    def append(self, ds):
+        list.append(self, ds)
+        self._index(ds)
+
+    def extend(self, datasets):
+        datasets = list(datasets)
+        list.extend(self, datasets)
+        for ds in datasets:
+            self._index(ds)
+
+    def __iadd__(self, datasets):
+        self.extend(datasets)
+        return self
+
+    def insert(self, i, ds):
+        list.insert(self, i, ds)
+        self._index(ds)
+
+    def remove(self, ds):
+        i = self.index(ds)
+        self._unindex(list.__getitem__(self, i))
+        list.__delitem__(self, i)
+
+    def pop(self, i=-1):
+        ds = list.pop(self, i)
+        self._unindex(ds)
+        return ds
+
+    def clear(self):
+        list.clear(self)
+        for index in self._indexes.values():
+            index.clear()
+        self._ranks.clear()
+        self._keys.clear()
+        self._consumers = None
+        self._consumer_keys = {}
+        self.version += 1
+
+    def __setitem__(self, i, value):
+        removed = list.__getitem__(self, i)
+        list.__setitem__(self, i, value)
+        if isinstance(i, slice):
+            for ds in removed:
+                self._unindex(ds)
+            for ds in list.__getitem__(self, i):
+                self._index(ds)
+        else:
+            self._unindex(removed)
+            self._index(value)
+
+    def __delitem__(self, i):
+        removed = list.__getitem__(self, i)
+        list.__delitem__(self, i)
+        for ds in removed if isinstance(i, slice) else [removed]:
+            self._unindex(ds)
+
+    def remove_datasets(self, condition):
+        """
+        Remove, in place, the datasets for which `condition` is True.
+
+        :param condition: function that takes a dataset
+        :type condition: callable
+        :return: the datasets removed
+        :rtype: list
+        """
+        kept, removed = [], []
+        for ds in self:
+            (removed if condition(ds) else kept).append(ds)
+        list.__setitem__(self, slice(None), kept)
+        for ds in removed:
+            self._unindex(ds)
+        return removed
+
+    # Index of consumers
+
+    def _add_consumer(self, ds, exc):
+        name, key = exc.get("name"), (exc.get("product"), exc.get("location"), exc.get("unit"))
+        self._consumers.setdefault(name, {}).setdefault(key, {})[id(ds)] = ds
+        self._consumer_keys.setdefault(id(ds), []).append((name, key))
+
+    def _unindex_consumer(self, ds):
+        for name, key in self._consumer_keys.pop(id(ds), ()):
+            suppliers = self._consumers.get(name)
+            bucket = suppliers.get(key) if suppliers is not None else None
+            if bucket is not None:
+                bucket.pop(id(ds), None)
+                if not bucket:
+                    del suppliers[key]
+                    if not suppliers:
+                        del self._consumers[name]
+
+    def _index_consumer(self, ds):
+        # Read the exchanges of copy-on-write datasets without copying them
+        exchanges = (
+            ds._peek("exchanges") if isinstance(ds, CopyOnWriteDataset) else ds["exchanges"]
+        )
+        for exc in exchanges:
+            if exc.get("type") not in NON_CONSUMER_EXCHANGES:
+                self._add_consumer(ds, exc)
+
+    def get_consumers(self, *funcs):
+        """
+        Return the exchanges of the database that pass all the filters `funcs`, with their dataset.
+        The filters are tested on the name, product, location and unit of the suppliers
+        the exchanges point at. Production and biosphere exchanges are not returned.
+
+        Datasets removed from the database, and exchanges that no longer pass the filters,
+        are left out: only the datasets that may consume the suppliers are read.
+
+        :return: a list of (dataset, exchange) tuples, in the order of the database
+        :rtype: list
+        """
+        if self._consumers is None:
+            self._consumers = {}
+            for ds in self:
+                self._index_consumer(ds)
+
+        funcs = [compile_filter(f) for f in funcs]
+        names = None
+        for fltr in funcs:
+            field, values = self._get_values(fltr)
+            if field == "name":
+                names = values if names is None else [v for v in names if v in values]
+
+        datasets = {}
+        for name in self._consumers if names is None else names:
+            for (product, location, unit), consumers in self._consumers.get(name, {}).items():
+                supplier = {
+                    "name": name, "product": product, "location": location, "unit": unit
+                }
+                if all(f(supplier) for f in funcs):
+                    datasets.update(consumers)
+
+        ranks = self._ranks
+        return [
+            (ds, exc)
+            for ds in sorted(
+                (ds for i, ds in datasets.items() if i in ranks),
+                key=lambda ds: ranks[id(ds)],
+            )
+            for exc in ds["exchanges"]
+            if exc.get("type") not in NON_CONSUMER_EXCHANGES and all(f(exc) for f in funcs)
+        ]
+
+    def relink_exchange(self, ds, exc, name=None, product=None, location=None, unit=None):
+        """
+        Point the exchange `exc` of `ds` at another supplier, and keep the index of consumers
+        up to date. The fields not given are left unchanged. The `input` field of the exchange
+        is removed, so that it is linked again to the new supplier.
+
+        :param ds: the dataset that consumes the exchange
+        :type ds: dict
+        :param exc: the exchange to relink
+        :type exc: dict
+        """
+        for field, value in (
+            ("name", name), ("product", product), ("location", location), ("unit", unit)
+        ):
+            if value is not None:
+                exc[field] = value
+        exc.pop("input", None)
+        if self._consumers is not None:
+            self._add_consumer(ds, exc)
+
+    def __reduce_ex__(self, protocol):
+        # The indexes are keyed on object ids, and rebuilt when unpickled or copied
+        return type(self), (list(self),)
+
+    # Queries
+
+    def _lookup(self, field, values):
+        index = self._indexes[field]
+        return [index[v] for v in values if v in index]
+
+    @staticmethod
+    def _get_values(fltr):
+        """
+        Return the field and the values a filter selects, if it is an `equals` filter,
+        or an `either` of `equals` filters on the same field.
+        """
+        if isinstance(fltr, Equals):
+            return fltr.field, [fltr.value]
+        if isinstance(fltr, In):
+            return fltr.field, list(fltr.value)
+        if (
+            isinstance(fltr, Either)
+            and fltr.funcs
+            and all(isinstance(f, Equals) for f in fltr.funcs)
+            and len(set(f.field for f in fltr.funcs)) == 1
+        ):
+            return fltr.funcs[0].field, [f.value for f in fltr.funcs]
+        return None, None
+
+    def get_candidates(self, funcs):
+        """
+        Return the smallest set of datasets, by id, the indexes can narrow `funcs` down to,
+        or None if none of the filters can be answered from the indexes.
+        """
+        values = {}
+        for fltr in funcs:
+            field, vals = self._get_values(fltr)
+            if field in INDEXED_FIELDS:
+                if field in values:
+                    values[field] = [v for v in values[field] if v in vals]
+                else:
+                    values[field] = vals
+
+        if not values:
+            return None
+
+        options = [self._lookup(field, vals) for field, vals in values.items()]
+        for pair in INDEXED_PAIRS:
+            if all(f in values for f in pair):
+                combinations = 1
+                for f in pair:
+                    combinations *= len(values[f])
+                if combinations <= MAX_PAIR_LOOKUPS:
+                    options.append(
+                        self._lookup(
+                            pair, itertools.product(*[values[f] for f in pair])
+                        )
+                    )
+
+        buckets = min(options, key=lambda b: sum(len(x) for x in b))
+        if len(buckets) == 1:
+            return buckets[0]
+        candidates = {}
+        for bucket in buckets:
+            candidates.update(bucket)
+        return candidates
+
+    def get_many(self, *funcs):
+        """
+        Return the datasets that pass all the filters `funcs`, in the order of the database.
+        The filters are compiled with :func:`premise.filters.compile_filter`. If none can be
+        answered from the indexes, they are evaluated in batch over the whole database.
+
+        :return: a list of datasets
+        :rtype: list
+        """
+        funcs = [compile_filter(f) for f in funcs]
+        candidates = self.get_candidates(funcs)
+        if candidates is None:
+            return filter_rows(self, *funcs)
+
+        ranks = self._ranks
+        return [
+            ds
+            for ds in sorted(candidates.values(), key=lambda ds: ranks[id(ds)])
+            if all(f(ds) for f in funcs)
+        ]
+
+    def get_one(self, *funcs):
+        """
+        Return the only dataset that passes all the filters `funcs`.
+        Raises ``wurst.errors.NoResults`` or ``wurst.errors.MultipleResults`` otherwise.
+        """
+        results = self.get_many(*funcs)
+        if not results:
+            raise ws.NoResults
+        if len(results) > 1:
+            raise ws.MultipleResults
+        return results[0]
+
+
+def get_many(db, *funcs):
+    """
+    Same as `ws.get_many`, but answered from the indexes if `db` is an :class:`IndexedDatabase`,
+    and with the filters evaluated in batch otherwise.
+
+    :rtype: list
+    """
+    if isinstance(db, IndexedDatabase):
+        return db.get_many(*funcs)
+    return filter_rows(db, *funcs)
+
+
+def get_one(db, *funcs):
+    """
+    Same as `ws.get_one`, but answered from the indexes if `db` is an :class:`IndexedDatabase`,
+    and with the filters evaluated in batch otherwise.
+    """
+    results = get_many(db, *funcs)
+    if not results:
+        raise ws.NoResults
+    if len(results) > 1:
+        raise ws.MultipleResults
+    return results[0]
@@ -16,18 +16,37 @@ from .inventory_imports import (
     CarculatorInventory,
     TruckInventory,
     VariousVehicles,
-    AdditionalInventory
+    AdditionalInventory,
+    InventoryMerger,
+    load_inventories,
 )
 from .cement import Cement
 from .steel import Steel
 from .cars import Cars
 from .export import Export
-from .utils import eidb_label, add_modified_tags
+from .utils import eidb_label, add_modified_tags, get_memory_usage
+from .compact import compact_database, expand_database
+from .copy_on_write import copy_on_write_database
+from .scheduler import Stage, StageScheduler
+from .checkpoint import run_with_checkpoints
+from .inventory_bundle import load_inventory_bundle
+from .profiling import PROFILE_FIELDS, Profiler, write_profile
+from .cache import (
+    get_cache_key,
+    load_database_from_cache,
+    save_database_to_cache,
+    MAX_CACHE_SIZE,
+)
 import wurst
+import pandas as pd
 from pathlib import Path
-import copy
+from concurrent.futures import ProcessPoolExecutor
+from prettytable import PrettyTable
+import multiprocessing
+import gc
 import os
 import contextlib
+import time
 
 
 FILEPATH_CARMA_INVENTORIES = INVENTORY_DIR / "lci-Carma-CCS.xlsx"
@@ -88,6 +107,37 @@ FILEPATH_METHANOL_FROM_NATGAS_FUELS_INVENTORIES = (
 )
 FILEPATH_VARIOUS_VEHICLES = INVENTORY_DIR / "lci-various_vehicles.xlsx"
 
+# Inventories imported by :meth:`NewDatabase.import_inventories`, in the order they are merged
+BUNDLED_INVENTORIES = [
+    (CarmaCCSInventory, FILEPATH_CARMA_INVENTORIES),
+    (CarmaCCSInventory, FILEPATH_CHP_INVENTORIES),
+    (DACInventory, FILEPATH_DAC_INVENTORIES),
+    (BiogasInventory, FILEPATH_BIOGAS_INVENTORIES),
+    (HydrogenInventory, FILEPATH_HYDROGEN_INVENTORIES),
+    (HydrogenInventory, FILEPATH_HYDROGEN_BIOGAS_INVENTORIES),
+    (HydrogenInventory, FILEPATH_HYDROGEN_COAL_GASIFICATION_INVENTORIES),
+    (HydrogenInventory, FILEPATH_HYDROGEN_NATGAS_INVENTORIES),
+    (HydrogenInventory, FILEPATH_HYDROGEN_WOODY_INVENTORIES),
+    (SyngasInventory, FILEPATH_SYNGAS_INVENTORIES),
+    (SyngasInventory, FILEPATH_SYNGAS_FROM_COAL_INVENTORIES),
+    (BiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_COAL_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_BIOGAS_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_BIOMASS_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_BIOMASS_CCS_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_NAT_GAS_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_NAT_GAS_CCS_INVENTORIES),
+    (SynfuelInventory, FILEPATH_SYNFUEL_FROM_PETROLEUM_INVENTORIES),
+    (GeothermalInventory, FILEPATH_GEOTHERMAL_HEAT_INVENTORIES),
+    (LPGInventory, FILEPATH_METHANOL_FUELS_INVENTORIES),
+    (LPGInventory, FILEPATH_METHANOL_FROM_COAL_FUELS_INVENTORIES),
+    (LPGInventory, FILEPATH_METHANOL_FROM_BIOMASS_FUELS_INVENTORIES),
+    (LPGInventory, FILEPATH_METHANOL_FROM_BIOGAS_FUELS_INVENTORIES),
+    (LPGInventory, FILEPATH_METHANOL_FROM_NATGAS_FUELS_INVENTORIES),
+    (VariousVehicles, FILEPATH_VARIOUS_VEHICLES),
+]
+
 SUPPORTED_EI_VERSIONS = ["3.5", "3.6", "3.7", "3.7.1"]
 SUPPORTED_MODELS = ["remind", "image", "static"]
 SUPPORTED_PATHWAYS = [
@@ -154,6 +204,8 @@ LIST_TRANSF_FUNC = [
     "update_solar_PV"
 ]
 
+EXPORT_FORMATS = ["brightway", "matrices", "simapro"]
+
 
 def check_ei_filepath(filepath):
 
@@ -243,6 +295,21 @@ def check_exclude(list_exc):
         return list_exc
 
 
+def check_export(list_exp, supported=EXPORT_FORMATS):
+
+    if list_exp is None:
+        return []
+
+    if isinstance(list_exp, str):
+        list_exp = [list_exp]
+
+    if not set(list_exp).issubset(supported):
+        raise ValueError(
+            f"Only {supported} are currently supported export formats, not {list_exp}."
+        )
+    else:
+        return list(list_exp)
+
 
 def check_fleet(fleet, model, vehicle_type):
     if "fleet file" not in fleet:
@@ -336,12 +403,56 @@ def check_db_version(version):
         return version
 
 
+def expand_scenarios(scenarios):
+    """
+    Replace each scenario given with a list of `years` by one scenario per year.
+
+    :param scenarios: scenarios, with either a `year` or a list of `years`
+    :type scenarios: list
+    :return: scenarios with a `year`
+    :rtype: list
+    """
+    expanded = []
+    for scenario in scenarios:
+        if "years" not in scenario:
+            expanded.append(scenario)
+            continue
+
+        if "year" in scenario:
+            raise ValueError(
+                f"{scenario} should include either `year` or `years`, not both."
+            )
+
+        for year in scenario["years"]:
+            expanded_scenario = {k: v for k, v in scenario.items() if k != "years"}
+            expanded_scenario["year"] = year
+            expanded.append(expanded_scenario)
+
+    return expanded
+
+
+def group_scenarios_by_pathway(scenarios):
+    """
+    Group scenarios that only differ by their year.
+
+    :param scenarios: checked scenarios
+    :type scenarios: list
+    :return: lists of scenarios, by (model, pathway, filepath)
+    :rtype: dict
+    """
+    groups = {}
+    for scenario in scenarios:
+        key = (scenario["model"], scenario["pathway"], scenario["filepath"])
+        groups.setdefault(key, []).append(scenario)
+    return groups
+
+
 def check_scenarios(scenario):
 
     if not all(name in scenario for name in ["model", "pathway", "year"]):
         raise ValueError(
             f"Missing parameters in {scenario}. Needs to include at least `model`,"
-            f"`pathway` and `year`."
+            f"`pathway` and `year` (or `years`)."
         )
 
     if "filepath" in scenario:
@@ -374,6 +485,460 @@ def check_scenarios(scenario):
     return scenario
 
 
+def update_electricity_of_scenario(scenario, version):
+    electricity = Electricity(
+        db=scenario["database"],
+        iam_data=scenario["external data"],
+        model=scenario["model"],
+        pathway=scenario["pathway"],
+        year=scenario["year"],
+    )
+    scenario["database"] = electricity.update_electricity_markets()
+    scenario["database"] = electricity.update_electricity_efficiency()
+    return scenario
+
+
+def update_cement_of_scenario(scenario, version):
+    cement = Cement(
+        db=scenario["database"],
+        model=scenario["model"],
+        scenario=scenario["pathway"],
+        iam_data=scenario["external data"],
+        year=scenario["year"],
+        version=version,
+    )
+
+    scenario["database"] = cement.add_datasets_to_database()
+    return scenario
+
+
+def iam_data_has_steel_sector(iam_data):
+    return (
+        len(
+            [
+                v
+                for v in iam_data.data.variables.values
+                if "steel" in v.lower() and "production" in v.lower()
+            ]
+        )
+        > 0
+    )
+
+
+def update_steel_of_scenario(scenario, version):
+    steel = Steel(
+        db=scenario["database"],
+        model=scenario["model"],
+        iam_data=scenario["external data"],
+        year=scenario["year"],
+    )
+
+    if iam_data_has_steel_sector(scenario["external data"]):
+        scenario["database"] = steel.generate_activities()
+    else:
+        print(
+            "The IAM pathway chosen does not contain any data related to the steel sector.\n"
+            "The creation of IAM region-specific steel production activities and markets will be skipped."
+            "But we will nevertheless adjust hot pollutant emissions and the expected share of recycled steel."
+        )
+        scenario["database"] = steel.generate_activities(industry_module_present=False)
+    return scenario
+
+
+def update_cars_of_scenario(scenario, version):
+    if scenario["passenger cars"]:
+
+        # Import `carculator` inventories if wanted
+        cars = CarculatorInventory(
+            database=scenario["database"],
+            version=version,
+            path=scenario["filepath"],
+            fleet_file=scenario["passenger cars"]["fleet file"],
+            model=scenario["model"],
+            pathway=scenario["pathway"],
+            year=scenario["year"],
+            regions=scenario["passenger cars"]["regions"],
+            filters=scenario["passenger cars"]["filters"],
+        )
+        scenario["database"] = cars.merge_inventory()
+
+        crs = Cars(
+            db=scenario["database"],
+            iam_data=scenario["external data"],
+            pathway=scenario["pathway"],
+            year=scenario["year"],
+            model=scenario["model"],
+        )
+        scenario["database"] = crs.update_cars()
+    return scenario
+
+
+def update_trucks_of_scenario(scenario, version):
+    if scenario["trucks"]:
+
+        # Import `carculator_truck` inventories if wanted
+        trucks = TruckInventory(
+            database=scenario["database"],
+            version=version,
+            path=scenario["filepath"],
+            fleet_file=scenario["trucks"]["fleet file"],
+            model=scenario["model"],
+            pathway=scenario["pathway"],
+            year=scenario["year"],
+            regions=scenario["trucks"]["regions"],
+            filters=scenario["trucks"]["filters"],
+        )
+        scenario["database"] = trucks.merge_inventory()
+    return scenario
+
+
+def update_solar_PV_of_scenario(scenario, version):
+    solar_PV = SolarPV(db=scenario["database"], year=scenario["year"])
+    print("Update efficiency of solar PVs.\n")
+    scenario["database"] = solar_PV.update_efficiency_of_solar_PV()
+    return scenario
+
+
+def get_iam_variables(iam_data, year, condition):
+    """
+    Return the IAM data of the variables that satisfy `condition`, interpolated for `year`.
+    """
+    variables = [v for v in iam_data.data.variables.values if condition(v)]
+    return iam_data.data.sel(variables=variables).interp(year=year)
+
+
+def electricity_inputs(scenario):
+    iam_data = scenario["external data"]
+    return [
+        iam_data.regions,
+        iam_data.electricity_markets,
+        iam_data.electricity_efficiencies,
+        iam_data.electricity_emissions,
+    ]
+
+
+def cement_inputs(scenario):
+    iam_data = scenario["external data"]
+    return [
+        iam_data.regions,
+        iam_data.gnr_data,
+        iam_data.cement_emissions,
+        get_iam_variables(iam_data, scenario["year"], lambda v: "Cement" in v),
+    ]
+
+
+def steel_inputs(scenario):
+    iam_data = scenario["external data"]
+    return [
+        iam_data.regions,
+        iam_data.steel_emissions,
+        get_iam_variables(
+            iam_data,
+            scenario["year"],
+            lambda v: "steel" in v.lower() or v.startswith("SE"),
+        ),
+    ]
+
+
+def vehicles_inputs(scenario, vehicle_type):
+    if not scenario[vehicle_type]:
+        return None
+    iam_data = scenario["external data"]
+    ext = ".mif" if scenario["model"] == "remind" else ".xls"
+    return [
+        iam_data.regions,
+        scenario[vehicle_type],
+        Path(scenario[vehicle_type]["fleet file"]),
+        Path(scenario["filepath"]) / (scenario["model"] + "_" + scenario["pathway"] + ext),
+    ]
+
+
+def get_stage_dependencies(modules, data_files=()):
+    """
+    Return the paths to the modules of premise and to the data files a transformation depends on,
+    with those all the transformations share.
+
+    :param modules: file names of the modules, in the package directory
+    :type modules: list
+    :param data_files: paths to the data files, relative to the data directory
+    :type data_files: list
+    :rtype: list
+    """
+    package_dir = Path(__file__).resolve().parent
+    modules = list(modules) + [
+        "activity_maps.py",
+        "geomap.py",
+        "utils.py",
+        "database_index.py",
+        "filters.py",
+        "columnar.py",
+    ]
+    data_files = list(data_files) + [
+        "regionmappingH12.csv",
+        "ecoinvent_to_gains_emission_mappping.csv",
+        "fuels_lower_heating_value.txt",
+        "fuel_co2_emission_factor.txt",
+    ]
+    return [package_dir / m for m in modules] + [DATA_DIR / f for f in data_files]
+
+
+# Families of datasets each transformation reads, modifies or removes (`writes`),
+# and creates (`adds`), and the files it depends on. See :class:`premise.scheduler.Stage`.
+STAGES = [
+    Stage(
+        "update_electricity",
+        update_electricity_of_scenario,
+        reads=["electricity markets", "power plants", "fuels", "electricity supply"],
+        writes=["electricity markets", "power plants", "electricity supply"],
+        adds=["electricity markets"],
+        inputs=electricity_inputs,
+        dependencies=get_stage_dependencies(
+            ["electricity.py"],
+            [
+                "electricity/electricity_production_volumes_per_tech.csv",
+                "electricity/losses_per_country.csv",
+            ],
+        ),
+    ),
+    Stage(
+        "update_cement",
+        update_cement_of_scenario,
+        reads=["cement", "clinker", "fuels", "electricity markets", "electricity supply"],
+        writes=["cement", "clinker", "cement supply"],
+        adds=["cement", "clinker", "electricity supply"],
+        inputs=cement_inputs,
+        dependencies=get_stage_dependencies(
+            ["cement.py"],
+            [
+                "cement/clinker_ratio_ecoinvent_35.csv",
+                "cement/clinker_ratio_ecoinvent_36.csv",
+                "cement/clinker_ratios.csv",
+            ],
+        ),
+    ),
+    Stage(
+        "update_steel",
+        update_steel_of_scenario,
+        reads=["steel", "fuels", "electricity markets", "electricity supply", "steel supply"],
+        writes=["steel", "steel supply"],
+        adds=["steel", "electricity supply"],
+        inputs=steel_inputs,
+        dependencies=get_stage_dependencies(
+            ["steel.py"],
+            ["steel/steel_recycling_shares.csv", "steel/remind_fuels_correspondance.txt"],
+        ),
+    ),
+    Stage(
+        "update_cars",
+        update_cars_of_scenario,
+        reads=["passenger cars", "passenger car transport", "fuel markets"],
+        writes=["passenger cars", "passenger car transport"],
+        adds=["passenger cars", "electricity supply"],
+        inputs=lambda scenario: vehicles_inputs(scenario, "passenger cars"),
+        dependencies=get_stage_dependencies(["inventory_imports.py", "cars.py"]),
+    ),
+    Stage(
+        "update_trucks",
+        update_trucks_of_scenario,
+        reads=["trucks", "lorry transport"],
+        writes=["trucks", "lorry transport"],
+        adds=["trucks", "electricity supply"],
+        inputs=lambda scenario: vehicles_inputs(scenario, "trucks"),
+        dependencies=get_stage_dependencies(["inventory_imports.py"]),
+    ),
+    Stage(
+        "update_solar_PV",
+        update_solar_PV_of_scenario,
+        reads=["photovoltaic installations"],
+        writes=["photovoltaic installations"],
+        inputs=lambda scenario: scenario["year"],
+        dependencies=get_stage_dependencies(
+            ["renewables.py"], ["renewables/efficiency_solar_PV.csv"]
+        ),
+    ),
+]
+
+# Order in which `NewDatabase.update_all()` applies the transformations
+UPDATE_ALL_ORDER = [
+    "update_cars",
+    "update_trucks",
+    "update_electricity",
+    "update_solar_PV",
+    "update_cement",
+    "update_steel",
+]
+
+
+def transform_scenario(
+    scenario,
+    version,
+    transformations=UPDATE_ALL_ORDER,
+    export=None,
+    filepath=None,
+    skip_up_to_date=False,
+    database_key=None,
+    max_checkpoint_size=MAX_CACHE_SIZE,
+    profiler=None,
+):
+    """
+    Apply a chain of transformations to a single scenario.
+    Scenarios are independent from one another, which allows this function
+    to run in a worker process.
+
+    :param scenario: a scenario, with its `database` and `external data`
+    :type scenario: dict
+    :param version: version of the ecoinvent source database
+    :type version: str
+    :param transformations: names of the transformations to apply, in order
+    :type transformations: list
+    :param export: formats to export the transformed database to ("matrices", "simapro").
+    :type export: list
+    :param filepath: path to store the exported files
+    :type filepath: str
+    :param skip_up_to_date: if True, transformations already applied to the scenario are skipped
+        if none of the datasets they depend on changed since (see :class:`premise.scheduler.StageScheduler`)
+    :type skip_up_to_date: bool
+    :param database_key: key of the database the scenario database was copied from.
+        If given, the state of the database is checkpointed after each transformation,
+        and only the transformations whose IAM inputs changed since a previous run are recomputed.
+    :type database_key: str
+    :param max_checkpoint_size: maximum size of the checkpoint directory, in bytes
+    :type max_checkpoint_size: int
+    :param profiler: records the execution of each transformation and export in `scenario["profile"]`
+    :type profiler: premise.profiling.Profiler
+    :return: the transformed scenario
+    :rtype: dict
+    """
+    scheduler = StageScheduler(STAGES, profiler=profiler, skip_up_to_date=skip_up_to_date)
+
+    if database_key is None:
+        scenario = scheduler.run(scenario, version, transformations)
+    else:
+        scenario = run_with_checkpoints(
+            scheduler,
+            scenario,
+            version,
+            transformations,
+            database_key,
+            max_checkpoint_size,
+        )
+
+    for fmt in export or []:
+        export_scenario(scenario, fmt, filepath, profiler)
+
+    return scenario
+
+
+def export_scenario(scenario, fmt, filepath=None, profiler=None):
+    """
+    Export the database of a single scenario.
+
+    :param scenario: a transformed scenario
+    :type scenario: dict
+    :param fmt: "brightway", "matrices" or "simapro"
+    :type fmt: str
+    :param filepath: path to store the exported files, for "matrices" and "simapro"
+    :type filepath: str
+    :param profiler: records the export in `scenario["profile"]`
+    :type profiler: premise.profiling.Profiler
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Only {EXPORT_FORMATS} are currently supported export formats, not {fmt}."
+        )
+
+    if profiler is not None:
+        with profiler.measure("write_db_to_" + fmt, scenario, detailed=False):
+            export_scenario(scenario, fmt, filepath)
+        return
+
+    # Compact exchanges are empty for serializers that read the hash table of dictionaries
+    database = expand_database(scenario["database"])
+
+    if fmt == "brightway":
+        wurst.write_brightway2_database(
+            database,
+            eidb_label(scenario["model"], scenario["pathway"], scenario["year"]),
+        )
+    elif fmt == "matrices":
+        Export(
+            database,
+            scenario["model"],
+            scenario["pathway"],
+            scenario["year"],
+            filepath,
+        ).export_db_to_matrices()
+    elif fmt == "simapro":
+        Export(
+            database,
+            scenario["model"],
+            scenario["pathway"],
+            scenario["year"],
+            filepath,
+        ).export_db_to_simapro()
+
+
+def run_in_executor(executor, function, list_of_args):
+    """
+    Submit `function` once per set of arguments to `executor` and return
+    the results in the same order as `list_of_args`.
+    """
+    futures = [executor.submit(function, *args) for args in list_of_args]
+    return [f.result() for f in futures]
+
+
+# State shared with the workers forked by `NewDatabase.update_all(fork=True)`.
+# It is set by the parent process right before forking, and the workers inherit
+# it through copy-on-write memory pages instead of receiving a pickled copy.
+_FORKED_STATE = {}
+
+
+def transform_scenario_in_forked_worker(index):
+    """
+    Transform and export the scenario at position `index` of the scenarios inherited
+    from the parent process. Only a summary, with memory measurements, is sent back.
+
+    :param index: position of the scenario in :attr:`NewDatabase.scenarios`
+    :type index: int
+    :return: summary of the run
+    :rtype: dict
+    """
+    state = _FORKED_STATE
+    scenario = state["scenarios"][index]
+    memory_before = get_memory_usage()
+
+    scenario = transform_scenario(
+        scenario,
+        state["version"],
+        UPDATE_ALL_ORDER,
+        skip_up_to_date=state["skip up to date"],
+        database_key=state["database key"],
+        max_checkpoint_size=state["max checkpoint size"],
+        profiler=state["profiler"],
+    )
+
+    for fmt in state["export"]:
+        if fmt == "brightway":
+            # Brightway projects do not support concurrent writes
+            with state["lock"]:
+                export_scenario(scenario, fmt, profiler=state["profiler"])
+        else:
+            export_scenario(scenario, fmt, state["filepath"], state["profiler"])
+
+    memory_after = get_memory_usage()
+
+    return {
+        "model": scenario["model"],
+        "pathway": scenario["pathway"],
+        "year": scenario["year"],
+        "pid": os.getpid(),
+        "private memory at start (MB)": memory_before["private"],
+        "private memory at end (MB)": memory_after["private"],
+        "peak RSS (MB)": memory_after["peak RSS"],
+        "profile": scenario.get("profile", []),
+    }
+
+
 class NewDatabase:
     """
     Class that represents a new wurst inventory database, modified according to IAM data.
@@ -384,6 +949,37 @@ class NewDatabase:
     :vartype source_db: str
     :ivar source_version: version of the ecoinvent source database. Currently works with ecoinvent 3.5, 3.6, 3.7, 3.7.1.
     :vartype source_version: str
+    :ivar use_cache: if True, the cleaned database, with default and additional inventories,
+        is loaded from the cache if available, and stored in the cache otherwise.
+        The cache is in the cache directory of the user (e.g., `~/.cache/premise` on Linux),
+        or in `PREMISE_CACHE_DIR` if this environment variable is set. Each entry is a pickle
+        of the whole database, of several GB for ecoinvent: the oldest entries are removed
+        beyond `max_cache_size`, and :func:`premise.clear_cache` empties the cache.
+        The inventories shipped with premise are then also read from a bundle in the cache
+        (see :mod:`premise.inventory_bundle`); if False, their Excel files are parsed at each import.
+    :vartype use_cache: bool
+    :ivar use_checkpoints: if True, :meth:`update_all` checkpoints the scenario databases after each
+        transformation, and only recomputes the transformations whose IAM inputs changed since a previous run.
+    :vartype use_checkpoints: bool
+    :ivar max_cache_size: maximum size of the cache directory, in bytes.
+    :vartype max_cache_size: int
+    :ivar compact: if True, the exchanges of the database are stored as
+        :class:`premise.compact.CompactExchange` objects, which take less memory than dictionaries.
+        They leave the hash table of the dictionary empty: serializers that read it directly
+        (e.g., `json.dumps` without `indent`, or C extensions) see them as `{}`. The `write_db_to_*`
+        methods expand them first, and code that serializes `db` or the scenario databases
+        otherwise must use :func:`premise.compact.expand_database`: a `UserWarning` says so
+        when the database is compacted.
+    :vartype compact: bool
+    :ivar max_workers: number of processes that extract the ecospold files, read the exchanges of the
+        brightway database, and load the inventory files. Everything runs in the main process if None or 1.
+        With more processes, scripts must guard their entry point with `if __name__ == "__main__":`
+        on the platforms that spawn the processes (Windows, macOS).
+    :vartype max_workers: int
+    :ivar profiler: records the wall time, CPU time, memory and number of datasets added, removed
+        and modified of each stage (extraction, imports, transformations and exports) for each scenario.
+        See :meth:`get_profile`. Pass `Profiler(detailed=True, cprofile=True)` for more details.
+    :vartype profiler: premise.profiling.Profiler
 
     """
 
@@ -394,7 +990,13 @@ class NewDatabase:
         source_version="3.7.1",
         source_type="brightway",
         source_file_path=None,
-        additional_inventories=None
+        additional_inventories=None,
+        use_cache=True,
+        max_cache_size=MAX_CACHE_SIZE,
+        use_checkpoints=False,
+        profiler=None,
+        compact=False,
+        max_workers=None,
     ):
 
         self.source = source_db
@@ -406,30 +1008,93 @@ class NewDatabase:
         else:
             self.source_file_path = None
 
-        self.scenarios = [check_scenarios(scenario) for scenario in scenarios]
+        self.scenarios = [
+            check_scenarios(scenario) for scenario in expand_scenarios(scenarios)
+        ]
 
         if additional_inventories:
             self.additional_inventories = check_additional_inventories(additional_inventories)
         else:
             self.additional_inventories = None
 
+        self.use_cache = use_cache
+        self.use_checkpoints = use_checkpoints
+        self.database_key = None
+        self.worker_stats = []
+        self.max_cache_size = max_cache_size
+        self.profiler = profiler or Profiler()
+        self.compact = compact
+        self.max_workers = max_workers
+        self.db = None
+        self.db = self.load_database()
+
+        if self.compact:
+            with self.profiler.measure("compact_database", get_db=lambda: self.db):
+                compact_database(self.db)
+
+        # Each IAM file is parsed once, and interpolated for all the years requested
+        for (model, pathway, filepath), group in group_scenarios_by_pathway(
+            self.scenarios
+        ).items():
+            collections = IAMDataCollection.for_years(
+                model=model,
+                pathway=pathway,
+                years=[scenario["year"] for scenario in group],
+                filepath_iam_files=filepath,
+            )
+            for scenario in group:
+                scenario["external data"] = collections[scenario["year"]]
+
+        for scenario in self.scenarios:
+            # Scenario databases share unmodified datasets with `self.db`
+            scenario["database"] = copy_on_write_database(self.db)
+
+    def load_database(self):
+        """
+        Return the cleaned database, augmented with the default and additional inventories.
+        If `use_cache` is True, it is loaded from the cache when a cached version built
+        from the same inputs exists, otherwise it is built and stored in the cache.
+        :return: the database, as a list of dictionaries
+        :rtype: list
+        """
+
+        key = None
+        if self.use_cache or self.use_checkpoints:
+            key = get_cache_key(
+                self.source,
+                self.source_type,
+                self.source_file_path,
+                self.version,
+                self.additional_inventories,
+            )
+            self.database_key = key
+
+        if self.use_cache:
+            with self.profiler.measure("load_database_from_cache", get_db=lambda: self.db):
+                self.db = load_database_from_cache(key)
+            db = self.db
+            if db is not None:
+                print(
+                    "\n////////////////////// LOADING CACHED DATABASE ///////////////////////"
+                )
+                print("Cleaned database with additional inventories loaded from cache.")
+                return db
+
         print(
             "\n////////////////////// EXTRACTING SOURCE DATABASE ///////////////////////"
         )
-        self.db = self.clean_database()
+        with self.profiler.measure("clean_database", get_db=lambda: self.db):
+            self.db = self.clean_database()
         print(
             "\n/////////////////// IMPORTING DEFAULT INVENTORIES ////////////////////"
         )
-        self.import_inventories()
+        with self.profiler.measure("import_inventories", get_db=lambda: self.db):
+            self.import_inventories()
 
-        for scenario in self.scenarios:
-            scenario["external data"] = IAMDataCollection(
-                model=scenario["model"],
-                pathway=scenario["pathway"],
-                year=scenario["year"],
-                filepath_iam_files=scenario["filepath"],
-            )
-            scenario["database"] = copy.deepcopy(self.db)
+        if self.use_cache:
+            save_database_to_cache(key, self.db, self.max_cache_size)
+
+        return self.db
 
     def clean_database(self):
         """
@@ -438,7 +1103,7 @@ class NewDatabase:
         :return:
         """
         return DatabaseCleaner(
-            self.source, self.source_type, self.source_file_path
+            self.source, self.source_type, self.source_file_path, max_workers=self.max_workers
         ).prepare_datasets()
 
     def import_inventories(self):
@@ -448,71 +1113,66 @@ class NewDatabase:
         If `add_passenger_cars` and `add_trucks` have been set to `True`,
         or if they have been passed as dictionaries, corresponding inventories will be
         imported as well, otherwise, they will not.
+
+        If `use_cache` is True, the inventories shipped with premise are read from a bundle
+        (see :mod:`premise.inventory_bundle`); otherwise, they are parsed from their Excel file.
+        The inventory files that are not read from the bundle, including the additional inventories,
+        are loaded in a pool of `max_workers` processes, then merged in a fixed order by
+        an :class:`InventoryMerger`, which reports the datasets that already exist in the database. The time spent loading and merging each file is printed.
         """
 
         print("Importing necessary inventories...\n")
-        with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
-            # Add Carma CCS inventories
-            for file in (FILEPATH_CARMA_INVENTORIES, FILEPATH_CHP_INVENTORIES):
-                carma = CarmaCCSInventory(self.db, self.version, file)
-                carma.merge_inventory()
-
-            dac = DACInventory(self.db, self.version, FILEPATH_DAC_INVENTORIES)
-            dac.merge_inventory()
-
-            biogas = BiogasInventory(self.db, self.version, FILEPATH_BIOGAS_INVENTORIES)
-            biogas.merge_inventory()
-
-            for file in (
-                FILEPATH_HYDROGEN_INVENTORIES,
-                FILEPATH_HYDROGEN_BIOGAS_INVENTORIES,
-                FILEPATH_HYDROGEN_COAL_GASIFICATION_INVENTORIES,
-                FILEPATH_HYDROGEN_NATGAS_INVENTORIES,
-                FILEPATH_HYDROGEN_WOODY_INVENTORIES,
-            ):
-
-                hydro = HydrogenInventory(self.db, self.version, file)
-                hydro.merge_inventory()
-
-            for file in (FILEPATH_SYNGAS_INVENTORIES, FILEPATH_SYNGAS_FROM_COAL_INVENTORIES):
-                syngas = SyngasInventory(self.db, self.version, file)
-                syngas.merge_inventory()
-
-            bio = BiofuelInventory(self.db, self.version, FILEPATH_BIOFUEL_INVENTORIES)
-            bio.merge_inventory()
-
-
-            for file in (
-                FILEPATH_SYNFUEL_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_COAL_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_BIOGAS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_BIOMASS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_BIOMASS_CCS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_NAT_GAS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_NAT_GAS_CCS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_PETROLEUM_INVENTORIES,
-            ):
-                synfuel = SynfuelInventory(self.db, self.version, file)
-                synfuel.merge_inventory()
-
-            geo_heat = GeothermalInventory(
-                self.db, self.version, FILEPATH_GEOTHERMAL_HEAT_INVENTORIES
-            )
-            geo_heat.merge_inventory()
 
-            for file in (
-                FILEPATH_METHANOL_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_COAL_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_BIOMASS_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_BIOGAS_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_NATGAS_FUELS_INVENTORIES,
-            ):
+        additional = [
+            (AdditionalInventory, Path(file["filepath"]))
+            for file in self.additional_inventories or []
+        ]
+        timings = PrettyTable(["File", "Loading (s)", "Merging (s)", "Datasets imported"])
+        # A single index of the database finds the datasets that already exist
+        merger = InventoryMerger(self.db)
+
+        def merge(inventory, file, import_db, load_time):
+            start, size = time.time(), len(self.db)
+            merger.merge(
+                inventory, self.version, file, import_db=import_db, is_migrated=load_time is None
+            )
+            timings.add_row(
+                [
+                    file.name,
+                    "bundle" if load_time is None else "{:.2f}".format(load_time),
+                    "{:.2f}".format(time.time() - start),
+                    len(self.db) - size,
+                ]
+            )
 
-                lpg = LPGInventory(self.db, self.version, file)
-                lpg.merge_inventory()
+        with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
+            # The inventories are read from a bundle, already loaded and migrated to
+            # the version of ecoinvent. Excel files are only parsed when they change.
+            if self.use_cache:
+                bundle = load_inventory_bundle(
+                    BUNDLED_INVENTORIES, self.version, max_workers=self.max_workers
+                )
+                inventories = [
+                    (inventory, file, bundle[file.name], None)
+                    for inventory, file in BUNDLED_INVENTORIES
+                ]
+                to_load = additional
+            else:
+                inventories = []
+                to_load = BUNDLED_INVENTORIES + additional
+
+            # The other files are loaded in a pool of processes, if `max_workers` > 1
+            inventories += [
+                (inventory, file, import_db, load_time)
+                for (inventory, file), (import_db, load_time) in zip(
+                    to_load, load_inventories(to_load, self.version, self.max_workers)
+                )
+            ]
 
-            various_veh = VariousVehicles(self.db, self.version, FILEPATH_VARIOUS_VEHICLES)
-            various_veh.merge_inventory()
+            # Each merge depends on the inventories merged before:
+            # they are merged one after the other, always in the same order
+            for args in inventories[: len(BUNDLED_INVENTORIES)]:
+                merge(*args)
 
         print("Done!\n")
 
@@ -522,166 +1182,422 @@ class NewDatabase:
                 "\n/////////////////// IMPORTING USER-DEFINED INVENTORIES ////////////////////"
             )
 
-            for file in self.additional_inventories:
-                additional = AdditionalInventory(self.db, self.version, file["filepath"])
-                additional.merge_inventory()
+            for args in inventories[len(BUNDLED_INVENTORIES):]:
+                merge(*args)
 
             print("Done!\n")
 
+        merger.print_report()
+        print(timings)
 
+    def update_electricity(self, skip_up_to_date=False):
+        """
+        Apply `update_electricity` to each scenario (see :data:`STAGES`).
 
-    def update_electricity(self):
+        :param skip_up_to_date: if True, the scenarios to which it has already been applied
+            are skipped if none of the datasets it depends on changed since.
+            By default, it is applied again.
+        :type skip_up_to_date: bool
+        """
 
         print("\n/////////////////// ELECTRICITY ////////////////////")
 
         for scenario in self.scenarios:
-            if "exclude" not in scenario or "update_electricity" not in scenario["exclude"]:
-                electricity = Electricity(
-                    db=scenario["database"],
-                    iam_data=scenario["external data"],
-                    model=scenario["model"],
-                    pathway=scenario["pathway"],
-                    year=scenario["year"],
-                )
-                scenario["database"] = electricity.update_electricity_markets()
-                scenario["database"] = electricity.update_electricity_efficiency()
+            transform_scenario(
+                scenario,
+                self.version,
+                ["update_electricity"],
+                skip_up_to_date=skip_up_to_date,
+                profiler=self.profiler,
+            )
 
-    def update_cement(self):
+    def update_cement(self, skip_up_to_date=False):
+        """
+        Apply `update_cement` to each scenario (see :data:`STAGES`).
+
+        :param skip_up_to_date: if True, the scenarios to which it has already been applied
+            are skipped if none of the datasets it depends on changed since.
+            By default, it is applied again.
+        :type skip_up_to_date: bool
+        """
         print("\n/////////////////// CEMENT ////////////////////")
 
         for scenario in self.scenarios:
-            if "exclude" not in scenario or "update_cement" not in scenario["exclude"]:
-
-                cement = Cement(
-                    db=scenario["database"],
-                    model=scenario["model"],
-                    scenario=scenario["pathway"],
-                    iam_data=scenario["external data"],
-                    year=scenario["year"],
-                    version=self.version,
-                )
+            transform_scenario(
+                scenario,
+                self.version,
+                ["update_cement"],
+                skip_up_to_date=skip_up_to_date,
+                profiler=self.profiler,
+            )
 
-                scenario["database"] = cement.add_datasets_to_database()
+    def update_steel(self, skip_up_to_date=False):
+        """
+        Apply `update_steel` to each scenario (see :data:`STAGES`).
 
-    def update_steel(self):
+        :param skip_up_to_date: if True, the scenarios to which it has already been applied
+            are skipped if none of the datasets it depends on changed since.
+            By default, it is applied again.
+        :type skip_up_to_date: bool
+        """
         print("\n/////////////////// STEEL ////////////////////")
 
-        if (
-            len(
-                [
-                    v
-                    for v in self.scenarios[0]["external data"].data.variables.values
-                    if "steel" in v.lower() and "production" in v.lower()
-                ]
-            )
-            > 0
-        ):
-
-            for scenario in self.scenarios:
-                if "exclude" not in scenario or "update_steel" not in scenario["exclude"]:
-
-                    steel = Steel(
-                        db=scenario["database"],
-                        model=scenario["model"],
-                        iam_data=scenario["external data"],
-                        year=scenario["year"],
-                    )
-                    scenario["database"] = steel.generate_activities()
-        else:
-            print(
-                "The IAM pathway chosen does not contain any data related to the steel sector.\n"
-                "The creation of IAM region-specific steel production activities and markets will be skipped."
-                "But we will nevertheless adjust hot pollutant emissions and the expected share of recycled steel."
+        for scenario in self.scenarios:
+            transform_scenario(
+                scenario,
+                self.version,
+                ["update_steel"],
+                skip_up_to_date=skip_up_to_date,
+                profiler=self.profiler,
             )
-            for scenario in self.scenarios:
-                if "exclude" not in scenario or "update_steel" not in scenario["exclude"]:
 
-                    steel = Steel(
-                        db=scenario["database"],
-                        model=scenario["model"],
-                        iam_data=scenario["external data"],
-                        year=scenario["year"],
-                    )
-                    scenario["database"] = steel.generate_activities(industry_module_present=False)
+    def update_cars(self, skip_up_to_date=False):
+        """
+        Apply `update_cars` to each scenario (see :data:`STAGES`).
 
-    def update_cars(self):
+        :param skip_up_to_date: if True, the scenarios to which it has already been applied
+            are skipped if none of the datasets it depends on changed since.
+            By default, it is applied again.
+        :type skip_up_to_date: bool
+        """
         print("\n/////////////////// PASSENGER CARS ////////////////////")
 
         for scenario in self.scenarios:
-            if "exclude" not in scenario or "update_cars" not in scenario["exclude"]:
-
-                if scenario["passenger cars"]:
-
-                    # Import `carculator` inventories if wanted
-                    cars = CarculatorInventory(
-                        database=scenario["database"],
-                        version=self.version,
-                        path=scenario["filepath"],
-                        fleet_file=scenario["passenger cars"]["fleet file"],
-                        model=scenario["model"],
-                        pathway=scenario["pathway"],
-                        year=scenario["year"],
-                        regions=scenario["passenger cars"]["regions"],
-                        filters=scenario["passenger cars"]["filters"],
-                    )
-                    scenario["database"] = cars.merge_inventory()
-
-                    crs = Cars(
-                        db=scenario["database"],
-                        iam_data=scenario["external data"],
-                        pathway=scenario["pathway"],
-                        year=scenario["year"],
-                        model=scenario["model"],
-                    )
-                    scenario["database"] = crs.update_cars()
-
+            transform_scenario(
+                scenario,
+                self.version,
+                ["update_cars"],
+                skip_up_to_date=skip_up_to_date,
+                profiler=self.profiler,
+            )
 
+    def update_trucks(self, skip_up_to_date=False):
+        """
+        Apply `update_trucks` to each scenario (see :data:`STAGES`).
 
-    def update_trucks(self):
+        :param skip_up_to_date: if True, the scenarios to which it has already been applied
+            are skipped if none of the datasets it depends on changed since.
+            By default, it is applied again.
+        :type skip_up_to_date: bool
+        """
 
         print("\n/////////////////// MEDIUM AND HEAVY DUTY TRUCKS ////////////////////")
 
         for scenario in self.scenarios:
-            if "exclude" not in scenario or "update_trucks" not in scenario["exclude"]:
-                if scenario["trucks"]:
-
-                    # Import `carculator_truck` inventories if wanted
-
-                    trucks = TruckInventory(
-                        database=scenario["database"],
-                        version=self.version,
-                        path=scenario["filepath"],
-                        fleet_file=scenario["trucks"]["fleet file"],
-                        model=scenario["model"],
-                        pathway=scenario["pathway"],
-                        year=scenario["year"],
-                        regions=scenario["trucks"]["regions"],
-                        filters=scenario["trucks"]["filters"],
-                       )
-                    scenario["database"] = trucks.merge_inventory()
-
-
-    def update_solar_PV(self):
+            transform_scenario(
+                scenario,
+                self.version,
+                ["update_trucks"],
+                skip_up_to_date=skip_up_to_date,
+                profiler=self.profiler,
+            )
+
+    def update_solar_PV(self, skip_up_to_date=False):
+        """
+        Apply `update_solar_PV` to each scenario (see :data:`STAGES`).
+
+        :param skip_up_to_date: if True, the scenarios to which it has already been applied
+            are skipped if none of the datasets it depends on changed since.
+            By default, it is applied again.
+        :type skip_up_to_date: bool
+        """
         print("\n/////////////////// SOLAR PV ////////////////////")
 
         for scenario in self.scenarios:
-            if "exclude" not in scenario or "update_solar_PV" not in scenario["exclude"]:
-                solar_PV = SolarPV(db=scenario["database"], year=scenario["year"])
-                print("Update efficiency of solar PVs.\n")
-                scenario["database"] = solar_PV.update_efficiency_of_solar_PV()
+            transform_scenario(
+                scenario,
+                self.version,
+                ["update_solar_PV"],
+                skip_up_to_date=skip_up_to_date,
+                profiler=self.profiler,
+            )
 
-    def update_all(self):
+    def update_all(
+        self,
+        max_workers=None,
+        executor=None,
+        export=None,
+        filepath=None,
+        fork=False,
+        skip_up_to_date=False,
+    ):
         """
         Shortcut method to execute all transformation functions.
+
+        If `max_workers` or `executor` is given, the whole chain of transformations
+        is applied to each scenario in a separate worker process, and the transformed
+        databases are handed back to :attr:`scenarios`.
+        If `export` is given as well, the workers also export the transformed databases
+        and, to avoid sending them back to the main process, do not hand them back:
+        `scenario["database"]` is then set to None.
+
+        :param max_workers: number of worker processes. Scenarios are processed serially if None.
+        :type max_workers: int
+        :param executor: a `concurrent.futures` executor to use instead of a new process pool.
+        :type executor: concurrent.futures.Executor
+        :param export: formats the workers export the databases to ("matrices", "simapro").
+        :type export: list
+        :param filepath: path provided by the user to store the exported files
+        :type filepath: str
+        :param fork: if True, use forked workers that inherit the database instead of receiving it.
+            See :meth:`update_all_in_forked_workers`.
+        :type fork: bool
+        :param skip_up_to_date: if True, the transformations already applied to a scenario are skipped
+            if none of the datasets they depend on changed since. By default, they are applied again.
+        :type skip_up_to_date: bool
+
+        If :attr:`use_checkpoints` is True, the transformations whose IAM inputs have not changed
+        since a previous run are not recomputed (see :func:`premise.checkpoint.run_with_checkpoints`).
+        """
+
+        if fork:
+            self.update_all_in_forked_workers(
+                max_workers, export, filepath, skip_up_to_date
+            )
+            return
+
+        database_key = self.database_key if self.use_checkpoints else None
+
+        if max_workers is None and executor is None:
+            if database_key is None:
+                self.update_cars(skip_up_to_date)
+                self.update_trucks(skip_up_to_date)
+                self.update_electricity(skip_up_to_date)
+                self.update_solar_PV(skip_up_to_date)
+                self.update_cement(skip_up_to_date)
+                self.update_steel(skip_up_to_date)
+            else:
+                for scenario in self.scenarios:
+                    transform_scenario(
+                        scenario,
+                        self.version,
+                        UPDATE_ALL_ORDER,
+                        skip_up_to_date=skip_up_to_date,
+                        database_key=database_key,
+                        max_checkpoint_size=self.max_cache_size,
+                        profiler=self.profiler,
+                    )
+            return
+
+        # Concurrent writes to the brightway project are not safe
+        export = check_export(export, supported=["matrices", "simapro"])
+
+        print("\n/////////////////// TRANSFORMING SCENARIOS IN PARALLEL ////////////////////")
+
+        list_of_args = [
+            (
+                scenario,
+                self.version,
+                UPDATE_ALL_ORDER,
+                export,
+                filepath,
+                skip_up_to_date,
+                database_key,
+                self.max_cache_size,
+                self.profiler,
+            )
+            for scenario in self.scenarios
+        ]
+
+        if executor is None:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                self.scenarios = run_in_executor(pool, transform_scenario, list_of_args)
+        else:
+            self.scenarios = run_in_executor(executor, transform_scenario, list_of_args)
+
+        if export:
+            for scenario in self.scenarios:
+                scenario["database"] = None
+
+        print("Done!\n")
+
+    def update_all_in_forked_workers(
+        self, max_workers=None, export=None, filepath=None, skip_up_to_date=False
+    ):
+        """
+        Execute all transformation functions for each scenario in a worker process
+        forked after the database has been built, which is only possible on platforms
+        that support `fork` (e.g., Linux).
+
+        The workers inherit :attr:`db` and the scenarios through copy-on-write memory pages,
+        instead of receiving a pickled copy. Each worker transforms one scenario, exports it
+        in the formats given in `export` and exits, so that its memory is released.
+        The transformed databases are not handed back: `scenario["database"]` is set to None.
+
+        Memory measurements for each worker are stored in :attr:`worker_stats`.
+
+        :param max_workers: number of worker processes. Defaults to the number of CPUs.
+        :type max_workers: int
+        :param export: formats to export the databases to ("brightway", "matrices", "simapro").
+        :type export: list
+        :param filepath: path provided by the user to store the exported files
+        :type filepath: str
+        :param skip_up_to_date: if True, the transformations already applied to a scenario are skipped
+            if none of the datasets they depend on changed since
+        :type skip_up_to_date: bool
+        """
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise OSError(
+                "Forked workers are only available on platforms that support `fork`, such as Linux."
+            )
+
+        export = check_export(export)
+
+        if not export:
+            raise ValueError(
+                "Forked workers do not hand the transformed databases back. "
+                f"Specify at least one export format among {EXPORT_FORMATS}."
+            )
+
+        print("\n/////////////////// TRANSFORMING SCENARIOS IN FORKED WORKERS ////////////////////")
+
+        database_key = self.database_key if self.use_checkpoints else None
+
+        context = multiprocessing.get_context("fork")
+        _FORKED_STATE.update(
+            {
+                "scenarios": self.scenarios,
+                "version": self.version,
+                "export": export,
+                "filepath": filepath,
+                "skip up to date": skip_up_to_date,
+                "database key": database_key,
+                "max checkpoint size": self.max_cache_size,
+                "profiler": self.profiler,
+                "lock": context.Lock(),
+            }
+        )
+
+        # Objects that exist before forking are moved out of reach of the garbage collector,
+        # which would otherwise write to them, and copy their memory pages, in every worker.
+        gc.collect()
+        gc.freeze()
+
+        try:
+            with context.Pool(processes=max_workers, maxtasksperchild=1) as pool:
+                self.worker_stats = pool.map(
+                    transform_scenario_in_forked_worker,
+                    range(len(self.scenarios)),
+                    chunksize=1,
+                )
+        finally:
+            gc.unfreeze()
+            _FORKED_STATE.clear()
+
+        for scenario, stats in zip(self.scenarios, self.worker_stats):
+            scenario["database"] = None
+            scenario["profile"] = stats.pop("profile")
+
+        t = PrettyTable(
+            ["Model", "Pathway", "Year", "Private memory at start (MB)",
+             "Private memory at end (MB)", "Peak RSS (MB)"]
+        )
+        for stats in self.worker_stats:
+            t.add_row(
+                [
+                    stats["model"],
+                    stats["pathway"],
+                    stats["year"],
+                    stats["private memory at start (MB)"],
+                    stats["private memory at end (MB)"],
+                    stats["peak RSS (MB)"],
+                ]
+            )
+        print(t)
+        print("Done!\n")
+
+    def stream(self, export=None, filepath=None, skip_up_to_date=False):
         """
+        Transform and export the scenarios one at a time, to bound memory use.
 
-        self.update_cars()
-        self.update_trucks()
-        self.update_electricity()
-        self.update_solar_PV()
-        self.update_cement()
-        self.update_steel()
+        Each scenario goes through all transformation functions, is exported in the formats
+        given in `export`, and is then yielded. Its database is released when the next scenario
+        is requested, so that at most one transformed database is held in memory, on top
+        of :attr:`db`. The outputs of a scenario are available as soon as it is yielded.
 
+        Example::
+
+            for scenario in ndb.stream(export=["brightway"]):
+                print(scenario["model"], scenario["pathway"], scenario["year"])
+
+        :param export: formats to export the databases to ("brightway", "matrices", "simapro").
+        :type export: list
+        :param filepath: path provided by the user to store the exported files
+        :type filepath: str
+        :param skip_up_to_date: if True, the transformations already applied to a scenario are skipped
+            if none of the datasets they depend on changed since
+        :type skip_up_to_date: bool
+        :return: a generator of transformed scenarios
+        :rtype: generator
+        """
+
+        export = check_export(export)
+        database_key = self.database_key if self.use_checkpoints else None
+
+        for scenario in self.scenarios:
+            if scenario["database"] is None:
+                scenario["database"] = copy_on_write_database(self.db)
+                # The transformations applied to the released database must be applied again
+                scenario.pop("stage state", None)
+
+            print(
+                "\n/////////////////// {}, {}, {} ////////////////////".format(
+                    scenario["model"], scenario["pathway"], scenario["year"]
+                )
+            )
+
+            scenario = transform_scenario(
+                scenario,
+                self.version,
+                UPDATE_ALL_ORDER,
+                skip_up_to_date=skip_up_to_date,
+                database_key=database_key,
+                max_checkpoint_size=self.max_cache_size,
+                profiler=self.profiler,
+            )
+
+            for fmt in export:
+                export_scenario(scenario, fmt, filepath, self.profiler)
+
+            try:
+                yield scenario
+            finally:
+                scenario["database"] = None
+                gc.collect()
+                print(
+                    "Scenario released. Peak RSS so far: {} MB.".format(
+                        get_memory_usage()["peak RSS"]
+                    )
+                )
+
+    def get_profile(self):
+        """
+        Return the records of :attr:`profiler`: one row per stage and scenario, with the wall time,
+        the CPU time of the process, the increase of its peak resident set size, and the number
+        of datasets added, removed and modified and of exchanges scanned.
+        The last two are only counted if the profiler is `detailed`.
+
+        :return: a dataframe
+        :rtype: pandas.DataFrame
+        """
+        return pd.DataFrame(
+            self.profiler.get_records(self.scenarios), columns=PROFILE_FIELDS
+        )
+
+    def write_profile(self, fmt="csv", filepath=None):
+        """
+        Write the records of :attr:`profiler` to a CSV or JSON file,
+        by default in the `logs` directory of the data folder.
+
+        :param fmt: "csv" or "json"
+        :type fmt: str
+        :param filepath: path to the file
+        :type filepath: str
+        :return: path to the file
+        :rtype: Path
+        """
+        return write_profile(self.profiler.get_records(self.scenarios), fmt, filepath)
 
     def write_db_to_brightway(self):
         """
@@ -689,10 +1605,7 @@ class NewDatabase:
         """
         print("Write new database(s) to Brightway2.")
         for scenario in self.scenarios:
-            wurst.write_brightway2_database(
-                scenario["database"],
-                eidb_label(scenario["model"], scenario["pathway"], scenario["year"]),
-            )
+            export_scenario(scenario, "brightway", profiler=self.profiler)
 
     def write_db_to_matrices(self, filepath=None):
         """
@@ -706,13 +1619,7 @@ class NewDatabase:
         """
         print("Write new database(s) to matrix.")
         for scenario in self.scenarios:
-            Export(
-                scenario["database"],
-                scenario["model"],
-                scenario["pathway"],
-                scenario["year"],
-                filepath,
-            ).export_db_to_matrices()
+            export_scenario(scenario, "matrices", filepath, self.profiler)
 
     def write_db_to_simapro(self, filepath=None):
         """
@@ -725,13 +1632,7 @@ class NewDatabase:
 
         print("Write Simapro import file(s).")
         for scenario in self.scenarios:
-            Export(
-                scenario["database"],
-                scenario["model"],
-                scenario["pathway"],
-                scenario["year"],
-                filepath,
-            ).export_db_to_simapro()
+            export_scenario(scenario, "simapro", filepath, self.profiler)
 
     def write_db_to_brightway25(self):
         """
@@ -743,7 +1644,7 @@ class NewDatabase:
         # We add a `modified` label to any new activity or any new or modified exchange
         self.scenarios = add_modified_tags(self.db, self.scenarios)
         for scenario in self.scenarios:
-            wurst.write_brightway25_database(scenario["database"],
+            wurst.write_brightway25_database(expand_database(scenario["database"]),
                                              eidb_label(
                                                  scenario["model"],
                                                  scenario["pathway"],
@@ -0,0 +1,157 @@
+"""
+Parallel extraction of an ecospold2 database.
+
+`bw2io.SingleOutputEcospold2Importer` parses the ecospold2 files, in a pool of processes with
+`use_mp=True` (the default), then applies its strategies to the whole database, on a single core.
+Parsing the files is thus already parallel: what this module adds is applying the strategies
+in parallel too. Most of the first strategies (normalising units and
+locations, choosing the reference product, building the codes of the datasets, etc.) only look
+at one dataset at a time. :class:`ParallelEcospold2Importer` splits the directory in shards of
+files, parses them and applies these strategies in a pool of processes, merges the datasets
+in the order of the files, then applies the other strategies, which link the datasets
+together, to the whole database.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import os
+import time
+
+import bw2io
+from bw2io.extractors.ecospold2 import Ecospold2DataExtractor
+
+# Strategies of `bw2io.SingleOutputEcospold2Importer` that modify each dataset independently
+# of the others, and can be applied to shards of the database
+PER_DATASET_STRATEGIES = (
+    "normalize_units",
+    "update_ecoinvent_locations",
+    "remove_zero_amount_coproducts",
+    "remove_zero_amount_inputs_with_no_activity",
+    "remove_unnamed_parameters",
+    "es2_assign_only_product_with_amount_as_reference_product",
+    "assign_single_product_as_activity",
+    "create_composite_code",
+    "drop_unspecified_subcategories",
+    "fix_ecoinvent_flows_pre35",
+    "drop_temporary_outdated_biosphere_flows",
+)
+# Number of shards per worker, so that workers that finish early get more work
+SHARDS_PER_WORKER = 4
+
+
+def list_ecospold_files(dirpath):
+    """
+    Return the names of the ecospold2 files of `dirpath`, in the order
+    `bw2io.SingleOutputEcospold2Importer` reads them.
+
+    :param dirpath: directory of the ecospold2 files
+    :type dirpath: str
+    :return: a list of file names
+    :rtype: list
+    """
+    return [
+        filename
+        for filename in os.listdir(dirpath)
+        if os.path.isfile(os.path.join(dirpath, filename))
+        and filename.split(".")[-1].lower() == "spold"
+    ]
+
+
+def split_strategies(strategies):
+    """
+    Split `strategies` in the strategies at their beginning that can be applied to shards
+    of the database (see :const:`PER_DATASET_STRATEGIES`), and the following ones.
+
+    :param strategies: strategies of an importer, in the order they are applied
+    :type strategies: list
+    :return: a tuple with the list of strategies for the shards, and the list of the other strategies
+    :rtype: tuple
+    """
+    n = 0
+    while (
+        n < len(strategies)
+        and getattr(strategies[n], "__name__", None) in PER_DATASET_STRATEGIES
+    ):
+        n += 1
+    return list(strategies[:n]), list(strategies[n:])
+
+
+def shard(filenames, n_shards):
+    """
+    Split `filenames` in at most `n_shards` contiguous shards of similar sizes.
+
+    :return: a list of lists of file names
+    :rtype: list
+    """
+    n_shards = max(1, min(n_shards, len(filenames)))
+    size, rest = divmod(len(filenames), n_shards)
+    shards, start = [], 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < rest else 0)
+        shards.append(filenames[start:end])
+        start = end
+    return shards
+
+
+def extract_shard(dirpath, filenames, db_name, strategies):
+    """
+    Parse the ecospold2 files `filenames` and apply `strategies` to the datasets.
+
+    :return: a list of datasets, in the order of `filenames`
+    :rtype: list
+    """
+    data = [
+        Ecospold2DataExtractor.extract_activity(dirpath, filename, db_name)
+        for filename in filenames
+    ]
+    for strategy in strategies:
+        data = strategy(data)
+    return data
+
+
+class _FileLister:
+    """
+    Extractor given to `bw2io.SingleOutputEcospold2Importer` by :class:`ParallelEcospold2Importer`,
+    which only lists the files: they are parsed afterwards, in parallel.
+    """
+
+    @classmethod
+    def extract(cls, dirpath, db_name, use_mp=True):
+        return list_ecospold_files(dirpath)
+
+
+class ParallelEcospold2Importer(bw2io.SingleOutputEcospold2Importer):
+    """
+    Importer of an ecospold2 database that parses the files, and applies the strategies that
+    modify each dataset independently, in a pool of processes. `bw2io` already parses the
+    files in parallel with `use_mp=True`: the gain comes from the strategies applied by the workers.
+    After :meth:`apply_strategies`, :attr:`data` is the same as with
+    `bw2io.SingleOutputEcospold2Importer`.
+
+    :ivar max_workers: number of processes. Defaults to the number of processors.
+    :vartype max_workers: int
+    """
+
+    def __init__(self, dirpath, db_name, max_workers=None, **kwargs):
+        # The base importer only lists the files here, and its report of the number of
+        # datasets extracted would be misleading
+        with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
+            super().__init__(dirpath, db_name, extractor=_FileLister, **kwargs)
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        filenames = self.data
+        shard_strategies, self.strategies = split_strategies(self.strategies)
+        shards = shard(filenames, self.max_workers * SHARDS_PER_WORKER)
+
+        start = time.time()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            results = [
+                pool.submit(extract_shard, dirpath, files, db_name, shard_strategies)
+                for files in shards
+            ]
+            self.data = [ds for result in results for ds in result.result()]
+
+        print(
+            "Extracted and normalized {} datasets in {:.2f} seconds with {} processes".format(
+                len(self.data), time.time() - start, self.max_workers
+            )
+        )
@@ -1,12 +1,21 @@
 import os
 from . import DATA_DIR
 from .activity_maps import InventorySet
+from .columnar import ColumnarExchanges
 from .geomap import Geomap
+from .database_index import IndexedDatabase
+from .filters import (
+    compile_filter,
+    contains,
+    doesnt_contain_any,
+    either,
+    equals,
+    exclude,
+)
 from wurst import searching as ws
 import csv
 import numpy as np
 import uuid
-import wurst
 from .utils import get_lower_heating_values
 from datetime import date
 
@@ -27,7 +36,7 @@ class Electricity:
     """
 
     def __init__(self, db, iam_data, model, pathway, year):
-        self.db = db
+        self.db = IndexedDatabase.wrap(db)
         self.iam_data = iam_data
         self.model = model
         self.geo = Geomap(model=model)
@@ -38,6 +47,9 @@ class Electricity:
         self.fuels_lhv = get_lower_heating_values()
         mapping = InventorySet(self.db)
         self.emissions_map = mapping.get_remind_to_ecoinvent_emissions()
+        self.emissions_filter = compile_filter(
+            either(*[contains("name", x) for x in self.emissions_map])
+        )
         self.powerplant_map = mapping.generate_powerplant_map()
         self.powerplant_fuels_map = mapping.generate_powerplant_fuels_map()
 
@@ -46,6 +58,9 @@ class Electricity:
         Return a list of electricity-producing datasets which location and name correspond to the region and name given,
         respectively.
 
+        Suppliers are looked up in the indexes of :attr:`db`, by name and location.
+        The datasets are returned in the order they appear in :attr:`db`.
+
         :param ecoinvent_regions: an ecoinvent region
         :type ecoinvent_regions: list
         :param ecoinvent_technologies: name of ecoinvent dataset
@@ -54,18 +69,10 @@ class Electricity:
         :rtype: list
         """
 
-        return ws.get_many(
-            self.db,
-            *[
-                ws.either(
-                    *[
-                        ws.equals("name", supplier)
-                        for supplier in ecoinvent_technologies
-                    ]
-                ),
-                ws.either(*[ws.equals("location", loc) for loc in ecoinvent_regions]),
-                ws.equals("unit", "kilowatt hour"),
-            ]
+        return self.db.get_many(
+            either(*[equals("name", supplier) for supplier in set(ecoinvent_technologies)]),
+            either(*[equals("location", loc) for loc in set(ecoinvent_regions)]),
+            equals("unit", "kilowatt hour"),
         )
 
     @staticmethod
@@ -813,47 +820,37 @@ class Electricity:
 
         # Filter all activities that consume high voltage electricity
 
-        for ds in ws.get_many(
-            self.db, ws.exclude(ws.contains("name", "market group for electricity"))
+        for ds, exc in self.db.get_consumers(
+            either(
+                contains("name", "market for electricity"),
+                contains("name", "electricity voltage transformation"),
+                contains("name", "market group for electricity"),
+            ),
+            doesnt_contain_any("name", ["cobalt", "aluminium", "coal mining"]),
         ):
-
-            for exc in ws.get_many(
-                ds["exchanges"],
-                *[
-                    ws.either(
-                        *[
-                            ws.contains("name", "market for electricity"),
-                            ws.contains("name", "electricity voltage transformation"),
-                            ws.contains("name", "market group for electricity"),
-                        ]
-                    ),
-                    ws.doesnt_contain_any("name", ["cobalt", "aluminium", "coal mining"])
-                ]
-            ):
-                if exc["type"] != "production" and exc["unit"] == "kilowatt hour":
-                    if "high" in exc["product"]:
-                        exc["name"] = "market group for electricity, high voltage"
-                        exc["product"] = "electricity, high voltage"
-                        exc["location"] = self.geo.ecoinvent_to_iam_location(
-                            exc["location"]
-                        )
-                    if "medium" in exc["product"]:
-                        exc["name"] = "market group for electricity, medium voltage"
-                        exc["product"] = "electricity, medium voltage"
-                        try:
-                            exc["location"] = self.geo.ecoinvent_to_iam_location(
-                                exc["location"]
-                            )
-                        except KeyError:
-                            print(exc)
-                    if "low" in exc["product"]:
-                        exc["name"] = "market group for electricity, low voltage"
-                        exc["product"] = "electricity, low voltage"
-                        exc["location"] = self.geo.ecoinvent_to_iam_location(
-                            exc["location"]
-                        )
-                if "input" in exc:
-                    exc.pop("input")
+            if "market group for electricity" in ds["name"]:
+                continue
+
+            if exc["unit"] != "kilowatt hour":
+                exc.pop("input", None)
+                continue
+
+            for voltage in ("high", "medium", "low"):
+                if voltage in exc["product"]:
+                    try:
+                        location = self.geo.ecoinvent_to_iam_location(exc["location"])
+                    except KeyError:
+                        if voltage != "medium":
+                            raise
+                        print(exc)
+                        location = None
+                    self.db.relink_exchange(
+                        ds,
+                        exc,
+                        name="market group for electricity, {} voltage".format(voltage),
+                        product="electricity, {} voltage".format(voltage),
+                        location=location,
+                    )
 
     def find_ecoinvent_fuel_efficiency(self, ds, fuel_filters):
         """
@@ -1051,38 +1048,47 @@ class Electricity:
             dict_technology = technologies_map[remind_technology]
             print("Rescale inventories and emissions for", remind_technology)
 
-            datasets = [d for d in self.db
-                        if d["name"] in dict_technology["technology filters"]
-                        and d["unit"] == "kilowatt hour"
-                        ]
+            datasets = self.db.get_many(
+                either(*[equals("name", n) for n in dict_technology["technology filters"]]),
+                equals("unit", "kilowatt hour"),
+            )
 
             # no activities found? Check filters!
             assert len(datasets) > 0, "No dataset found for {}".format(remind_technology)
+
+            scaling_factors = []
             for ds in datasets:
                 # Modify using remind efficiency values:
                 scaling_factor = dict_technology["eff_func"](
                     ds, dict_technology["fuel filters"], remind_technology
                 )
                 self.update_ecoinvent_efficiency_parameter(ds, scaling_factor)
+                scaling_factors.append(float(scaling_factor))
 
-                # Rescale all the technosphere exchanges according to REMIND efficiency values
-                wurst.change_exchanges_by_constant_factor(
-                    ds,
-                    float(scaling_factor),
-                    [],
-                    [ws.doesnt_contain_any("name", self.emissions_map)],
-                )
+            exchanges = ColumnarExchanges(datasets)
+
+            # Rescale all the technosphere exchanges according to REMIND efficiency values
+            exchanges.rescale(
+                scaling_factors,
+                exchanges.select(types=("technosphere",))
+                | exchanges.select(exclude(self.emissions_filter), types=("biosphere",)),
+            )
 
-                # Update biosphere exchanges according to GAINS emission values
-                for exc in ws.biosphere(
-                    ds, ws.either(*[ws.contains("name", x) for x in self.emissions_map])
-                ):
-                    remind_emission_label = self.emissions_map[exc["name"]]
+            # Update biosphere exchanges according to GAINS emission values
+            emissions = exchanges.select(self.emissions_filter, types=("biosphere",))
+            values = np.zeros(len(exchanges.amount))
+            cache = {}
+            for i in np.flatnonzero(emissions):
+                location = datasets[exchanges.consumer[i]]["location"]
+                remind_emission_label = self.emissions_map[
+                    exchanges.suppliers[exchanges.supplier[i]][0]
+                ]
 
-                    remind_emission = self.iam_data.electricity_emissions.loc[
+                if (location, remind_emission_label) not in cache:
+                    cache[(location, remind_emission_label)] = self.iam_data.electricity_emissions.loc[
                         dict(
                             region=self.geo.iam_to_GAINS_region(
-                                self.geo.ecoinvent_to_iam_location(ds["location"])
+                                self.geo.ecoinvent_to_iam_location(location)
                             ),
                             pollutant=remind_emission_label,
                             sector=self.iam_data.electricity_emission_labels[
@@ -1091,12 +1097,10 @@ class Electricity:
                         )
                     ].values.item(0)
 
-                    if exc["amount"] == 0:
-                        wurst.rescale_exchange(
-                            exc, remind_emission / 1, remove_uncertainty=True
-                        )
-                    else:
-                        wurst.rescale_exchange(exc, remind_emission / exc["amount"])
+                values[i] = cache[(location, remind_emission_label)]
+
+            exchanges.rescale_to(values, emissions)
+            exchanges.write_back()
 
         return self.db
 
@@ -1147,10 +1151,10 @@ class Electricity:
             for line in markets_to_delete:
                 writer.writerow(line)
 
-        self.db = [
-            i for i in self.db if not any(stop in i["name"] for stop in list_to_remove)
-            or any(w for w in ("cobalt", "aluminium", "coal mining") if w in i["name"])
-        ]
+        self.db.remove_datasets(
+            lambda i: any(stop in i["name"] for stop in list_to_remove)
+            and not any(w for w in ("cobalt", "aluminium", "coal mining") if w in i["name"])
+        )
 
         # We then need to create high voltage REMIND electricity markets
         print("Create high voltage markets.")
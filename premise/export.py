@@ -1,5 +1,6 @@
 import os
 from . import DATA_DIR, __version__
+from .biosphere import get_biosphere_registry
 import csv
 from pathlib import Path
 import datetime
@@ -37,34 +38,22 @@ def create_codes_index_of_A_matrix(db):
     return {db[i]["code"]: i for i in range(0, len(db))}
 
 def create_codes_index_of_B_matrix():
-    if not FILEPATH_BIOSPHERE_FLOWS.is_file():
-        raise FileNotFoundError(
-            "The dictionary of biosphere flows could not be found."
-        )
-
-    csv_dict = dict()
-
-    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
-        input_dict = csv.reader(f, delimiter=";")
-        for i, row in enumerate(input_dict):
-            csv_dict[row[-1]] = i
-
-    return csv_dict
+    """
+    Create a dictionary with the codes of the biosphere flows as keys and the row indices
+    of the B matrix as values. The file of biosphere flows is read once per process.
+    :return: a dictionary to map biosphere flow codes to indices
+    :rtype: dict
+    """
+    return get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS).index_by_code
 
 def create_index_of_B_matrix():
-    if not FILEPATH_BIOSPHERE_FLOWS.is_file():
-        raise FileNotFoundError(
-            "The dictionary of biosphere flows could not be found."
-        )
-
-    csv_dict = dict()
-
-    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
-        input_dict = csv.reader(f, delimiter=";")
-        for i, row in enumerate(input_dict):
-            csv_dict[(row[0], row[1], row[2], row[3])] = i
-
-    return csv_dict
+    """
+    Create a dictionary with tuples (flow name, category, subcategory, unit) as keys and
+    the row indices of the B matrix as values. The file of biosphere flows is read once per process.
+    :return: a dictionary to map biosphere flows to indices
+    :rtype: dict
+    """
+    return get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS).index_by_key
 
 
 class Export:
@@ -239,19 +228,7 @@ class Export:
 
     @staticmethod
     def create_rev_index_of_B_matrix():
-        if not FILEPATH_BIOSPHERE_FLOWS.is_file():
-            raise FileNotFoundError(
-                "The dictionary of biosphere flows could not be found."
-            )
-
-        csv_dict = {}
-
-        with open(FILEPATH_BIOSPHERE_FLOWS) as f:
-            input_dict = csv.reader(f, delimiter=";")
-            for row in input_dict:
-                csv_dict[row[-1]] = (row[0], row[1], row[2], row[3])
-
-        return csv_dict
+        return get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS).key_by_code
 
     @staticmethod
     def get_simapro_biosphere_dictionnary():
@@ -0,0 +1,272 @@
+"""
+Filters with the same behaviour as those of `wurst.searching` (`ws.equals`, `ws.contains`, etc.),
+which can be passed to `ws.get_many` and `ws.get_one` as well.
+Unlike wurst's closures, they expose the field and value they test, so that
+:class:`premise.database_index.IndexedDatabase` can answer them from its indexes.
+
+Composite filters, such as `either(*[equals("name", n) for n in names])`, can be compiled
+with :func:`compile_filter` into set-membership tests and precompiled regular expressions,
+and evaluated in batch over the columns of a list of datasets or exchanges with :func:`filter_rows`.
+"""
+import re
+
+import numpy as np
+
+
+class Filter:
+    """Base class of the filters. A filter is called with a dataset or an exchange."""
+
+    def __call__(self, x):
+        raise NotImplementedError
+
+    def mask(self, columns):
+        """
+        Evaluate the filter on all the rows of `columns`.
+
+        :param columns: columnar view of datasets or exchanges
+        :type columns: Columns
+        :return: a boolean array, True for the rows that pass the filter
+        :rtype: numpy.ndarray
+        """
+        return np.fromiter((self(x) for x in columns.rows), bool, len(columns.rows))
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join(repr(v) for k, v in vars(self).items() if k != "pattern"),
+        )
+
+
+class FieldFilter(Filter):
+    """Filter that tests the value of a single field."""
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+    def test(self, value):
+        """Test the value of the field."""
+        raise NotImplementedError
+
+    def __call__(self, x):
+        return self.test(x.get(self.field))
+
+    def _safe_test(self, value):
+        try:
+            return self.test(value)
+        except (TypeError, AttributeError):
+            # e.g., `contains` on a missing field
+            return False
+
+    def mask(self, columns):
+        # Each distinct value of the column is tested once
+        values, codes = columns.get(self.field)
+        results = np.fromiter((self._safe_test(v) for v in values), bool, len(values))
+        return results[codes]
+
+
+class Equals(FieldFilter):
+    def test(self, value):
+        return value == self.value
+
+
+class Contains(FieldFilter):
+    def test(self, value):
+        return self.value in value
+
+
+class StartsWith(FieldFilter):
+    def test(self, value):
+        return (value if value is not None else "").startswith(self.value)
+
+
+class In(FieldFilter):
+    """Compiled `either` of `equals` filters on the same field: a set-membership test."""
+
+    def __init__(self, field, values):
+        super().__init__(field, frozenset(values))
+
+    def test(self, value):
+        return value in self.value
+
+
+class ContainsAny(FieldFilter):
+    """Compiled `either` of `contains` filters on the same field: a precompiled regular expression."""
+
+    def __init__(self, field, values):
+        super().__init__(field, tuple(values))
+        self.pattern = re.compile("|".join(re.escape(v) for v in self.value))
+
+    def test(self, value):
+        return self.pattern.search(value) is not None
+
+
+class StartsWithAny(FieldFilter):
+    """Compiled `either` of `startswith` filters on the same field."""
+
+    def __init__(self, field, values):
+        super().__init__(field, tuple(values))
+
+    def test(self, value):
+        return (value if value is not None else "").startswith(self.value)
+
+
+class Either(Filter):
+    def __init__(self, *funcs):
+        self.funcs = funcs
+
+    def __call__(self, x):
+        return any(f(x) for f in self.funcs)
+
+    def mask(self, columns):
+        result = np.zeros(len(columns.rows), bool)
+        for f in self.funcs:
+            result |= mask(f, columns)
+        return result
+
+
+class Exclude(Filter):
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, x):
+        return not self.func(x)
+
+    def mask(self, columns):
+        return ~mask(self.func, columns)
+
+
+def equals(field, value):
+    """Return a filter where input ``field`` value is equal to ``value``"""
+    return Equals(field, value)
+
+
+def contains(field, value):
+    """Return a filter where ``value`` is in input ``field`` value"""
+    return Contains(field, value)
+
+
+def startswith(field, value):
+    """Return a filter where input ``field`` value starts with ``value``"""
+    return StartsWith(field, value)
+
+
+def either(*funcs):
+    """Return a filter that is True if any of the filters ``funcs`` is True"""
+    return Either(*funcs)
+
+
+def exclude(func):
+    """Return the opposite of the filter ``func``"""
+    return Exclude(func)
+
+
+def doesnt_contain_any(field, values):
+    """Return a filter that excludes the inputs whose ``field`` contains any of ``values``"""
+    return Exclude(Either(*[Contains(field, value) for value in values]))
+
+
+# Types of filters merged by :func:`compile_filter`, and what they are merged into
+_MERGED_FILTERS = {Equals: In, In: In, Contains: ContainsAny, ContainsAny: ContainsAny,
+                   StartsWith: StartsWithAny, StartsWithAny: StartsWithAny}
+
+
+def compile_filter(fltr):
+    """
+    Return a filter equivalent to `fltr`, in which the filters of an `either` that test
+    the same field the same way are merged: `equals` filters into a set-membership test,
+    `contains` filters into a precompiled regular expression, and `startswith` filters
+    into a single test.
+
+    Filters that are not from this module (e.g., wurst's filters) are returned as they are.
+
+    :param fltr: a filter
+    :type fltr: callable
+    :rtype: callable
+    """
+    if isinstance(fltr, Exclude):
+        return Exclude(compile_filter(fltr.func))
+    if not isinstance(fltr, Either):
+        return fltr
+
+    groups, others = {}, []
+    for f in (compile_filter(f) for f in fltr.funcs):
+        if type(f) in _MERGED_FILTERS:
+            groups.setdefault((_MERGED_FILTERS[type(f)], f.field), []).append(f)
+        elif isinstance(f, Either):
+            others.extend(f.funcs)
+        else:
+            others.append(f)
+
+    funcs = []
+    for (cls, field), filters in groups.items():
+        values = []
+        for f in filters:
+            values.extend(f.value if type(f) is cls else [f.value])
+        try:
+            funcs.append(cls(field, values) if len(filters) > 1 else filters[0])
+        except TypeError:
+            # Values that cannot be merged, e.g., values that are not hashable
+            funcs.extend(filters)
+    funcs.extend(others)
+    return funcs[0] if len(funcs) == 1 else Either(*funcs)
+
+
+class Columns:
+    """
+    Columnar view of a list of datasets or exchanges. The values of each field are factorized
+    the first time the field is read, so that filters test each distinct value only once.
+
+    :ivar rows: the datasets or exchanges
+    :vartype rows: list
+    """
+
+    def __init__(self, rows):
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self._columns = {}
+
+    def get(self, field):
+        """
+        Return the distinct values of `field`, and for each row, the position of its value.
+
+        :rtype: tuple
+        """
+        if field not in self._columns:
+            positions = {}
+            codes = np.fromiter(
+                (positions.setdefault(x.get(field), len(positions)) for x in self.rows),
+                np.intp,
+                len(self.rows),
+            )
+            self._columns[field] = (list(positions), codes)
+        return self._columns[field]
+
+
+def mask(fltr, columns):
+    """
+    Evaluate the filter `fltr` on all the rows of `columns`.
+    Filters that are not from this module are called on each row.
+
+    :rtype: numpy.ndarray
+    """
+    if isinstance(fltr, Filter):
+        return fltr.mask(columns)
+    return np.fromiter((fltr(x) for x in columns.rows), bool, len(columns.rows))
+
+
+def filter_rows(rows, *funcs):
+    """
+    Return the datasets or exchanges of `rows` that pass all the filters `funcs`, in order.
+    Same as `list(ws.get_many(rows, *funcs))`, but the filters are compiled and evaluated
+    in batch over the columns of `rows`. Rows whose value cannot be tested by a filter
+    (e.g., a missing field for `contains`) do not pass that filter, instead of raising an error.
+
+    :param rows: datasets or exchanges
+    :type rows: list
+    :rtype: list
+    """
+    columns = Columns(rows)
+    result = np.ones(len(columns.rows), bool)
+    for fltr in funcs:
+        result &= mask(compile_filter(fltr), columns)
+    return [columns.rows[i] for i in np.flatnonzero(result)]
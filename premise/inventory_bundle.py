@@ -0,0 +1,192 @@
+"""
+Bundle of the inventories shipped with premise, loaded and migrated to a version of ecoinvent.
+
+:meth:`NewDatabase.import_inventories` imports about thirty Excel files, and, for each of them,
+parses the workbook, applies the migrations of the names of the ecoinvent activities
+and links the biosphere exchanges. These steps only depend on the file and on the version of
+ecoinvent: :func:`build_inventory_bundle` stores their result for all the files in a single binary
+file per version. :func:`load_inventory_bundle` reads it, and only parses again the files whose
+hash changed, in a pool of processes. The steps that depend on the database (the `product` fields
+and the check for duplicates) are still applied when each inventory is merged.
+
+The header of a bundle holds the hashes of the file of biosphere flows, of the migration
+tables and of the code and data files listed in :data:`premise.cache.DEPENDENCIES`, which
+include the importers: a bundle linked, migrated or loaded with other ones is rebuilt.
+:meth:`NewDatabase.import_inventories` only reads the bundles if `use_cache` is True. The bundles are written in the
+cache directory of the user (see :data:`premise.cache.CACHE_DIR`), not in the package directory.
+
+The bundles can be built ahead of time, e.g., when installing premise:
+
+    python -m premise.inventory_bundle 3.5 3.6 3.7 3.7.1
+"""
+import argparse
+import hashlib
+import os
+from pathlib import Path
+import pickle
+
+from . import __version__
+from .cache import CACHE_DIR, DEPENDENCIES, hash_file
+from .inventory_imports import (
+    EI_37_35_MIGRATION_MAP,
+    EI_37_36_MIGRATION_MAP,
+    EI_37_MIGRATION_MAP,
+    FILEPATH_BIOSPHERE_FLOWS,
+    load_inventories,
+)
+
+# Incremented whenever the content of the bundles changes: older bundles are rebuilt
+BUNDLE_FORMAT = 1
+# Migration tables applied to the inventories
+MIGRATION_MAPS = (EI_37_35_MIGRATION_MAP, EI_37_36_MIGRATION_MAP, EI_37_MIGRATION_MAP)
+
+
+def get_bundle_filepath(version, directory=None):
+    """Return the path to the bundle of the inventories migrated to ecoinvent `version`."""
+    return Path(directory or CACHE_DIR) / "inventories-{}.bundle".format(version)
+
+
+def hash_migration_maps():
+    """
+    Return the SHA-256 hash of the migration tables of the names of the ecoinvent activities.
+
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    return hashlib.sha256(repr(MIGRATION_MAPS).encode()).hexdigest()
+
+
+def _get_header(version):
+    return {
+        "format": BUNDLE_FORMAT,
+        "premise": ".".join(str(v) for v in __version__),
+        "version": version,
+        "biosphere flows": hash_file(FILEPATH_BIOSPHERE_FLOWS),
+        "migrations": hash_migration_maps(),
+        "dependencies": {f.name: hash_file(f) for f in DEPENDENCIES},
+    }
+
+
+def read_bundle(version, directory=None):
+    """
+    Read the bundle of `version`.
+
+    :return: a dictionary with file names as keys, and dictionaries with the `class` of the importer,
+        the `hash` of the file and the migrated inventory (`import_db`) as values.
+        It is empty if there is no bundle, or if it was built by another version of premise,
+        or with other biosphere flows, migration tables or code.
+    :rtype: dict
+    """
+    filepath = get_bundle_filepath(version, directory)
+    if not filepath.is_file():
+        return {}
+    try:
+        with open(filepath, "rb") as f:
+            header, entries = pickle.load(f)
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return {}
+    if header != _get_header(version):
+        return {}
+    return entries
+
+
+def build_inventory_bundle(inventories, version, directory=None, entries=None, max_workers=None):
+    """
+    Load the inventories, migrate them to ecoinvent `version`, and write them in a bundle.
+
+    :param inventories: list of tuples (class of the importer, path to the inventory file)
+    :type inventories: list
+    :param version: the version of ecoinvent ("3.5", "3.6", "3.7", "3.7.1")
+    :type version: str
+    :param directory: directory of the bundles. Defaults to the cache directory.
+    :type directory: Path
+    :param entries: entries of a previous bundle, reused for the files whose hash did not change
+    :type entries: dict
+    :param max_workers: number of processes loading the files, see :func:`load_inventories`
+    :type max_workers: int
+    :return: the entries of the bundle, see :func:`read_bundle`
+    :rtype: dict
+    """
+    entries = dict(entries or {})
+    stale, digests = [], []
+    for inventory, path in inventories:
+        path = Path(path)
+        digest = hash_file(path)
+        entry = entries.get(path.name)
+        if entry is not None and entry["class"] == inventory.__name__ and entry["hash"] == digest:
+            continue
+        stale.append((inventory, path))
+        digests.append(digest)
+
+    if not stale:
+        return entries
+
+    loaded = load_inventories(stale, version, max_workers)
+    for (inventory, path), digest, (import_db, _) in zip(stale, digests, loaded):
+        # The database is not needed to migrate the inventory
+        importer = inventory([], version, path, import_db=import_db, is_migrated=False)
+        importer.migrate_inventory()
+        entries[path.name] = {
+            "class": inventory.__name__,
+            "hash": digest,
+            "import_db": importer.import_db,
+        }
+
+    filepath = get_bundle_filepath(version, directory)
+    if not os.path.exists(filepath.parent):
+        os.makedirs(filepath.parent)
+    tmp_filepath = filepath.with_suffix(".tmp")
+    with open(tmp_filepath, "wb") as f:
+        pickle.dump((_get_header(version), entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_filepath, filepath)
+
+    return entries
+
+
+def load_inventory_bundle(inventories, version, directory=None, max_workers=None):
+    """
+    Return the inventories, loaded and migrated to ecoinvent `version`, from the bundle of `version`.
+    The inventories missing from the bundle, or whose file changed, are loaded from their file,
+    and the bundle is updated.
+
+    :param inventories: list of tuples (class of the importer, path to the inventory file)
+    :type inventories: list
+    :param version: the version of ecoinvent
+    :type version: str
+    :param directory: directory of the bundles. Defaults to the cache directory.
+    :type directory: Path
+    :param max_workers: number of processes loading the files, see :func:`load_inventories`
+    :type max_workers: int
+    :return: a dictionary with file names as keys and inventories (`import_db`) as values
+    :rtype: dict
+    """
+    entries = build_inventory_bundle(
+        inventories, version, directory, read_bundle(version, directory), max_workers
+    )
+    return {
+        Path(path).name: entries[Path(path).name]["import_db"] for _, path in inventories
+    }
+
+
+def main():
+    from .ecoinvent_modification import BUNDLED_INVENTORIES, SUPPORTED_EI_VERSIONS
+
+    parser = argparse.ArgumentParser(
+        description="Build the bundles of the inventories shipped with premise."
+    )
+    parser.add_argument("versions", nargs="*", default=SUPPORTED_EI_VERSIONS,
+                        help="versions of ecoinvent")
+    parser.add_argument("--directory", type=Path, default=None)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(),
+                        help="number of processes loading the files. Defaults to the number of processors.")
+    args = parser.parse_args()
+
+    for version in args.versions:
+        build_inventory_bundle(
+            BUNDLED_INVENTORIES, version, args.directory, max_workers=args.max_workers
+        )
+        print("Bundle written in {}".format(get_bundle_filepath(version, args.directory)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,16 @@ from bw2io import ExcelImporter, Migration
 import carculator
 import carculator_truck
 from pathlib import Path
-import csv
+from collections import ChainMap
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import os
+import time
 import uuid
 import numpy as np
+from .biosphere import get_biosphere_registry, get_flow_key
+from .database_index import IndexedDatabase
+from .filters import contains, either, equals
 from .geomap import Geomap
 
 FILEPATH_BIOSPHERE_FLOWS = DATA_DIR / "dict_biosphere.txt"
@@ -630,6 +637,112 @@ EI_37_MIGRATION_MAP = {
                 ],
             }
 
+def index_suppliers(datasets, index=None):
+    """
+    Index `datasets` by (name, location, unit). The first dataset found for each key is kept,
+    as when the datasets are searched with `ws.get_many`.
+
+    :param datasets: datasets to index
+    :type datasets: list
+    :param index: index to add the datasets to, if any
+    :type index: dict
+    :return: a dictionary with (name, location, unit) as keys and datasets as values
+    :rtype: dict
+    """
+    index = {} if index is None else index
+    for ds in datasets:
+        key = (ds.get("name"), ds.get("location"), ds.get("unit"))
+        if key not in index:
+            index[key] = ds
+    return index
+
+
+class InventoryMerger:
+    """
+    Merge inventories into a database, one after the other.
+
+    Keeps a single index of the codes and of the (name, reference product, location) of the datasets
+    of the database, updated as each inventory is merged, to find the datasets to import
+    that already exist in the database. They are listed in a single report.
+    Also keeps an index of the datasets by (name, location, unit), to find the `product`
+    of the exchanges of the inventories (see :meth:`BaseInventoryImport.get_product_index`).
+
+    :ivar db: the target database, unpacked to a list of dicts
+    :vartype db: list
+    :ivar codes: codes of the datasets of :attr:`db`
+    :vartype codes: set
+    :ivar names: (name, reference product, location) of the datasets of :attr:`db`
+    :vartype names: set
+    :ivar duplicates: (name, reference product, location, file name) of the datasets not imported
+    :vartype duplicates: list
+    :ivar suppliers: first dataset of :attr:`db` with each (name, location, unit)
+    :vartype suppliers: dict
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self.codes = set()
+        self.names = set()
+        self.duplicates = []
+        self.suppliers = {}
+        self.add(database)
+
+    def add(self, datasets):
+        """Add `datasets`, merged into :attr:`db`, to the index."""
+        for ds in datasets:
+            self.codes.add(ds["code"])
+            self.names.add((ds["name"], ds["reference product"], ds["location"]))
+        index_suppliers(datasets, self.suppliers)
+
+    def remove_duplicates(self, datasets, filename):
+        """
+        Return the datasets of `datasets` that are not already in :attr:`db`.
+        The others, with the code or the (name, reference product, location) of a dataset
+        of :attr:`db`, are added once to :attr:`duplicates`.
+
+        :param datasets: datasets to import
+        :type datasets: list
+        :param filename: name of the file they are imported from
+        :type filename: str
+        :rtype: list
+        """
+        kept = []
+        for ds in datasets:
+            key = (ds["name"], ds["reference product"], ds["location"])
+            if ds["code"] in self.codes or key in self.names:
+                self.duplicates.append(key + (filename,))
+            else:
+                kept.append(ds)
+        return kept
+
+    def merge(self, inventory, version, path, import_db=None, is_migrated=True):
+        """
+        Prepare the inventory `path` with the importer `inventory`, and merge it into :attr:`db`.
+
+        :param inventory: class of the importer
+        :type inventory: type
+        :return: the importer
+        :rtype: BaseInventoryImport
+        """
+        importer = inventory(
+            self.db, version, path, import_db=import_db, is_migrated=is_migrated, merger=self
+        )
+        importer.merge_inventory()
+        return importer
+
+    def print_report(self):
+        """Print the datasets that were not imported, as they already exist in the database."""
+        if len(self.duplicates) > 0:
+            print(
+                "The following datasets to import already exist in the source database. They will not be imported"
+            )
+            t = PrettyTable(["Name", "Reference product", "Location", "File"])
+            for ds in self.duplicates:
+                t.add_row([ds[0][:50], ds[1][:30], ds[2], ds[3]])
+
+            print(t)
+
+
 class BaseInventoryImport:
     """
     Base class for inventories that are to be merged with the ecoinvent database.
@@ -641,7 +754,7 @@ class BaseInventoryImport:
     :vartype version: str
     """
 
-    def __init__(self, database, version, path):
+    def __init__(self, database, version, path, import_db=None, is_migrated=True, merger=None):
         """Create a :class:`BaseInventoryImport` instance.
 
         :param list database: the target database for the import (the Ecoinvent database),
@@ -650,13 +763,19 @@ class BaseInventoryImport:
         :type version: str
         :param path: Path to the imported inventory.
         :type path: str or Path
+        :param import_db: the inventory, already loaded and migrated to `version`
+            (e.g., read from a bundle, see :mod:`premise.inventory_bundle`). If None, it is loaded from `path`.
+        :param is_migrated: whether `import_db` has already been migrated to `version`.
+            False if it was only loaded, e.g., by :func:`load_inventories`.
+        :type is_migrated: bool
+        :param merger: merger of the inventories imported one after the other into `database`,
+            which finds the duplicates and reports them. If None, the duplicates of this inventory
+            are found with an index of `database` and reported when it is prepared.
+        :type merger: InventoryMerger
 
         """
         self.db = database
-        self.db_code = [x["code"] for x in self.db]
-        self.db_names = [
-            (x["name"], x["reference product"], x["location"]) for x in self.db
-        ]
+        self.merger = merger
         self.version = version
         self.biosphere_dict = self.get_biosphere_code()
 
@@ -669,7 +788,12 @@ class BaseInventoryImport:
                 )
 
         self.path = path
-        self.import_db = self.load_inventory(path)
+        if import_db is not None:
+            self.import_db = import_db
+            self.is_migrated = is_migrated
+        else:
+            self.import_db = self.load_inventory(path)
+            self.is_migrated = False
 
     def load_inventory(self, path):
         """Load an inventory from a specified path.
@@ -692,56 +816,56 @@ class BaseInventoryImport:
         """
         pass
 
+    def apply_migrations(self):
+        """Apply the migrations of the names of the Ecoinvent activities
+        to the target version to :attr:`import_db`.
+
+        :returns: Nothing
+
+        """
+        pass
+
+    def migrate_inventory(self):
+        """Apply the migrations to the target Ecoinvent version and add the biosphere links
+        to :attr:`import_db`, unless it has already been migrated.
+        These steps only depend on the inventory file and on the version: their result
+        can be stored in a bundle (see :mod:`premise.inventory_bundle`).
+
+        Modifies :attr:`import_db` in-place.
+
+        :returns: Nothing
+
+        """
+        if not self.is_migrated:
+            self.apply_migrations()
+            self.add_biosphere_links()
+            self.is_migrated = True
+
     def check_for_duplicates(self):
         """
         Check whether the inventories to be imported are not
         already in the source database.
         """
+        merger = self.merger or InventoryMerger(self.db)
+        self.import_db.data = merger.remove_duplicates(self.import_db.data, self.path.name)
 
         # print if we find datasets that already exist
-        already_exist = [
-            (x["name"], x["reference product"], x["location"])
-            for x in self.import_db.data
-            if x["code"] in self.db_code
-        ]
-
-        already_exist.extend(
-            [
-                (x["name"], x["reference product"], x["location"])
-                for x in self.import_db.data
-                if (x["name"], x["reference product"], x["location"]) in self.db_names
-            ]
-        )
-
-        if len(already_exist) > 0:
-            print(
-                "The following datasets to import already exist in the source database. They will not be imported"
-            )
-            t = PrettyTable(["Name", "Reference product", "Location", "File"])
-            for ds in already_exist:
-                t.add_row([ds[0][:50], ds[1][:30], ds[2], self.path.name])
-
-            print(t)
-
-        self.import_db.data = [
-            x for x in self.import_db.data if x["code"] not in self.db_code
-        ]
-        self.import_db.data = [
-            x
-            for x in self.import_db.data
-            if (x["name"], x["reference product"], x["location"]) not in self.db_names
-        ]
+        if self.merger is None:
+            merger.print_report()
 
     def merge_inventory(self):
         """Prepare :attr:`import_db` and merge the inventory to the ecoinvent :attr:`db`.
 
-        Calls :meth:`prepare_inventory`. Changes the :attr:`db` attribute.
+        Calls :meth:`prepare_inventory`. Changes the :attr:`db` attribute,
+        and the index of :attr:`merger`, if any.
 
         :returns: Nothing
 
         """
         self.prepare_inventory()
         self.db.extend(self.import_db)
+        if self.merger is not None:
+            self.merger.add(self.import_db.data)
 
     def search_exchanges(self, srchdict):
         """Search :attr:`import_db` by field values.
@@ -780,24 +904,13 @@ class BaseInventoryImport:
     def get_biosphere_code():
         """
         Retrieve a dictionary with biosphere flow names and uuid codes.
+        The file of biosphere flows is read once per process, see :mod:`premise.biosphere`.
 
         :returns: dictionary with biosphere flow names as keys and uuid code as values
         :rtype: dict
         """
 
-        if not FILEPATH_BIOSPHERE_FLOWS.is_file():
-            raise FileNotFoundError(
-                "The dictionary of biosphere flows could not be found."
-            )
-
-        csv_dict = {}
-
-        with open(FILEPATH_BIOSPHERE_FLOWS) as f:
-            input_dict = csv.reader(f, delimiter=";")
-            for row in input_dict:
-                csv_dict[(row[0], row[1], row[2], row[3])] = row[4]
-
-        return csv_dict
+        return get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS).code_by_key
 
     def add_product_field_to_exchanges(self):
         """Add the `product` key to the production and
@@ -807,9 +920,11 @@ class BaseInventoryImport:
         For production exchanges, use the value of the `reference_product` field.
         For technosphere exchanges, search the activities in :attr:`import_db` and
         use the reference product. If none is found, search the Ecoinvent :attr:`db`.
+        Both are searched in an index built once, see :meth:`get_product_index`.
         Modifies the :attr:`import_db` attribute in place.
 
-        :raises IndexError: if no corresponding activity (and reference product) can be found.
+        :raises IndexError: if no corresponding activity (and reference product) can be found
+            for some exchanges. They are all listed in the message.
 
         """
         # Add a `product` field to the production exchange
@@ -823,56 +938,66 @@ class BaseInventoryImport:
                         y["name"] = x["name"]
 
         # Add a `product` field to technosphere exchanges
+        index = self.get_product_index()
+        unresolved = {}
         for x in self.import_db.data:
             for y in x["exchanges"]:
                 if y["type"] == "technosphere":
-                    # Check if the field 'product' is present
-                    if not "product" in y:
-                        y["product"] = self.correct_product_field(y)
-
+                    # Check if the field 'product' is present.
                     # If a 'reference product' field is present, we make sure
-                    # it matches with the new 'product' field
-                    if "reference product" in y:
-                        try:
-                            assert y["product"] == y["reference product"]
-                        except AssertionError:
-                            y["product"] = self.correct_product_field(y)
+                    # it matches with the 'product' field
+                    if "product" not in y or (
+                        "reference product" in y and y["product"] != y["reference product"]
+                    ):
+                        key = (y["name"], y["location"], y["unit"])
+                        candidate = index.get(key)
+                        if candidate is not None:
+                            y["product"] = candidate["reference product"]
+                        else:
+                            unresolved.setdefault(key, []).append(x["name"])
+
+        if unresolved:
+            t = PrettyTable(["Name", "Location", "Unit", "Consumers"])
+            for (name, location, unit), consumers in unresolved.items():
+                t.add_row([str(name)[:50], location, unit, len(consumers)])
+            raise IndexError(
+                "{} inventory exchanges in {} cannot be linked to the biosphere or the ecoinvent database:\n{}".format(
+                    sum(len(c) for c in unresolved.values()), self.import_db.db_name, t
+                )
+            )
 
         # Add a `code` field if missing
         for x in self.import_db.data:
             if "code" not in x:
                 x["code"] = str(uuid.uuid4().hex)
 
-    def correct_product_field(self, exc):
+    def get_product_index(self):
+        """
+        Return an index of the datasets of :attr:`import_db`, then of the Ecoinvent :attr:`db`,
+        by (name, location, unit), to find the suppliers of the exchanges.
+        The index of :attr:`db` is shared by the inventories imported with the same :attr:`merger`.
+
+        :return: a mapping with (name, location, unit) as keys and datasets as values
+        :rtype: collections.ChainMap
+        """
+        if self.merger is not None:
+            suppliers = self.merger.suppliers
+        else:
+            suppliers = index_suppliers(self.db)
+        return ChainMap(index_suppliers(self.import_db.data), suppliers)
+
+    def correct_product_field(self, exc, index=None):
         """
         Find the correct name for the `product` field of the exchange
         :param exc: a dataset exchange
+        :param index: index of the suppliers, see :meth:`get_product_index`. Built if None.
         :return: name of the product field of the exchange
         :rtype: str
         """
-        # Look first in the imported inventories
-        candidate = next(ws.get_many(
-            self.import_db.data,
-            ws.equals("name", exc["name"]),
-            ws.equals("location", exc["location"]),
-            ws.equals("unit", exc["unit"])
-        ), None)
-        # possibles = [
-        #     a["reference product"]
-        #     for a in self.import_db.data
-        #     if a["name"] == exc["name"]
-        #     and a["location"] == exc["location"]
-        #     and a["unit"] == exc["unit"]
-        # ]
-
-        # If not, look in the ecoinvent inventories
-        if candidate is None:
-            candidate = next(ws.get_many(
-                self.db,
-                ws.equals("name", exc["name"]),
-                ws.equals("location", exc["location"]),
-                ws.equals("unit", exc["unit"])
-            ), None)
+        # Look first in the imported inventories, then in the ecoinvent inventories
+        if index is None:
+            index = self.get_product_index()
+        candidate = index.get((exc["name"], exc["location"], exc["unit"]))
 
         if candidate is not None:
             return candidate["reference product"]
@@ -888,48 +1013,25 @@ class BaseInventoryImport:
 
         Modifies the :attr:`import_db` attribute in place.
         """
+        biosphere_dict = self.biosphere_dict
+        missing = False
         for x in self.import_db.data:
             for y in x["exchanges"]:
                 if y["type"] == "biosphere":
                     if isinstance(y["categories"], str):
                         y["categories"] = tuple(y["categories"].split("::"))
-                    if len(y["categories"]) > 1:
-                        try:
-                            y["input"] = (
-                                "biosphere3",
-                                self.biosphere_dict[
-                                    (
-                                        y["name"],
-                                        y["categories"][0],
-                                        y["categories"][1],
-                                        y["unit"],
-                                    )
-                                ],
-                            )
-                        except KeyError:
-                            if delete_missing:
-                                y["flag_deletion"] = True
-                            else:
-                                raise
+                    code = biosphere_dict.get(get_flow_key(y))
+                    if code is not None:
+                        y["input"] = ("biosphere3", code)
+                    elif delete_missing:
+                        y["flag_deletion"] = True
+                        missing = True
                     else:
-                        try:
-                            y["input"] = (
-                                "biosphere3",
-                                self.biosphere_dict[
-                                    (
-                                        y["name"],
-                                        y["categories"][0],
-                                        "unspecified",
-                                        y["unit"],
-                                    )
-                                ],
-                            )
-                        except KeyError:
-                            if delete_missing:
-                                y["flag_deletion"] = True
-                            else:
-                                raise
-            x["exchanges"] = [ex for ex in x["exchanges"] if "flag_deletion" not in ex]
+                        raise KeyError(get_flow_key(y))
+
+        if missing:
+            for x in self.import_db.data:
+                x["exchanges"] = [ex for ex in x["exchanges"] if "flag_deletion" not in ex]
 
     def remove_ds_and_modifiy_exchanges(self, name, ex_data):
         """
@@ -960,14 +1062,10 @@ class BaseInventoryImport:
                     act.pop(key)
 
 class CarmaCCSInventory(BaseInventoryImport):
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
             new_technosphere_data = EI_37_MIGRATION_MAP
@@ -988,21 +1086,18 @@ class CarmaCCSInventory(BaseInventoryImport):
             )
             self.import_db.migrate("migration_36")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
         # Check for duplicates
         self.check_for_duplicates()
 
 class DACInventory(BaseInventoryImport):
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
             new_technosphere_data = EI_37_MIGRATION_MAP
@@ -1033,7 +1128,8 @@ class DACInventory(BaseInventoryImport):
             )
             self.import_db.migrate("migration_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
         # Add carbon storage for CCS technologies
@@ -1071,15 +1167,10 @@ class BiofuelInventory(BaseInventoryImport):
     Biofuel datasets from the master thesis of Francesco Cozzolino (2018).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
-
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1101,7 +1192,8 @@ class BiofuelInventory(BaseInventoryImport):
             )
             self.import_db.migrate("biofuels_ecoinvent_36")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
         # Check for duplicates
@@ -1112,14 +1204,10 @@ class HydrogenInventory(BaseInventoryImport):
     Hydrogen datasets from the ELEGANCY project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1141,7 +1229,8 @@ class HydrogenInventory(BaseInventoryImport):
             )
             self.import_db.migrate("hydrogen_ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
         # Check for duplicates
@@ -1152,14 +1241,10 @@ class HydrogenBiogasInventory(BaseInventoryImport):
     Hydrogen datasets from the ELEGANCY project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1181,7 +1266,8 @@ class HydrogenBiogasInventory(BaseInventoryImport):
             )
             self.import_db.migrate("hydrogen_ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
         # Check for duplicates
@@ -1192,14 +1278,10 @@ class BiogasInventory(BaseInventoryImport):
     Biogas datasets from the SCCER project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1221,7 +1303,8 @@ class BiogasInventory(BaseInventoryImport):
             )
             self.import_db.migrate("biogas_ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
         # Check for duplicates
@@ -1232,14 +1315,10 @@ class SyngasInventory(BaseInventoryImport):
     Synthetic fuel datasets from the PSI project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1261,7 +1340,8 @@ class SyngasInventory(BaseInventoryImport):
             )
             self.import_db.migrate("syngas_ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
 
 class SynfuelInventory(BaseInventoryImport):
@@ -1269,14 +1349,10 @@ class SynfuelInventory(BaseInventoryImport):
     Synthetic fuel datasets from the PSI project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1297,7 +1373,8 @@ class SynfuelInventory(BaseInventoryImport):
             )
             self.import_db.migrate("syngas_ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
         # Check for duplicates
         self.check_for_duplicates()
@@ -1308,14 +1385,10 @@ class GeothermalInventory(BaseInventoryImport):
 .
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1326,7 +1399,9 @@ class GeothermalInventory(BaseInventoryImport):
                 description="Change technosphere names due to change from 3.5/3.6 to 3.7",
             )
             self.import_db.migrate("migration_37")
-        self.add_biosphere_links()
+
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
         # Check for duplicates
         self.check_for_duplicates()
@@ -1336,14 +1411,10 @@ class LPGInventory(BaseInventoryImport):
     Liquified Petroleum Gas (LPG) from methanol distillation, the PSI project (2020), with hydrogen from electrolysis.
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def apply_migrations(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
@@ -1365,7 +1436,8 @@ class LPGInventory(BaseInventoryImport):
             )
             self.import_db.migrate("LPG_ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
         # Check for duplicates
         self.check_for_duplicates()
@@ -1375,15 +1447,10 @@ class VariousVehicles(BaseInventoryImport):
     Imports various future vehicles' inventories (two-wheelers, buses, trams, etc.).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
-
+    def apply_migrations(self):
         # Migrations for 3.6
         if self.version == "3.6":
             migrations = EI_37_36_MIGRATION_MAP
@@ -1405,7 +1472,8 @@ class VariousVehicles(BaseInventoryImport):
             )
             self.import_db.migrate("ecoinvent_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
         # Check for duplicates
         self.check_for_duplicates()
@@ -1415,15 +1483,10 @@ class AdditionalInventory(BaseInventoryImport):
     Import additional inventories, if any.
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
-
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
-
+    def apply_migrations(self):
         # Migrations for 3.6
         if self.version == "3.6":
             migrations = EI_37_36_MIGRATION_MAP
@@ -1444,7 +1507,8 @@ class AdditionalInventory(BaseInventoryImport):
             )
             self.import_db.migrate("migration_35")
 
-        self.add_biosphere_links()
+    def prepare_inventory(self):
+        self.migrate_inventory()
         self.add_product_field_to_exchanges()
         # Check for duplicates
         self.check_for_duplicates()
@@ -1672,7 +1736,8 @@ class CarculatorInventory(BaseInventoryImport):
             "market for transport, passenger car"
         ]
 
-        self.db = [x for x in self.db if not any(y for y in activities_to_remove if y in x["name"])]
+        self.db = IndexedDatabase.wrap(self.db)
+        self.db.remove_datasets(lambda x: any(y for y in activities_to_remove if y in x["name"]))
         self.db.extend(self.import_db)
 
         exchanges_to_modify = [
@@ -1682,44 +1747,34 @@ class CarculatorInventory(BaseInventoryImport):
             'market for transport, passenger car, large size, diesel, EURO 4',
             'market for transport, passenger car, large size, diesel, EURO 5'
         ]
-        for ds in self.db:
-            excs = (exc for exc in ds["exchanges"]
-                    if exc["name"] in exchanges_to_modify
-                    and exc["type"] == "technosphere")
-
-            for exc in excs:
-
-                try:
-
-                    new_supplier = ws.get_one(
-                        self.db,
-                        *[
-                            ws.contains("name", "transport, passenger car, fleet average, all powertrains"),
-                            ws.equals("location", self.geomap.ecoinvent_to_iam_location(ds["location"])),
-                            ws.contains("reference product", "transport")
-                        ]
-                    )
+        for ds, exc in self.db.get_consumers(either(*[equals("name", name) for name in exchanges_to_modify])):
+            if exc["type"] != "technosphere":
+                continue
 
-                    exc["name"] = new_supplier["name"]
-                    exc["location"] = new_supplier["location"]
-                    exc["product"] = new_supplier["reference product"]
-                    exc["unit"] = new_supplier["unit"]
+            try:
 
-                except ws.NoResults:
+                new_supplier = self.db.get_one(
+                    contains("name", "transport, passenger car, fleet average, all powertrains"),
+                    equals("location", self.geomap.ecoinvent_to_iam_location(ds["location"])),
+                    contains("reference product", "transport")
+                )
 
-                    new_supplier = ws.get_one(
-                        self.db,
-                        *[
-                            ws.contains("name", "transport, passenger car, fleet average, all powertrains"),
-                            ws.equals("location", self.regions[0]),
-                            ws.contains("reference product", "transport")
-                        ]
-                    )
+            except ws.NoResults:
 
-                    exc["name"] = new_supplier["name"]
-                    exc["location"] = new_supplier["location"]
-                    exc["product"] = new_supplier["reference product"]
-                    exc["unit"] = new_supplier["unit"]
+                new_supplier = self.db.get_one(
+                    contains("name", "transport, passenger car, fleet average, all powertrains"),
+                    equals("location", self.regions[0]),
+                    contains("reference product", "transport")
+                )
+
+            self.db.relink_exchange(
+                ds,
+                exc,
+                name=new_supplier["name"],
+                product=new_supplier["reference product"],
+                location=new_supplier["location"],
+                unit=new_supplier["unit"],
+            )
 
         return self.db
 
@@ -1936,47 +1991,81 @@ class TruckInventory(BaseInventoryImport):
             "transport, freight, lorry",
         ]
 
-        self.db = [x for x in self.db if not any(y for y in activities_to_remove if y in x["name"])]
+        self.db = IndexedDatabase.wrap(self.db)
+        self.db.remove_datasets(lambda x: any(y for y in activities_to_remove if y in x["name"]))
         self.db.extend(self.import_db)
 
+        for ds, exc in self.db.get_consumers(contains("name", "transport, freight, lorry")):
+            if exc["type"] != "technosphere":
+                continue
 
-        for ds in self.db:
-            excs = (exc for exc in ds["exchanges"]
-                    if "transport, freight, lorry" in exc["name"]
-                    and exc["type"] == "technosphere")
+            try:
 
-            for exc in excs:
+                new_supplier = self.db.get_one(
+                    contains("name", "transport, medium and heavy duty truck, fleet average, all powertrains"),
+                    equals("location", self.geomap.ecoinvent_to_iam_location(ds["location"])),
+                    contains("reference product", "transport")
+                )
 
-                try:
+            except ws.NoResults:
 
-                    new_supplier = ws.get_one(
-                        self.db,
-                        *[
-                            ws.contains("name", "transport, medium and heavy duty truck, fleet average, all powertrains"),
-                            ws.equals("location", self.geomap.ecoinvent_to_iam_location(ds["location"])),
-                            ws.contains("reference product", "transport")
-                        ]
-                    )
+                new_supplier = self.db.get_one(
+                    contains("name", "transport, medium and heavy duty truck, fleet average, all powertrains"),
+                    equals("location", self.regions[0]),
+                    contains("reference product", "transport")
+                )
 
-                    exc["name"] = new_supplier["name"]
-                    exc["location"] = new_supplier["location"]
-                    exc["product"] = new_supplier["reference product"]
-                    exc["unit"] = new_supplier["unit"]
+            self.db.relink_exchange(
+                ds,
+                exc,
+                name=new_supplier["name"],
+                product=new_supplier["reference product"],
+                location=new_supplier["location"],
+                unit=new_supplier["unit"],
+            )
 
-                except ws.NoResults:
+        return self.db
 
-                    new_supplier = ws.get_one(
-                        self.db,
-                        *[
-                            ws.contains("name", "transport, medium and heavy duty truck, fleet average, all powertrains"),
-                            ws.equals("location", self.regions[0]),
-                            ws.contains("reference product", "transport")
-                        ]
-                    )
 
-                    exc["name"] = new_supplier["name"]
-                    exc["location"] = new_supplier["location"]
-                    exc["product"] = new_supplier["reference product"]
-                    exc["unit"] = new_supplier["unit"]
+def load_inventory_file(inventory, version, path):
+    """
+    Load the inventory file `path` with the importer `inventory`, without migrating it.
 
-        return self.db
+    :return: a tuple with the inventory (`import_db`) and the time spent loading it, in seconds
+    :rtype: tuple
+    """
+    start = time.time()
+    with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
+        # The database is not needed to load the inventory
+        import_db = inventory([], version, path).import_db
+    return import_db, time.time() - start
+
+
+def load_inventories(inventories, version, max_workers=None):
+    """
+    Load the inventory files, in a pool of processes if `max_workers` is greater than 1.
+    The workbooks are parsed in parallel, but not migrated: migrations are written in
+    the brightway project, and are applied by :meth:`BaseInventoryImport.migrate_inventory`,
+    in the main process.
+
+    :param inventories: list of tuples (class of the importer, path to the inventory file)
+    :type inventories: list
+    :param version: the version of ecoinvent ("3.5", "3.6", "3.7", "3.7.1")
+    :type version: str
+    :param max_workers: number of processes. The files are loaded in the main process
+        if None or 1. Scripts that use a pool of processes must guard their entry point
+        with `if __name__ == "__main__":` on the platforms that spawn the processes (Windows, macOS).
+    :type max_workers: int
+    :return: a list of tuples (inventory, time spent loading it, in seconds), in the order of `inventories`
+    :rtype: list
+    """
+    max_workers = min(max_workers or 1, len(inventories))
+    if max_workers <= 1:
+        return [load_inventory_file(inventory, version, path) for inventory, path in inventories]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = [
+            pool.submit(load_inventory_file, inventory, version, path)
+            for inventory, path in inventories
+        ]
+        return [result.result() for result in results]
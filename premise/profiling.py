@@ -0,0 +1,229 @@
+from . import DATA_DIR
+from .copy_on_write import CopyOnWriteDataset, copy_on_write_database
+from .utils import get_memory_usage
+from datetime import date
+import contextlib
+import cProfile
+import csv
+import json
+import os
+import threading
+import time
+
+# Fields of the records, in the order of the columns of the reports
+PROFILE_FIELDS = [
+    "model",
+    "pathway",
+    "year",
+    "stage",
+    "wall time (s)",
+    "CPU time (s)",
+    "peak RSS delta (MB)",
+    "datasets added",
+    "datasets removed",
+    "datasets modified",
+    "exchanges scanned",
+]
+
+
+def count_changes(db, bases):
+    """
+    Return the number of datasets modified by a stage, and the number of exchanges of the datasets
+    whose exchanges the stage read, for a database wrapped with :func:`copy_on_write_database`
+    before the stage.
+
+    :param db: the database after the stage
+    :type db: list
+    :param bases: the datasets before the stage, by id of the wrapping dataset
+    :type bases: dict
+    :return: a tuple with the number of datasets modified and of exchanges scanned
+    :rtype: tuple
+    """
+    modified, scanned = 0, 0
+    for ds in db:
+        base = bases.get(id(ds))
+        if base is None or not ds.is_modified:
+            continue
+        if "exchanges" in ds.copied_fields():
+            scanned += len(dict.__getitem__(ds, "exchanges"))
+        if isinstance(base, CopyOnWriteDataset):
+            base = dict(base._peek_items())
+        if dict(ds._peek_items()) != base:
+            modified += 1
+    return modified, scanned
+
+
+class Profiler:
+    """
+    Class that records, for each stage of a run (extraction, imports, transformations, exports)
+    and each scenario, the wall time, the CPU time of the process, the increase of the peak
+    resident set size, and the number of datasets added and removed.
+
+    Records of a scenario are stored in `scenario["profile"]`, so that they follow
+    the scenario in worker processes. Other records are stored in :attr:`records`.
+
+    :ivar detailed: if True, the number of datasets modified and of exchanges scanned
+        are also counted. The database is wrapped in copy-on-write datasets before each stage
+        to that end, which makes the stages slower.
+    :vartype detailed: bool
+    :ivar cprofile: if True, each stage running in the main thread runs under `cProfile`,
+        and its statistics are dumped in :attr:`directory`, to be read with `pstats` or `snakeviz`.
+    :vartype cprofile: bool
+    :ivar records: records of the stages that are not specific to a scenario
+    :vartype records: list
+    """
+
+    def __init__(self, detailed=False, cprofile=False, directory=None):
+        self.detailed = detailed
+        self.cprofile = cprofile
+        self.directory = directory or DATA_DIR / "logs"
+        self.records = []
+
+    @contextlib.contextmanager
+    def measure(self, stage, scenario=None, get_db=None, detailed=None):
+        """
+        Record the execution of the block of code within.
+
+        :param stage: name of the stage
+        :type stage: str
+        :param scenario: the scenario the stage applies to, if any
+        :type scenario: dict
+        :param get_db: function returning the database the stage modifies, if any.
+            If `scenario` is given, `scenario["database"]` is used.
+        :type get_db: callable
+        :param detailed: overrides :attr:`detailed` if not None
+        :type detailed: bool
+        """
+        if detailed is None:
+            detailed = self.detailed
+        if get_db is None and scenario is not None:
+            get_db = lambda: scenario["database"]
+
+        db = get_db() if get_db is not None else None
+        ids = set(id(ds) for ds in db) if db is not None else set()
+
+        bases = None
+        if detailed and scenario is not None and db is not None:
+            scenario["database"] = copy_on_write_database(db)
+            bases = {id(ds): base for ds, base in zip(scenario["database"], db)}
+            ids = set(bases)
+
+        memory = get_memory_usage()["peak RSS"]
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        # Only one profiler can be active at a time: stages running in other threads are not profiled
+        profile = (
+            cProfile.Profile()
+            if self.cprofile and threading.current_thread() is threading.main_thread()
+            else None
+        )
+        if profile is not None:
+            profile.enable()
+
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+            record = dict.fromkeys(PROFILE_FIELDS)
+            record.update(
+                {
+                    "stage": stage,
+                    "wall time (s)": round(time.perf_counter() - wall, 3),
+                    "CPU time (s)": round(time.process_time() - cpu, 3),
+                }
+            )
+            if memory is not None:
+                record["peak RSS delta (MB)"] = round(
+                    get_memory_usage()["peak RSS"] - memory, 1
+                )
+            if scenario is not None:
+                record.update(
+                    {k: scenario.get(k) for k in ("model", "pathway", "year")}
+                )
+
+            db = get_db() if get_db is not None else None
+            if db is not None:
+                new_ids = set(id(ds) for ds in db)
+                record["datasets added"] = len(new_ids - ids)
+                record["datasets removed"] = len(ids - new_ids)
+                if bases is not None:
+                    (
+                        record["datasets modified"],
+                        record["exchanges scanned"],
+                    ) = count_changes(db, bases)
+
+            if profile is not None:
+                self.dump_stats(profile, record)
+
+            if scenario is not None:
+                scenario.setdefault("profile", []).append(record)
+            else:
+                self.records.append(record)
+
+    def dump_stats(self, profile, record):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        name = " ".join(
+            str(record[k]) for k in ("model", "pathway", "year") if record[k] is not None
+        )
+        profile.dump_stats(
+            self.directory
+            / "profile {} {} {}.prof".format(name, record["stage"], date.today()).replace(
+                "  ", " "
+            )
+        )
+
+    def run(self, stage, scenario, version, detailed=None):
+        """
+        Apply a :class:`premise.scheduler.Stage` to a scenario, and record it.
+        """
+        with self.measure(stage.name, scenario, detailed=detailed):
+            scenario = stage.function(scenario, version)
+        return scenario
+
+    def get_records(self, scenarios=()):
+        """
+        Return the records of the run, starting with those not specific to a scenario.
+
+        :param scenarios: the scenarios of the run
+        :type scenarios: list
+        :return: list of records
+        :rtype: list
+        """
+        return self.records + [r for s in scenarios for r in s.get("profile", [])]
+
+
+def write_profile(records, fmt="csv", filepath=None):
+    """
+    Write records to a JSON or CSV (;-separated) file.
+
+    :param records: records, as returned by :meth:`Profiler.get_records`
+    :type records: list
+    :param fmt: "csv" or "json"
+    :type fmt: str
+    :param filepath: path to the file. Defaults to a file in `DATA_DIR / "logs"`.
+    :type filepath: str
+    :return: path to the file
+    :rtype: Path
+    """
+    if fmt not in ("csv", "json"):
+        raise ValueError(f"Profiles can be written to `csv` or `json`, not {fmt}.")
+
+    if filepath is None:
+        if not os.path.exists(DATA_DIR / "logs"):
+            os.makedirs(DATA_DIR / "logs")
+        filepath = DATA_DIR / "logs" / "profile {}.{}".format(date.today(), fmt)
+
+    with open(filepath, "w") as f:
+        if fmt == "json":
+            json.dump(records, f, indent=2)
+        else:
+            writer = csv.DictWriter(
+                f, fieldnames=PROFILE_FIELDS, delimiter=";", lineterminator="\n"
+            )
+            writer.writeheader()
+            writer.writerows(records)
+
+    return filepath
@@ -0,0 +1,184 @@
+class Stage:
+    """
+    A transformation of a scenario database, with the families of datasets it depends on.
+
+    A family is a part of the database identified by a name, e.g. "electricity markets"
+    (the market datasets for electricity) or "electricity supply" (the electricity inputs
+    of any dataset). A stage:
+
+    * `reads` the families its result depends on,
+    * `writes` the families it modifies in place or removes datasets from,
+    * `adds` the families it creates new datasets or exchanges in.
+
+    Two stages that add to the same family do not conflict.
+
+    :ivar name: name of the stage, as used in the `exclude` list of a scenario
+    :vartype name: str
+    :ivar function: function that takes a scenario and the ecoinvent version, and returns the scenario
+    :vartype function: callable
+    :ivar inputs: function that takes a scenario and returns the external data the stage
+        consumes (IAM arrays, configuration, files), to fingerprint it. See :mod:`premise.checkpoint`.
+    :vartype inputs: callable
+    :ivar dependencies: paths to the code and data files the stage applies and reads, whose content
+        is part of its fingerprint, so that its checkpoints are not reused after they change
+    :vartype dependencies: list
+    """
+
+    def __init__(
+        self, name, function, reads=(), writes=(), adds=(), inputs=None, dependencies=()
+    ):
+        self.name = name
+        self.function = function
+        self.reads = set(reads)
+        self.writes = set(writes)
+        self.adds = set(adds)
+        self.inputs = inputs
+        self.dependencies = list(dependencies)
+
+    @property
+    def families(self):
+        return self.reads | self.writes | self.adds
+
+    def conflicts_with(self, other):
+        """
+        Return True if the result of one of the two stages depends on whether
+        the other one runs before or after it.
+
+        :param other: another stage
+        :type other: Stage
+        :rtype: bool
+        """
+        return bool(
+            self.writes & (other.reads | other.writes | other.adds)
+            or other.writes & (self.reads | self.adds)
+            or self.adds & other.reads
+            or other.adds & self.reads
+        )
+
+    def __repr__(self):
+        return "Stage({})".format(self.name)
+
+
+class StageScheduler:
+    """
+    Apply stages to a scenario, one at a time, in the order they are requested in.
+
+    The scheduler keeps, in `scenario["stage state"]`, a version number for each family,
+    incremented every time a stage writes or adds to it, and the versions of the families
+    each applied stage depended on. If `skip_up_to_date` is True, a stage that has already
+    been applied is skipped if none of these families changed since, instead of scanning
+    the database all over again. By default, stages are applied every time they are requested.
+
+    :meth:`plan` groups the stages in waves of stages that do not depend on one another.
+
+    :ivar stages: the stages, by name
+    :vartype stages: dict
+    :ivar profiler: records the execution of each stage, if given
+    :vartype profiler: premise.profiling.Profiler
+    :ivar skip_up_to_date: if True, stages already applied whose families have not changed are skipped
+    :vartype skip_up_to_date: bool
+    """
+
+    def __init__(self, stages, profiler=None, skip_up_to_date=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.profiler = profiler
+        self.skip_up_to_date = skip_up_to_date
+
+    def plan(self, names):
+        """
+        Group the stages `names` in waves. A stage is placed in the wave that follows the last wave
+        containing a stage it conflicts with and that is requested before it. Stages in the same wave
+        are independent from one another.
+
+        :param names: names of the stages, in the order they would run serially
+        :type names: list
+        :return: list of waves, each being a list of stages
+        :rtype: list
+        """
+        waves = []
+        levels = []
+
+        for i, name in enumerate(names):
+            stage = self.stages[name]
+            level = 1 + max(
+                (
+                    levels[j]
+                    for j in range(i)
+                    if stage.conflicts_with(self.stages[names[j]])
+                ),
+                default=-1,
+            )
+            levels.append(level)
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(stage)
+
+        return waves
+
+    @staticmethod
+    def get_state(scenario):
+        return scenario.setdefault("stage state", {"versions": {}, "applied": {}})
+
+    def is_up_to_date(self, scenario, stage):
+        """
+        Return True if `stage` has already been applied to `scenario` and none of
+        the families it depends on have changed since.
+        """
+        state = self.get_state(scenario)
+        if stage.name not in state["applied"]:
+            return False
+        return state["applied"][stage.name] == {
+            family: state["versions"].get(family, 0) for family in stage.families
+        }
+
+    def record(self, scenario, stage):
+        state = self.get_state(scenario)
+        for family in stage.writes | stage.adds:
+            state["versions"][family] = state["versions"].get(family, 0) + 1
+        state["applied"][stage.name] = {
+            family: state["versions"].get(family, 0) for family in stage.families
+        }
+
+    def apply(self, stage, scenario, version):
+        if self.profiler is None:
+            return stage.function(scenario, version)
+        return self.profiler.run(stage, scenario, version)
+
+    def run(self, scenario, version, names, callback=None):
+        """
+        Apply the stages `names` to `scenario`, skipping the stages excluded by the scenario,
+        and, if :attr:`skip_up_to_date` is True, those that are up-to-date.
+
+        :param scenario: a scenario, with its `database` and `external data`
+        :type scenario: dict
+        :param version: version of the ecoinvent source database
+        :type version: str
+        :param names: names of the stages, in the order they are applied
+        :type names: list
+        :param callback: function called after each stage with the scenario and a list
+            with the name of the stage
+        :type callback: callable
+        :return: the transformed scenario
+        :rtype: dict
+        """
+        names = [n for n in names if n not in scenario.get("exclude", [])]
+
+        if self.profiler is not None:
+            scenario.setdefault("profile", [])
+
+        for name in names:
+            stage = self.stages[name]
+            if self.skip_up_to_date and self.is_up_to_date(scenario, stage):
+                print(
+                    "{} has already been applied, and its inputs have not changed since. "
+                    "Skipped.".format(stage.name)
+                )
+                continue
+
+            scenario = self.apply(stage, scenario, version)
+            self.record(scenario, stage)
+
+            if callback is not None:
+                callback(scenario, [stage.name])
+
+        return scenario
@@ -0,0 +1,299 @@
+"""
+Binary snapshot of a database, opened with memory mapping and read lazily.
+
+Loading a pickled database builds all its datasets and exchanges before premise can use any of
+them. A snapshot, written by :func:`write_snapshot`, stores the strings of the exchanges
+(names, products, locations, units, types and inputs) once, in a string table, the exchanges as
+arrays of indices in that table and of amounts, and the other fields of each dataset and of its
+exchanges as a separate pickle. :func:`open_snapshot` maps the file in memory and returns a
+:class:`SnapshotDatabase`, which only builds a dataset the first time it is accessed.
+Worker processes that open the same snapshot share the pages of the file.
+
+Snapshots are a standalone reader, for tools that only read some datasets of a database, e.g.,
+to look up a few activities of a database exported by premise. :class:`NewDatabase` does not use
+them: it transforms every dataset, and building all the datasets of a snapshot takes longer than
+loading a pickle (see `benchmarks/bench_snapshot.py`).
+
+Layout of a snapshot: :const:`MAGIC`, the version of the format and the length of the header
+(two 64-bit integers), the header (JSON, with the position of each array), then the arrays,
+each aligned on 8 bytes.
+"""
+from collections.abc import Sequence
+import json
+import mmap
+import os
+from pathlib import Path
+import pickle
+import sys
+
+import numpy as np
+
+from . import __version__
+
+MAGIC = b"PREMISE SNAPSHOT"
+# Incremented whenever the layout changes: older snapshots cannot be read
+SNAPSHOT_VERSION = 1
+# Fields of the exchanges stored in arrays, when their value has the type of the array:
+# strings, stored as indices in the string table, floats and small positive integers
+STRING_FIELDS = ("name", "product", "location", "unit", "type")
+FLOAT_FIELDS = ("amount", "loc", "scale")
+INTEGER_FIELDS = ("uncertainty type",)
+COLUMN_FIELDS = STRING_FIELDS + FLOAT_FIELDS + INTEGER_FIELDS + ("input",)
+# Value of the fields missing from an exchange, while it is built
+_MISSING = object()
+_PREAMBLE = np.dtype([("version", "<u8"), ("header length", "<u8")])
+
+
+class _StringTable:
+    """Assign an index to each distinct string."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def get(self, value):
+        """Return the index of `value`, or -1 if it is not a string."""
+        if type(value) is not str:
+            return -1
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.ids)
+        return i
+
+
+def write_snapshot(db, filepath):
+    """
+    Write `db` in a snapshot, that :func:`open_snapshot` reads.
+
+    :param db: the database, as a list of dictionaries
+    :type db: list
+    :param filepath: path to the file
+    :type filepath: str or Path
+    :return: path to the file
+    :rtype: Path
+    """
+    strings = _StringTable()
+    columns = {field: [] for field in STRING_FIELDS + FLOAT_FIELDS + INTEGER_FIELDS}
+    columns.update({"input database": [], "input code": []})
+    exchange_offsets = [0]
+    blobs = []
+
+    for ds in db:
+        # Fields that are not stored in the arrays, for each exchange that has some
+        extras = {}
+        for j, exc in enumerate(ds["exchanges"]):
+            extra = {
+                field: value for field, value in exc.items() if field not in COLUMN_FIELDS
+            }
+
+            for field in STRING_FIELDS:
+                i = strings.get(exc.get(field))
+                columns[field].append(i)
+                if i < 0 and field in exc:
+                    extra[field] = exc[field]
+
+            for field in FLOAT_FIELDS:
+                value = exc.get(field)
+                if type(value) is float and value == value:
+                    columns[field].append(value)
+                else:
+                    columns[field].append(np.nan)
+                    if field in exc:
+                        extra[field] = value
+
+            for field in INTEGER_FIELDS:
+                value = exc.get(field)
+                if type(value) is int and 0 <= value < 2 ** 15:
+                    columns[field].append(value)
+                else:
+                    columns[field].append(-1)
+                    if field in exc:
+                        extra[field] = value
+
+            key = exc.get("input")
+            if type(key) is tuple and len(key) == 2 and all(type(k) is str for k in key):
+                columns["input database"].append(strings.get(key[0]))
+                columns["input code"].append(strings.get(key[1]))
+            else:
+                columns["input database"].append(-1)
+                columns["input code"].append(-1)
+                if "input" in exc:
+                    extra["input"] = key
+
+            if extra:
+                extras[j] = extra
+
+        exchange_offsets.append(exchange_offsets[-1] + len(ds["exchanges"]))
+        fields = {k: v for k, v in ds.items() if k != "exchanges"}
+        blobs.append(pickle.dumps((fields, extras), protocol=pickle.HIGHEST_PROTOCOL))
+
+    encoded = [s.encode("utf-8", "surrogatepass") for s in strings.ids]
+    arrays = {
+        "strings": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "string offsets": np.cumsum([0] + [len(s) for s in encoded], dtype=np.int64),
+        "exchange offsets": np.array(exchange_offsets, dtype=np.int64),
+        "datasets": np.frombuffer(b"".join(blobs), dtype=np.uint8),
+        "dataset offsets": np.cumsum([0] + [len(b) for b in blobs], dtype=np.int64),
+    }
+    for field, values in columns.items():
+        if field in FLOAT_FIELDS:
+            arrays[field] = np.array(values, dtype=np.float64)
+        elif field in INTEGER_FIELDS:
+            arrays[field] = np.array(values, dtype=np.int16)
+        else:
+            arrays[field] = np.array(values, dtype=np.int32)
+
+    # Positions of the arrays, relative to the end of the header
+    sections, position = {}, 0
+    for name, array in arrays.items():
+        sections[name] = [position, array.dtype.str, len(array)]
+        position += _align(array.nbytes)
+    header = json.dumps(
+        {
+            "premise": ".".join(str(v) for v in __version__),
+            "datasets": len(exchange_offsets) - 1,
+            "sections": sections,
+        }
+    ).encode()
+    header += b" " * (_align(len(header)) - len(header))
+
+    filepath = Path(filepath)
+    with open(filepath, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array([(SNAPSHOT_VERSION, len(header))], dtype=_PREAMBLE).tobytes())
+        f.write(header)
+        for array in arrays.values():
+            data = array.tobytes()
+            f.write(data + b"\0" * (_align(len(data)) - len(data)))
+    return filepath
+
+
+def _align(n):
+    return (n + 7) // 8 * 8
+
+
+def open_snapshot(filepath):
+    """
+    Open a snapshot written by :func:`write_snapshot`.
+
+    :param filepath: path to the file
+    :type filepath: str or Path
+    :return: the database
+    :rtype: SnapshotDatabase
+    :raises ValueError: if the file is not a snapshot, or was written in another version of the format
+    """
+    return SnapshotDatabase(filepath)
+
+
+def _reopen_snapshot(filepath, datasets):
+    """Open the snapshot of a pickled :class:`SnapshotDatabase`, with the datasets it had built."""
+    db = open_snapshot(filepath)
+    for i, ds in datasets.items():
+        db._datasets[i] = ds
+    return db
+
+
+class SnapshotDatabase(Sequence):
+    """
+    Database read from a snapshot mapped in memory. Each dataset is built, as a dictionary,
+    the first time it is accessed, and the same dictionary is returned afterwards.
+
+    The database is pickled as the path to its snapshot and the datasets already built,
+    which may have been modified: the other datasets are read from the snapshot again
+    in the processes it is sent to.
+
+    :ivar filepath: path to the snapshot
+    :vartype filepath: Path
+    """
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        with open(self.filepath, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        start = len(MAGIC) + _PREAMBLE.itemsize
+        if len(self._mmap) < start or self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a premise snapshot.".format(self.filepath))
+        preamble = np.frombuffer(self._mmap, dtype=_PREAMBLE, count=1, offset=len(MAGIC))[0]
+        if preamble["version"] != SNAPSHOT_VERSION:
+            raise ValueError(
+                "{} was written in version {} of the snapshot format, not {}.".format(
+                    self.filepath, preamble["version"], SNAPSHOT_VERSION
+                )
+            )
+        header_length = int(preamble["header length"])
+        header = json.loads(bytes(self._mmap[start:start + header_length]))
+        start += header_length
+
+        self._arrays = {
+            name: np.frombuffer(self._mmap, dtype=dtype, count=count, offset=start + position)
+            for name, (position, dtype, count) in header["sections"].items()
+        }
+        self._datasets = [None] * header["datasets"]
+        self._strings = None
+
+    def _get_strings(self):
+        """Return the string table, decoded the first time a dataset is built."""
+        if self._strings is None:
+            offsets = self._arrays["string offsets"].tolist()
+            data = bytes(self._arrays["strings"])
+            self._strings = [
+                sys.intern(data[start:end].decode("utf-8", "surrogatepass"))
+                for start, end in zip(offsets, offsets[1:])
+            ]
+            # Index -1 marks a missing value
+            self._strings.append(_MISSING)
+        return self._strings
+
+    def _load(self, i):
+        start, end = self._arrays["dataset offsets"][i:i + 2]
+        fields, extras = pickle.loads(self._arrays["datasets"][start:end])
+
+        start, end = self._arrays["exchange offsets"][i:i + 2]
+        column = lambda field: self._arrays[field][start:end].tolist()
+        strings = self._get_strings()
+        values = [[strings[k] for k in column(field)] for field in STRING_FIELDS]
+        values += [
+            [v if v == v else _MISSING for v in column(field)] for field in FLOAT_FIELDS
+        ]
+        values += [
+            [v if v >= 0 else _MISSING for v in column(field)] for field in INTEGER_FIELDS
+        ]
+        values.append(
+            [
+                (strings[d], strings[c]) if c >= 0 else _MISSING
+                for d, c in zip(column("input database"), column("input code"))
+            ]
+        )
+
+        exchanges = [
+            {field: v for field, v in zip(COLUMN_FIELDS, row) if v is not _MISSING}
+            for row in zip(*values)
+        ]
+        for j, extra in extras.items():
+            exchanges[j].update(extra)
+
+        fields["exchanges"] = exchanges
+        return fields
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        ds = self._datasets[i]
+        if ds is None:
+            ds = self._datasets[i] = self._load(range(len(self))[i])
+        return ds
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def count_loaded_datasets(self):
+        """Return the number of datasets already built."""
+        return sum(ds is not None for ds in self._datasets)
+
+    def __reduce__(self):
+        built = {i: ds for i, ds in enumerate(self._datasets) if ds is not None}
+        return _reopen_snapshot, (os.fspath(self.filepath), built)
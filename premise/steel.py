@@ -1,9 +1,11 @@
-import wurst
 from wurst import searching as ws
 from wurst.searching import NoResults
 import itertools
 from .geomap import Geomap
 from .activity_maps import InventorySet
+from .columnar import ColumnarExchanges
+from .database_index import IndexedDatabase
+from .filters import compile_filter, contains, doesnt_contain_any, either, equals
 from .utils import *
 import uuid
 import copy
@@ -29,7 +31,7 @@ class Steel:
     """
 
     def __init__(self, db, model, iam_data, year):
-        self.db = db
+        self.db = IndexedDatabase.wrap(db)
         self.iam_data = iam_data
         self.year = year
         self.steel_data = self.iam_data.data.interp(year=self.year)
@@ -39,6 +41,9 @@ class Steel:
         self.geo = Geomap(model=model)
         mapping = InventorySet(self.db)
         self.emissions_map = mapping.get_remind_to_ecoinvent_emissions()
+        self.emissions_filter = compile_filter(
+            either(*[contains("name", x) for x in self.emissions_map])
+        )
         self.fuel_map = mapping.generate_fuel_map()
         self.material_map = mapping.generate_material_map()
         self.recycling_rates = get_steel_recycling_rates(year=self.year)
@@ -55,9 +60,8 @@ class Steel:
         """
         d_map = {
             self.geo.ecoinvent_to_iam_location(d['location']): d['location']
-            for d in ws.get_many(
-                self.db,
-                ws.equals("name", name)
+            for d in self.db.get_many(
+                equals("name", name)
             )
         }
 
@@ -75,11 +79,10 @@ class Steel:
 
         for d in d_remind_to_eco:
             try:
-                ds = ws.get_one(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", d_remind_to_eco[d]),
+                ds = self.db.get_one(
+                    equals("name", name),
+                    contains("reference product", "steel"),
+                    equals("location", d_remind_to_eco[d]),
                 )
 
             except ws.NoResults:
@@ -88,11 +91,10 @@ class Steel:
             except ws.MultipleResults:
                 print("Multiple results for {} found for the REMIND region {}".format(name, d))
 
-                ds = ws.get_many(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", d_remind_to_eco[d]),
+                ds = self.db.get_many(
+                    equals("name", name),
+                    contains("reference product", "steel"),
+                    equals("location", d_remind_to_eco[d]),
                 )
 
                 for x in ds:
@@ -115,8 +117,8 @@ class Steel:
                     prod.pop("input")
 
         deleted_markets = [
-            (act['name'], act['reference product'], act['location']) for act in self.db
-                   if act["name"] == name
+            (act['name'], act['reference product'], act['location'])
+            for act in self.db.get_many(equals("name", name))
         ]
 
         with open(DATA_DIR / "logs/log deleted steel datasets.csv", "a") as csv_file:
@@ -127,8 +129,7 @@ class Steel:
                 writer.writerow(line)
 
         # Remove old datasets
-        self.db = [act for act in self.db
-                   if act["name"] != name]
+        self.db.remove_datasets(lambda act: act["name"] == name)
 
 
         return d_act
@@ -190,22 +191,21 @@ class Steel:
                         for region in iam_regions]
         list_regions = [x for y in list_regions for x in y]
 
-        return ws.get_many(
-            self.db,
+        return self.db.get_many(
             *[
-                ws.either(
+                either(
                     *[
-                        ws.equals("name", supplier)
+                        equals("name", supplier)
                         for supplier in ecoinvent_technologies
                     ]
                 ),
-                ws.either(
+                either(
                     *[
-                        ws.equals("location", loc)
+                        equals("location", loc)
                         for loc in list_regions
                     ]
                 ),
-                ws.equals("reference product", reference_product),
+                equals("reference product", reference_product),
             ]
         )
 
@@ -222,62 +222,69 @@ class Steel:
             c[1] for c in self.geo.geo.keys() if type(c) == tuple and c[0] == "REMIND"
         ]
 
-        for act in self.db:
-            for exc in act['exchanges']:
-                try:
-                    exc["name"]
-                except KeyError:
-                    print(exc)
-                if (exc['name'], exc.get('product')) == (name, ref_product) and exc['type'] == 'technosphere':
-                    if act['location'] not in list_remind_regions:
-                        if act['location'] == "North America without Quebec":
-                            exc['location'] = 'USA'
-                        else:
-                            try:
-                                exc['location'] = self.geo.ecoinvent_to_iam_location(act['location'])
-                            except:
-                                print("cannot find for {}".format(act["location"]))
-                    else:
-                        exc['location'] = act['location']
+        for act, exc in self.db.get_consumers(
+            equals("name", name), equals("product", ref_product)
+        ):
+            if exc['type'] != 'technosphere':
+                continue
+            new_loc = None
+            if act['location'] not in list_remind_regions:
+                if act['location'] == "North America without Quebec":
+                    new_loc = 'USA'
+                else:
+                    try:
+                        new_loc = self.geo.ecoinvent_to_iam_location(act['location'])
+                    except:
+                        print("cannot find for {}".format(act["location"]))
+            else:
+                new_loc = act['location']
+            self.db.relink_exchange(act, exc, location=new_loc)
 
 
-    def update_pollutant_emissions(self, ds):
+    def update_pollutant_emissions(self, datasets):
         """
         Update pollutant emissions based on GAINS data.
-        :return:
+
+        :param datasets: datasets whose emissions are updated, in place
+        :type datasets: list
+        :return: the datasets
+        :rtype: list
         """
 
-        # Update biosphere exchanges according to GAINS emission values
-        for exc in ws.biosphere(
-                ds, ws.either(*[ws.contains("name", x) for x in self.emissions_map])
-            ):
-            remind_emission_label = self.emissions_map[exc["name"]]
+        datasets = list(datasets)
+        exchanges = ColumnarExchanges(datasets)
 
-            try:
-                remind_emission = self.iam_data.steel_emissions.loc[
-                    dict(
-                        region=ds["location"],
-                        pollutant=remind_emission_label
-                    )
-                ].values.item(0)
-            except KeyError:
-                # TODO: fix this.
-                # GAINS does not have a 'World' region, hence we use China as a temporary fix
-                remind_emission = self.iam_data.steel_emissions.loc[
-                    dict(
-                        region='CHA',
-                        pollutant=remind_emission_label
-                    )
-                ].values.item(0)
+        # Update biosphere exchanges according to GAINS emission values
+        emissions = exchanges.select(self.emissions_filter, types=("biosphere",))
+        values = np.zeros(len(exchanges.amount))
+        cache = {}
+        for i in np.flatnonzero(emissions):
+            location = datasets[exchanges.consumer[i]]["location"]
+            remind_emission_label = self.emissions_map[exchanges.suppliers[exchanges.supplier[i]][0]]
+
+            if (location, remind_emission_label) not in cache:
+                try:
+                    cache[(location, remind_emission_label)] = self.iam_data.steel_emissions.loc[
+                        dict(
+                            region=location,
+                            pollutant=remind_emission_label
+                        )
+                    ].values.item(0)
+                except KeyError:
+                    # TODO: fix this.
+                    # GAINS does not have a 'World' region, hence we use China as a temporary fix
+                    cache[(location, remind_emission_label)] = self.iam_data.steel_emissions.loc[
+                        dict(
+                            region='CHA',
+                            pollutant=remind_emission_label
+                        )
+                    ].values.item(0)
 
+            values[i] = cache[(location, remind_emission_label)]
 
-            if exc["amount"] == 0:
-                wurst.rescale_exchange(
-                    exc, remind_emission / 1, remove_uncertainty=True
-                )
-            else:
-                wurst.rescale_exchange(exc, remind_emission / exc["amount"])
-        return ds
+        exchanges.rescale_to(values, emissions)
+        exchanges.write_back()
+        return datasets
 
     def adjust_recycled_steel_share(self, dict_act):
         """
@@ -302,11 +309,11 @@ class Steel:
 
 
             try:
-                ds = ws.get_one(self.db,
-                           ws.equals('reference product', act['reference product']),
-                           ws.contains('name', 'steel production'),
-                           ws.contains('name', 'converter'),
-                            ws.contains('location', 'RoW'))
+                ds = self.db.get_one(
+                           equals('reference product', act['reference product']),
+                           contains('name', 'steel production'),
+                           contains('name', 'converter'),
+                            contains('location', 'RoW'))
 
                 act['exchanges'].append(
                     {
@@ -324,11 +331,11 @@ class Steel:
             except NoResults:
                 secondary_share = 1
 
-            ds = ws.get_one(self.db,
-                       ws.equals('reference product', act['reference product']),
-                       ws.contains('name', 'steel production'),
-                       ws.contains('name', 'electric'),
-                       ws.contains('location', 'RoW'))
+            ds = self.db.get_one(
+                       equals('reference product', act['reference product']),
+                       contains('name', 'steel production'),
+                       contains('name', 'electric'),
+                       contains('location', 'RoW'))
 
             act['exchanges'].append(
                 {
@@ -608,7 +615,7 @@ class Steel:
 
 
                 # Update non fuel-related emissions according to GAINS
-                d_act_steel[d] = {k: self.update_pollutant_emissions(v) for k, v in d_act_steel[d].items()}
+                self.update_pollutant_emissions(d_act_steel[d].values())
 
                 self.db.extend([v for v in d_act_steel[d].values()])
 
@@ -664,11 +671,10 @@ class Steel:
         for steel_market in steel_market_names:
 
             for loc in self.recycling_rates.region.values:
-                ds = ws.get_one(
-                    self.db,
-                    ws.equals("name", steel_market),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", "GLO"),
+                ds = self.db.get_one(
+                    equals("name", steel_market),
+                    contains("reference product", "steel"),
+                    equals("location", "GLO"),
                 )
 
                 d_act[loc] = copy.deepcopy(ds)
@@ -710,12 +716,11 @@ class Steel:
 
                     for steel_type in steel_prod_names[steel_market]:
                         try:
-                            ds = ws.get_one(
-                                self.db,
+                            ds = self.db.get_one(
                                 *[
-                                    ws.contains("name", steel_type),
-                                    ws.equals("location", d),
-                                    ws.contains("reference product", "steel")
+                                    contains("name", steel_type),
+                                    equals("location", d),
+                                    contains("reference product", "steel")
                                 ]
                             )
 
@@ -723,48 +728,44 @@ class Steel:
 
                             try:
 
-                                ds = ws.get_one(
-                                    self.db,
+                                ds = self.db.get_one(
                                     *[
-                                        ws.contains("name", steel_type),
-                                        ws.either(*[ws.equals("location", l) for l in self.geo.geo.contained(d)]),
-                                        ws.contains("reference product", "steel")
+                                        contains("name", steel_type),
+                                        either(*[equals("location", l) for l in self.geo.geo.contained(d)]),
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
 
                             except ws.NoResults:
-                                ds = ws.get_one(
-                                    self.db,
+                                ds = self.db.get_one(
                                     *[
-                                        ws.contains("name", steel_type),
-                                        ws.equals("location", "RoW"),
-                                        ws.contains("reference product", "steel")
+                                        contains("name", steel_type),
+                                        equals("location", "RoW"),
+                                        contains("reference product", "steel")
                                     ]
                                 )
                             except ws.MultipleResults:
 
-                                ds = ws.get_one(
-                                    self.db,
+                                ds = self.db.get_one(
                                     *[
-                                        ws.contains("name", steel_type),
+                                        contains("name", steel_type),
 
-                                        ws.equals("location", "CH"),
+                                        equals("location", "CH"),
 
-                                        ws.contains("reference product", "steel")
+                                        contains("reference product", "steel")
                                     ]
                                 )
 
                         except ws.MultipleResults:
 
-                            ds = ws.get_one(
-                                self.db,
+                            ds = self.db.get_one(
                                 *[
-                                    ws.contains("name", steel_type),
+                                    contains("name", steel_type),
 
-                                    ws.equals("location", "CH"),
+                                    equals("location", "CH"),
 
-                                    ws.contains("reference product", "steel")
+                                    contains("reference product", "steel")
                                 ]
                             )
 
@@ -821,8 +822,7 @@ class Steel:
                     }
                 )
 
-            self.db = [act for act in self.db
-                      if act["name"] != steel_market]
+            self.db.remove_datasets(lambda act: act["name"] == steel_market)
 
             self.db.extend([v for v in d_act.values()])
 
@@ -831,9 +831,8 @@ class Steel:
         with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
 
             # Loop through datasets that are not steel markets
-            for ds in ws.get_many(
-                        self.db,
-                        ws.doesnt_contain_any("name", ["market for steel, low-alloyed"])
+            for ds in self.db.get_many(
+                        doesnt_contain_any("name", ["market for steel, low-alloyed"])
             ):
                 # Loop through technosphere exchanges that receive an input from the steel market
                 excs = (exc for exc in ws.technosphere(ds) if exc["name"] == "market for steel, low-alloyed")
@@ -842,11 +841,10 @@ class Steel:
 
                     # First, try to find a steel market that has the same location as the dataset
                     try:
-                        new_supplier = ws.get_one(
-                            self.db,
-                            ws.equals("name", "market for steel, low-alloyed"),
-                            ws.equals("location", ds["location"]),
-                            ws.contains("reference product", "steel")
+                        new_supplier = self.db.get_one(
+                            equals("name", "market for steel, low-alloyed"),
+                            equals("location", ds["location"]),
+                            contains("reference product", "steel")
                         )
 
                         exc["location"] = new_supplier["location"]
@@ -859,15 +857,14 @@ class Steel:
                             # Let's try to find a steel market dataset which location
                             # is included in that IAM region
                             if ds["location"] in self.iam_data.regions:
-                                new_supplier = ws.get_one(
-                                    self.db,
+                                new_supplier = self.db.get_one(
                                     *[
-                                        ws.contains("name", "market for steel, low-alloyed"),
-                                        ws.either(*[ws.equals("location", l[1]) if isinstance(l, tuple) else ws.equals(
+                                        contains("name", "market for steel, low-alloyed"),
+                                        either(*[equals("location", l[1]) if isinstance(l, tuple) else equals(
                                             "location", l)
                                                     for l in self.geo.iam_to_ecoinvent_location(ds["location"])
                                                     ]),
-                                        ws.contains("reference product", "steel")
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
@@ -882,12 +879,11 @@ class Steel:
                                                      for l in self.geo.geo.contained(ds["location"])]
                                     possible_locs = [l for l in possible_locs if l != "GLO"]
 
-                                    new_supplier = ws.get_one(
-                                        self.db,
+                                    new_supplier = self.db.get_one(
                                         *[
-                                            ws.contains("name", "market for steel, low-alloyed"),
-                                            ws.either(*[ws.equals("location", l) for l in possible_locs]),
-                                            ws.contains("reference product", "steel")
+                                            contains("name", "market for steel, low-alloyed"),
+                                            either(*[equals("location", l) for l in possible_locs]),
+                                            contains("reference product", "steel")
 
                                         ]
                                     )
@@ -901,13 +897,12 @@ class Steel:
                                     possible_locs = [l[1] if isinstance(l, tuple) else l
                                                      for l in self.geo.geo.within(ds["location"])]
                                     possible_locs = [l for l in possible_locs if l != "GLO"]
-                                    new_supplier = ws.get_one(
-                                        self.db,
+                                    new_supplier = self.db.get_one(
                                         *[
-                                            ws.contains("name", "market for steel, low-alloyed"),
-                                            ws.either(*[
-                                                ws.equals("location", l) for l in possible_locs]),
-                                            ws.contains("reference product", "steel")
+                                            contains("name", "market for steel, low-alloyed"),
+                                            either(*[
+                                                equals("location", l) for l in possible_locs]),
+                                            contains("reference product", "steel")
 
                                         ]
                                     )
@@ -922,13 +917,12 @@ class Steel:
                                                      for l in self.geo.geo.contained(ds["location"])]
                                     possible_locs = [l for l in possible_locs if l != "GLO"]
 
-                                    possible_suppliers = ws.get_many(
-                                        self.db,
+                                    possible_suppliers = self.db.get_many(
                                         *[
-                                            ws.contains("name", "market for steel, low-alloyed"),
-                                            ws.either(
-                                                *[ws.equals("location", l) for l in possible_locs]),
-                                            ws.contains("reference product", "steel")
+                                            contains("name", "market for steel, low-alloyed"),
+                                            either(
+                                                *[equals("location", l) for l in possible_locs]),
+                                            contains("reference product", "steel")
 
                                         ]
                                     )
@@ -961,11 +955,10 @@ class Steel:
                         except KeyError:
 
                             if ds["location"] == "Europe without Austria":
-                                new_supplier = ws.get_one(
-                                    self.db,
-                                    ws.equals("name", "market for steel, low-alloyed"),
-                                    ws.equals("location", "RER"),
-                                    ws.contains("reference product", "steel")
+                                new_supplier = self.db.get_one(
+                                    equals("name", "market for steel, low-alloyed"),
+                                    equals("location", "RER"),
+                                    contains("reference product", "steel")
                                 )
                                 exc["location"] = new_supplier["location"]
 
@@ -981,13 +974,12 @@ class Steel:
                                                  for l in self.geo.geo.within(ds["location"])]
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
 
-                                new_supplier = ws.get_one(
-                                    self.db,
+                                new_supplier = self.db.get_one(
                                     *[
-                                        ws.contains("name", "market for steel, low-alloyed"),
-                                        ws.either(*[
-                                            ws.equals("location", l) for l in possible_locs]),
-                                        ws.contains("reference product", "steel")
+                                        contains("name", "market for steel, low-alloyed"),
+                                        either(*[
+                                            equals("location", l) for l in possible_locs]),
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
@@ -995,11 +987,10 @@ class Steel:
 
                             # If this fails, then we use the GLO steel market
                             except (ws.NoResults, KeyError):
-                                new_supplier = ws.get_one(
-                                    self.db,
-                                    ws.equals("name", "market for steel, low-alloyed"),
-                                    ws.equals("location", "GLO"),
-                                    ws.contains("reference product", "steel")
+                                new_supplier = self.db.get_one(
+                                    equals("name", "market for steel, low-alloyed"),
+                                    equals("location", "GLO"),
+                                    contains("reference product", "steel")
                                 )
                                 exc["location"] = new_supplier["location"]
 
@@ -1012,13 +1003,12 @@ class Steel:
                                                  for l in self.geo.geo.contained(ds["location"])]
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
 
-                                possible_suppliers = ws.get_many(
-                                    self.db,
+                                possible_suppliers = self.db.get_many(
                                     *[
-                                        ws.contains("name", "market for steel, low-alloyed"),
-                                        ws.either(
-                                            *[ws.equals("location", l) for l in possible_locs]),
-                                        ws.contains("reference product", "steel")
+                                        contains("name", "market for steel, low-alloyed"),
+                                        either(
+                                            *[equals("location", l) for l in possible_locs]),
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
@@ -1053,15 +1043,14 @@ class Steel:
 
                             if ds["location"] in self.iam_data.regions:
 
-                                possible_suppliers = ws.get_many(
-                                    self.db,
+                                possible_suppliers = self.db.get_many(
                                     *[
-                                        ws.contains("name", "market for steel, low-alloyed"),
-                                        ws.either(*[ws.equals("location", l[1]) if isinstance(l, tuple) else ws.equals(
+                                        contains("name", "market for steel, low-alloyed"),
+                                        either(*[equals("location", l[1]) if isinstance(l, tuple) else equals(
                                             "location", l)
                                                     for l in self.geo.iam_to_ecoinvent_location(ds["location"])
                                                     ]),
-                                        ws.contains("reference product", "steel")
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
@@ -1074,12 +1063,11 @@ class Steel:
                                                  for l in self.geo.geo.contained(ds["location"])]
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
 
-                                possible_suppliers = ws.get_many(
-                                    self.db,
+                                possible_suppliers = self.db.get_many(
                                     *[
-                                        ws.contains("name", "market for steel, low-alloyed"),
-                                        ws.either(*[ws.equals("location", l) for l in possible_locs]),
-                                        ws.contains("reference product", "steel")
+                                        contains("name", "market for steel, low-alloyed"),
+                                        either(*[equals("location", l) for l in possible_locs]),
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
@@ -1114,15 +1102,14 @@ class Steel:
 
                         if ds["location"] in self.iam_data.regions:
 
-                            possible_suppliers = ws.get_many(
-                                self.db,
+                            possible_suppliers = self.db.get_many(
                                 *[
-                                    ws.contains("name", "market for steel, low-alloyed"),
-                                    ws.either(*[ws.equals("location", l[1]) if isinstance(l, tuple) else ws.equals(
+                                    contains("name", "market for steel, low-alloyed"),
+                                    either(*[equals("location", l[1]) if isinstance(l, tuple) else equals(
                                         "location", l)
                                                 for l in self.geo.iam_to_ecoinvent_location(ds["location"])
                                                 ]),
-                                    ws.contains("reference product", "steel")
+                                    contains("reference product", "steel")
 
                                 ]
                             )
@@ -1135,12 +1122,11 @@ class Steel:
                                              for l in self.geo.geo.contained(ds["location"])]
                             possible_locs = [l for l in possible_locs if l != "GLO"]
 
-                            possible_suppliers = ws.get_many(
-                                    self.db,
+                            possible_suppliers = self.db.get_many(
                                     *[
-                                        ws.contains("name", "market for steel, low-alloyed"),
-                                        ws.either(*[ws.equals("location", l) for l in possible_locs]),
-                                        ws.contains("reference product", "steel")
+                                        contains("name", "market for steel, low-alloyed"),
+                                        either(*[equals("location", l) for l in possible_locs]),
+                                        contains("reference product", "steel")
 
                                     ]
                                 )
@@ -0,0 +1,498 @@
+"""
+Generate synthetic databases shaped like ecoinvent, to test and benchmark
+the transformations without an ecoinvent licence.
+"""
+
+from . import DATA_DIR
+from .activity_maps import InventorySet
+from .data_collection import IAM_ELEC_MARKETS, IAM_ELEC_EFFICIENCIES
+import csv
+import hashlib
+import random
+
+REGION_MAPPING_FILEPATH = DATA_DIR / "regionmappingH12.csv"
+BIOSPHERE_FLOWS_FILEPATH = DATA_DIR / "flows_biosphere_37.csv"
+
+# Number of datasets of the databases used in the benchmarks
+DATABASE_SIZES = {"small": 1000, "medium": 20000, "large": 100000}
+
+# Countries that host most of the datasets of ecoinvent come first
+MAIN_COUNTRIES = ["CH", "DE", "FR", "US", "CN", "IN", "BR", "JP", "GB", "IT", "ES", "CA", "ZA", "AU", "RU"]
+
+REGIONAL_LOCATIONS = ["GLO", "RoW", "RER", "Europe without Switzerland", "RNA", "RAS", "RLA", "RAF"]
+
+ELECTRICITY_PRODUCTS = {
+    "high voltage": "electricity, high voltage",
+    "medium voltage": "electricity, medium voltage",
+    "low voltage": "electricity, low voltage",
+}
+
+CEMENT_TYPES = [
+    "Portland",
+    "alternative constituents 6-20%",
+    "alternative constituents 21-35%",
+    "blast furnace slag 18-30% and 18-30% other alternative constituents",
+    "blast furnace slag 31-50% and 31-50% other alternative constituents",
+]
+
+STEEL_TYPES = ["low-alloyed", "unalloyed", "chromium steel 18/8"]
+
+# Fuels, with their unit and the emissions from their combustion
+FUELS = {
+    "hard coal": ("kilogram", ["Carbon dioxide, fossil", "Sulfur dioxide", "Nitrogen oxides"]),
+    "lignite": ("kilogram", ["Carbon dioxide, fossil", "Sulfur dioxide", "Particulates, > 10 um"]),
+    "natural gas, high pressure": ("cubic meter", ["Carbon dioxide, fossil", "Methane, fossil"]),
+    "heavy fuel oil": ("kilogram", ["Carbon dioxide, fossil", "Sulfur dioxide"]),
+    "diesel": ("kilogram", ["Carbon dioxide, fossil", "Nitrogen oxides"]),
+    "wood chips, wet, measured as dry mass": ("kilogram", ["Carbon dioxide, non-fossil"]),
+}
+
+# Variables of the steel and cement sectors, on top of those of the electricity sector
+IAM_SECTOR_VARIABLES = [
+    "Production|Industry|Steel",
+    "Production|Industry|Steel|Primary",
+    "Production|Industry|Steel|Secondary",
+    "FE|Industry|Electricity|Steel|Primary",
+    "FE|Industry|Electricity|Steel|Secondary",
+    "FE|Industry|Gases|Steel|Primary",
+    "FE|Industry|Solids|Steel|Primary",
+    "SE|Gases|Natural Gas",
+    "SE|Solids|Coal",
+    "Emi|CCO2|FFaI|Industry|Cement",
+    "Emi|CO2|FFaI|Industry|Cement",
+]
+
+# Fuel burned by the power plants, by keyword of the technology
+POWERPLANT_FUELS = {
+    "coal": "hard coal",
+    "lignite": "lignite",
+    "gas": "natural gas, high pressure",
+    "oil": "heavy fuel oil",
+    "biomass": "wood chips, wet, measured as dry mass",
+}
+
+
+def get_code(*fields):
+    """Return a code that only depends on the fields identifying a dataset."""
+    return hashlib.md5("|".join(fields).encode()).hexdigest()
+
+
+def get_countries():
+    with open(REGION_MAPPING_FILEPATH) as f:
+        reader = csv.reader(f, delimiter=";")
+        next(reader)
+        countries = [row[1] for row in reader]
+    return MAIN_COUNTRIES + [c for c in countries if c not in MAIN_COUNTRIES]
+
+
+def get_iam_regions():
+    with open(REGION_MAPPING_FILEPATH) as f:
+        reader = csv.reader(f, delimiter=";")
+        next(reader)
+        return sorted(set(row[2] for row in reader))
+
+
+def get_biosphere_flows():
+    """Return the biosphere flows emitted to air, by name, as (categories, unit, code)."""
+    flows = {}
+    with open(BIOSPHERE_FLOWS_FILEPATH) as f:
+        for name, category, subcategory, unit, code in csv.reader(f, delimiter=";"):
+            if category == "air" and subcategory == "unspecified":
+                flows.setdefault(name, ((category, subcategory), unit, code))
+    return flows
+
+
+def get_activities(n_locations):
+    """
+    Return the activities of the sectors premise transforms, as tuples of
+    name, reference product, unit, locations, inputs (as reference products) and emissions.
+    """
+    countries = get_countries()[:n_locations]
+    regions = REGIONAL_LOCATIONS
+    elec_hv, elec_mv, elec_lv = ELECTRICITY_PRODUCTS.values()
+    activities = []
+
+    for fuel, (unit, emissions) in FUELS.items():
+        activities.append((fuel + " production", fuel, unit, regions[:3], [], []))
+        activities.append(("market for " + fuel, fuel, unit, regions[:3], [], []))
+
+    # Power plants, named after the filters the electricity sector relies on
+    for tech, fltr in InventorySet.powerplant_filters.items():
+        names = fltr["fltr"] if isinstance(fltr["fltr"], list) else [fltr["fltr"]]
+        fuel = next((f for k, f in POWERPLANT_FUELS.items() if k in tech.lower()), None)
+        inputs = [fuel] if fuel else []
+        emissions = FUELS[fuel][1] if fuel else []
+        product = elec_lv if "photovoltaic" in names[0] else elec_hv
+        for name in names:
+            activities.append((name, product, "kilowatt hour", countries, inputs, emissions))
+
+    for voltage, product in ELECTRICITY_PRODUCTS.items():
+        activities.append(
+            ("market for electricity, " + voltage, product, "kilowatt hour", countries, [], [])
+        )
+        activities.append(
+            ("market group for electricity, " + voltage, product, "kilowatt hour", regions[:3], [], [])
+        )
+    activities.append(
+        ("electricity voltage transformation from high to medium voltage", elec_mv, "kilowatt hour",
+         countries, [elec_hv], ["Sulfur hexafluoride"])
+    )
+    activities.append(
+        ("electricity voltage transformation from medium to low voltage", elec_lv, "kilowatt hour",
+         countries, [elec_mv], ["Sulfur hexafluoride"])
+    )
+
+    # Cement and clinker
+    activities.append(
+        ("clinker production", "clinker", "kilogram", countries[:10] + regions[:2],
+         ["hard coal", "heavy fuel oil", elec_mv],
+         ["Carbon dioxide, fossil", "Nitrogen oxides", "Sulfur dioxide", "Mercury"])
+    )
+    activities.append(("market for clinker", "clinker", "kilogram", regions[:2], [], []))
+    for cement in CEMENT_TYPES:
+        product = "cement, " + cement
+        activities.append(
+            ("cement production, " + cement, product, "kilogram", countries[:10] + regions[:2],
+             ["clinker", elec_mv], ["Particulates, > 10 um"])
+        )
+        activities.append(("market for " + product, product, "kilogram", regions[:2], [], []))
+
+    # Steel
+    for steel in STEEL_TYPES:
+        product = "steel, " + steel
+        for route, inputs in (
+            ("converter", ["hard coal", elec_mv]),
+            ("electric", [elec_mv, "natural gas, high pressure"]),
+        ):
+            activities.append(
+                ("steel production, {}, {}".format(route, steel), product, "kilogram",
+                 countries[:10] + regions[:2], inputs, ["Carbon dioxide, fossil", "Carbon monoxide, fossil"])
+            )
+        activities.append(("market for " + product, product, "kilogram", regions[:2], [], []))
+
+    return activities
+
+
+def generate_database(
+    n_datasets=DATABASE_SIZES["small"],
+    n_technosphere=15,
+    n_biosphere=10,
+    n_locations=None,
+    seed=0,
+    database="ecoinvent",
+):
+    """
+    Return a database in the format of a cleaned ecoinvent database, with datasets for electricity
+    (power plants, markets, market groups and voltage transformation), clinker, cement, steel and fuels,
+    and generic datasets for the rest. Datasets consume the products of one another,
+    and emit biosphere flows of the biosphere3 database.
+
+    The same arguments always return the same database.
+
+    :param n_datasets: number of datasets
+    :type n_datasets: int
+    :param n_technosphere: average number of technosphere exchanges per dataset, on top of their inputs
+    :type n_technosphere: int
+    :param n_biosphere: average number of biosphere exchanges per dataset, on top of their emissions
+    :type n_biosphere: int
+    :param n_locations: number of countries the electricity, cement and steel datasets are located in.
+        By default, it grows with `n_datasets`.
+    :type n_locations: int
+    :param seed: seed of the random number generator
+    :type seed: int
+    :param database: name of the database
+    :type database: str
+    :return: a list of datasets
+    :rtype: list
+    """
+    rnd = random.Random(seed)
+
+    if n_locations is None:
+        n_locations = max(5, min(len(get_countries()), n_datasets // 200))
+
+    specs = {}
+    for name, product, unit, locations, inputs, emissions in get_activities(n_locations):
+        for location in locations:
+            specs.setdefault((name, product, location), (unit, inputs, emissions))
+    specs = [k + v for k, v in specs.items()][:n_datasets]
+
+    # Generic products have several producers in each location, as in ecoinvent
+    countries = get_countries()
+    n_products = max(1, (n_datasets - len(specs)) // 5)
+    for i in range(n_datasets - len(specs)):
+        product = "generic product {}".format(i % n_products)
+        specs.append(
+            ("{} production, route {}".format(product, i // n_products), product,
+             rnd.choice(countries[:n_locations] + REGIONAL_LOCATIONS[:2]),
+             rnd.choice(["kilogram", "unit", "megajoule"]), [], [])
+        )
+
+    db = []
+    # Consumers are supplied by markets, and markets (and market groups) by producers
+    markets, producers = {}, {}
+    for name, product, location, unit, _, _ in specs:
+        ds = {
+            "name": name,
+            "reference product": product,
+            "location": location,
+            "unit": unit,
+            "database": database,
+            "code": get_code(name, product, location),
+            "comment": "Synthetic dataset.",
+            "parameters": {},
+            "exchanges": [
+                {
+                    "name": name,
+                    "product": product,
+                    "location": location,
+                    "unit": unit,
+                    "amount": 1.0,
+                    "type": "production",
+                    "production volume": round(rnd.uniform(1e3, 1e9)),
+                    "uncertainty type": 0,
+                    "input": (database, get_code(name, product, location)),
+                }
+            ],
+        }
+        db.append(ds)
+        if name.startswith("market for "):
+            markets.setdefault(product, {}).setdefault(location, []).append(ds)
+        elif not name.startswith("market group for "):
+            producers.setdefault(product, {}).setdefault(location, []).append(ds)
+
+    def get_suppliers(product, location, suppliers):
+        by_location = suppliers.get(product) or producers[product]
+        return (
+            by_location.get(location)
+            or by_location.get("RoW")
+            or by_location.get("GLO")
+            or next(iter(by_location.values()))
+        )
+
+    def technosphere(supplier):
+        return {
+            "name": supplier["name"],
+            "product": supplier["reference product"],
+            "location": supplier["location"],
+            "unit": supplier["unit"],
+            "amount": rnd.uniform(1e-4, 1.0),
+            "type": "technosphere",
+            "uncertainty type": 2,
+            "loc": 0.0,
+            "scale": 0.1,
+            "input": (database, supplier["code"]),
+        }
+
+    flows = get_biosphere_flows()
+    flow_names = sorted(flows)
+
+    def biosphere(name):
+        categories, unit, code = flows[name]
+        return {
+            "name": name,
+            "categories": categories,
+            "unit": unit,
+            "amount": rnd.uniform(1e-9, 1e-1),
+            "type": "biosphere",
+            "uncertainty type": 2,
+            "loc": 0.0,
+            "scale": 0.1,
+            "input": ("biosphere3", code),
+        }
+
+    products = list(producers)
+    for ds, (_, _, location, _, inputs, emissions) in zip(db, specs):
+        if ds["name"].startswith(("market for ", "market group for ")):
+            # Markets are supplied by all the producers of their location
+            if ds["reference product"] in producers:
+                for supplier in get_suppliers(ds["reference product"], location, producers):
+                    ds["exchanges"].append(technosphere(supplier))
+            continue
+        for product in inputs:
+            if product in producers:
+                supplier = rnd.choice(get_suppliers(product, location, markets))
+                ds["exchanges"].append(technosphere(supplier))
+        for _ in range(rnd.randint(0, 2 * n_technosphere)):
+            supplier = rnd.choice(get_suppliers(rnd.choice(products), location, markets))
+            ds["exchanges"].append(technosphere(supplier))
+        for name in emissions:
+            if name in flows:
+                ds["exchanges"].append(biosphere(name))
+        for _ in range(rnd.randint(0, 2 * n_biosphere)):
+            ds["exchanges"].append(biosphere(rnd.choice(flow_names)))
+
+    return db
+
+
+def write_iam_file(directory, pathway="SSP2-Base", seed=0):
+    """
+    Write a REMIND output file, with the variables premise reads for each REMIND region,
+    from 2005 to 2100. Values are random, but positive and increasing over time.
+
+    :param directory: directory to write `remind_<pathway>.mif` in
+    :type directory: pathlib.Path
+    :param pathway: name of the pathway
+    :type pathway: str
+    :param seed: seed of the random number generator
+    :type seed: int
+    :return: path to the file
+    :rtype: pathlib.Path
+    """
+    rnd = random.Random(seed)
+
+    variables = set(IAM_SECTOR_VARIABLES)
+    for filepath in (IAM_ELEC_MARKETS, IAM_ELEC_EFFICIENCIES):
+        with open(filepath) as f:
+            variables.update(
+                row[2] for row in csv.reader(f, delimiter=";") if row[0] == "remind"
+            )
+
+    years = list(range(2005, 2105, 5))
+    filepath = directory / "remind_{}.mif".format(pathway)
+    with open(filepath, "w") as f:
+        writer = csv.writer(f, delimiter=";", lineterminator=";\n")
+        writer.writerow(["Model", "Scenario", "Region", "Variable", "Unit"] + years)
+        for region in get_iam_regions() + ["World"]:
+            for variable in sorted(variables):
+                value, growth = rnd.uniform(1, 10), rnd.uniform(0, 0.05)
+                writer.writerow(
+                    ["REMIND", pathway, region, variable, "EJ/yr"]
+                    + [round(value * (1 + growth) ** (y - 2005), 4) for y in years]
+                )
+    return filepath
+
+
+ECOSPOLD_DATASET = """<?xml version="1.0" encoding="UTF-8"?>
+<ecoSpold xmlns="http://www.EcoInvent.org/EcoSpold02">
+  <activityDataset>
+    <activityDescription>
+      <activity id="{activity}" activityNameId="{activity}">
+        <activityName>{name}</activityName>
+        <generalComment><text index="0">Synthetic dataset.</text></generalComment>
+      </activity>
+      <geography><shortname>{location}</shortname></geography>
+      <technology/>
+      <timePeriod/>
+    </activityDescription>
+    <flowData>
+{exchanges}
+    </flowData>
+    <administrativeInformation>
+      <dataEntryBy personName="premise"/>
+      <dataGeneratorAndPublication personName="premise"/>
+    </administrativeInformation>
+  </activityDataset>
+</ecoSpold>
+"""
+ECOSPOLD_EXCHANGE = """      <intermediateExchange id="{id}" intermediateExchangeId="{product}" {link}amount="{amount}">
+        <name>{name}</name>
+        <unitName>{unit}</unitName>
+        <{group}>{group_value}</{group}>
+      </intermediateExchange>"""
+
+
+def write_ecospold_files(directory, n_datasets, n_exchanges=15, seed=0):
+    """
+    Write `n_datasets` ecospold2 files, each with a reference product and `n_exchanges`
+    inputs from the other datasets, e.g., to benchmark the extraction of an ecospold2 database.
+
+    :param directory: directory to write the files in
+    :type directory: pathlib.Path
+    :param n_datasets: number of datasets
+    :type n_datasets: int
+    :param n_exchanges: number of technosphere exchanges of each dataset
+    :type n_exchanges: int
+    :param seed: seed of the random number generator
+    :type seed: int
+    :return: the paths to the files
+    :rtype: list
+    """
+    rnd = random.Random(seed)
+    locations = MAIN_COUNTRIES + REGIONAL_LOCATIONS
+    units = ["kg", "kWh", "MJ", "m3", "unit"]
+    datasets = []
+    for i in range(n_datasets):
+        datasets.append(
+            {
+                "activity": get_code("activity", str(i)),
+                "product": get_code("product", str(i // 3)),
+                "name": "synthetic activity {}".format(i),
+                "product name": "synthetic product {}".format(i // 3),
+                "location": rnd.choice(locations),
+                "unit": units[(i // 3) % len(units)],
+            }
+        )
+
+    filepaths = []
+    for ds in datasets:
+        exchanges = [
+            ECOSPOLD_EXCHANGE.format(
+                id=get_code(ds["activity"], "production"),
+                product=ds["product"],
+                link="",
+                amount=1,
+                name=ds["product name"],
+                unit=ds["unit"],
+                group="outputGroup",
+                group_value=0,
+            )
+        ]
+        for supplier in rnd.sample(datasets, min(n_exchanges, n_datasets)):
+            exchanges.append(
+                ECOSPOLD_EXCHANGE.format(
+                    id=get_code(ds["activity"], supplier["activity"]),
+                    product=supplier["product"],
+                    link='activityLinkId="{}" '.format(supplier["activity"]),
+                    amount=round(rnd.uniform(0.001, 10), 4),
+                    name=supplier["product name"],
+                    unit=supplier["unit"],
+                    group="inputGroup",
+                    group_value=5,
+                )
+            )
+        filepath = directory / "{}_{}.spold".format(ds["activity"], ds["product"])
+        filepath.write_text(
+            ECOSPOLD_DATASET.format(exchanges="\n".join(exchanges), **ds), encoding="utf-8"
+        )
+        filepaths.append(filepath)
+    return filepaths
+
+
+def write_brightway_database(db, name="ecoinvent"):
+    """
+    Write the database `db`, returned by :func:`generate_database`, and the biosphere flows it
+    emits, in the `biosphere3` database, in the current brightway project.
+
+    :param db: the database
+    :type db: list
+    :param name: name of the brightway database
+    :type name: str
+    """
+    from bw2data import Database
+
+    flows = {
+        exc["input"]: {
+            "name": exc["name"],
+            "categories": exc["categories"],
+            "unit": exc["unit"],
+            "type": "emission",
+        }
+        for ds in db
+        for exc in ds["exchanges"]
+        if exc["type"] == "biosphere"
+    }
+    Database("biosphere3").write(flows)
+
+    data = {}
+    for ds in db:
+        exchanges = []
+        for exc in ds["exchanges"]:
+            exc = {k: v for k, v in exc.items() if k not in ("name", "product", "location", "categories")}
+            exc["input"] = (name, exc["input"][1]) if exc["type"] != "biosphere" else exc["input"]
+            exchanges.append(exc)
+        data[(name, ds["code"])] = dict(
+            {k: v for k, v in ds.items() if k not in ("exchanges", "database", "code")},
+            type="process",
+            exchanges=exchanges,
+        )
+    Database(name).write(data)
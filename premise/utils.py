@@ -4,6 +4,13 @@ import pandas as pd
 from .export import *
 import numpy as np
 from wurst import searching as ws
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
 
 CO2_FUELS = DATA_DIR / "fuel_co2_emission_factor.txt"
 LHV_FUELS = DATA_DIR / "fuels_lower_heating_value.txt"
@@ -19,6 +26,41 @@ EFFICIENCY_RATIO_SOLAR_PV = DATA_DIR / "renewables" / "efficiency_solar_PV.csv"
 def eidb_label(model, scenario, year):
     return "ecoinvent_" + model + "_" + scenario + "_" + str(year)
 
+def get_memory_usage():
+    """
+    Return the memory used by the current process, in megabytes:
+    * "peak RSS": peak resident set size since the process started
+    * "RSS": current resident set size
+    * "private": memory that is not shared with other processes. For a forked worker,
+    this is the memory it does not share with its parent through copy-on-write pages.
+
+    Values that cannot be measured on the current platform are None.
+    "RSS" and "private" are only available on Linux.
+
+    :return: dictionary with memory measurements
+    :rtype: dict
+    """
+    usage = {"peak RSS": None, "RSS": None, "private": None}
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        usage["peak RSS"] = peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(
+                (line.split()[0].rstrip(":"), int(line.split()[1]))
+                for line in f.readlines()[1:]
+            )
+        usage["RSS"] = fields["Rss"] / 1024
+        usage["private"] = (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024
+    except (OSError, KeyError, ValueError, IndexError):
+        pass
+
+    return {k: round(v, 1) if v is not None else None for k, v in usage.items()}
+
+
 def get_correspondance_remind_to_fuels():
     """
     Return a dictionary with REMIND fuels as keys and ecoinvent activity names and reference products as values.
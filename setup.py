@@ -42,6 +42,7 @@ setup(
         'carculator',
         'carculator_truck',
         'prettytable',
+        'appdirs',
         'pycountry'
     ],
     url="https://github.com/romainsacchi/premise",
@@ -52,3 +52,20 @@ def test_content_dict():
     assert plants['Coal IGCC'] == {'electricity production, at power plant/lignite, IGCC, no CCS'}
     emissions = maps.get_remind_to_ecoinvent_emissions()
     assert emissions['Sulfur dioxide'] == 'SO2'
+
+
+def test_maps_are_shared():
+    from premise.database_index import IndexedDatabase
+
+    db = IndexedDatabase(dummy_minimal_db)
+    plants = InventorySet(db).generate_powerplant_map()
+    assert plants == InventorySet(dummy_minimal_db).generate_powerplant_map()
+    # computed once for this version of the database
+    assert db._memo["SortedFieldIndex"][1]["name"] is InventorySet(db).get_indexes()["name"]
+
+    db.append({'name': 'electricity production, at power plant/lignite, IGCC, no CCS, new',
+               'location': 'CH', 'unit': 'kilowatt hour', 'reference product': 'electricity'})
+    assert len(InventorySet(db).generate_powerplant_map()['Coal IGCC']) == 2
+
+    exact = InventorySet.act_fltr(dummy_minimal_db, "electricity production, oil", filter_exact=True)
+    assert exact == [dummy_minimal_db[15]]
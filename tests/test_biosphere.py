@@ -0,0 +1,32 @@
+# content of test_biosphere.py
+import pytest
+from premise import DATA_DIR
+from premise.biosphere import BiosphereRegistry, get_biosphere_registry, get_flow_key
+
+FILEPATH_BIOSPHERE_FLOWS = DATA_DIR / "dict_biosphere.txt"
+
+
+def test_registry():
+    registry = get_biosphere_registry(FILEPATH_BIOSPHERE_FLOWS)
+    assert get_biosphere_registry(str(FILEPATH_BIOSPHERE_FLOWS)) is registry
+
+    key = ('1,4-Butanediol', 'air', 'urban air close to ground', 'kilogram')
+    code = '38a622c6-f086-4763-a952-7c6b3b1c42ba'
+    assert registry.code_by_key[key] == code
+    assert registry.key_by_code[code] == key
+    assert registry.keys[registry.index_by_code[code]] == key
+    assert registry.index_by_key[key] == 0
+
+    # Keys listed several times are mapped to their last code, as when the file was read in a dictionary
+    assert len(registry.code_by_key) < len(registry)
+    assert all(registry.code_by_key[k] == registry.codes[i] for k, i in registry.index_by_key.items())
+
+    with pytest.raises(FileNotFoundError):
+        BiosphereRegistry(DATA_DIR / "missing.txt")
+
+
+def test_flow_key():
+    exc = {'name': 'Ethanol', 'categories': ('water',), 'unit': 'kilogram'}
+    assert get_flow_key(exc) == ('Ethanol', 'water', 'unspecified', 'kilogram')
+    exc['categories'] = ('water', 'surface water')
+    assert get_flow_key(exc) == ('Ethanol', 'water', 'surface water', 'kilogram')
@@ -0,0 +1,26 @@
+# content of test_brightway_reader.py
+import bw2data
+import pytest
+from wurst.brightway.extract_database import extract_brightway2_databases
+from premise.brightway_reader import extract_brightway_database
+from premise.synthetic_database import generate_database, write_brightway_database
+
+
+@pytest.fixture
+def project():
+    bw2data.projects.set_current("premise-test-brightway-reader")
+    write_brightway_database(generate_database(100))
+    yield
+    bw2data.projects.set_current("default")
+    bw2data.projects.delete_project("premise-test-brightway-reader", delete_dir=True)
+
+
+def test_same_datasets_as_wurst(project):
+    db = extract_brightway_database("ecoinvent")
+    assert len(db) == 100
+    assert db == extract_brightway2_databases("ecoinvent")
+    assert extract_brightway_database(["ecoinvent"], max_workers=2) == db
+
+    exchanges = [exc for ds in db for exc in ds["exchanges"]]
+    assert all("product" in exc for exc in exchanges if exc["type"] == "technosphere")
+    assert all(exc["location"] for exc in exchanges if exc["type"] != "biosphere")
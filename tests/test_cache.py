@@ -0,0 +1,72 @@
+# content of test_cache.py
+from premise import cache
+from premise import INVENTORY_DIR
+
+
+def get_db():
+    db = [{
+        'code': 'argsthyfujgyftdgr',
+        'name': 'fake activity',
+        'reference product': 'fake product',
+        'location': 'IAI Area, Africa',
+        'unit': 'kilogram',
+        'exchanges': [
+            {'name': 'fake activity',
+             'product': 'fake product',
+             'amount': 1,
+             'type': 'production',
+             'unit': 'kilogram',
+             'input': ('dummy_db', '6543541'), },
+        ]
+    }]
+    return db
+
+
+def test_cache_key_depends_on_inputs(tmp_path):
+    spold = tmp_path / "ds.spold"
+    spold.write_text("<xml/>")
+    key_36 = cache.get_cache_key("ecoinvent", "ecospold", tmp_path, "3.6")
+    key_37 = cache.get_cache_key("ecoinvent", "ecospold", tmp_path, "3.7")
+    assert key_36 != key_37
+    assert key_36 == cache.get_cache_key("ecoinvent", "ecospold", tmp_path, "3.6")
+
+    additional = [{"filepath": INVENTORY_DIR / "lci-biogas.xlsx", "ecoinvent version": "3.7"}]
+    assert key_36 != cache.get_cache_key("ecoinvent", "ecospold", tmp_path, "3.6", additional)
+
+
+def test_cache_key_depends_on_code(tmp_path, monkeypatch):
+    spold = tmp_path / "ds.spold"
+    spold.write_text("<xml/>")
+    dependency = tmp_path / "dict_biosphere.txt"
+    dependency.write_text("1,4-Butanediol;air;urban air close to ground;kilogram;38a622c6")
+    monkeypatch.setattr(cache, "DEPENDENCIES", [dependency])
+    key = cache.get_cache_key("ecoinvent", "ecospold", tmp_path, "3.6")
+
+    dependency.write_text("1,4-Butanediol;air;urban air close to ground;kilogram;83bafcf1")
+    assert key != cache.get_cache_key("ecoinvent", "ecospold", tmp_path, "3.6")
+
+
+def test_save_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    assert cache.load_database_from_cache("abc") is None
+    cache.save_database_to_cache("abc", get_db())
+    assert cache.load_database_from_cache("abc") == get_db()
+    assert cache.clear_cache("abc") == 1
+    assert cache.load_database_from_cache("abc") is None
+
+
+def test_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    cache.save_database_to_cache("old", get_db())
+    cache.save_database_to_cache("new", get_db(), max_size=1)
+    assert not cache.get_cache_filepath("old").is_file()
+    assert cache.get_cache_filepath("new").is_file()
+
+
+def test_clear_cache_directory(tmp_path):
+    cache.save_database_to_cache("abc", get_db(), directory=tmp_path)
+    cache.save_database_to_cache("def", get_db(), directory=tmp_path)
+    assert cache.clear_cache("abc", directory=tmp_path) == 1
+    assert cache.load_database_from_cache("def", directory=tmp_path) == get_db()
+    assert cache.clear_cache(directory=tmp_path) == 1
+    assert cache.get_cache_entries(tmp_path) == []
@@ -0,0 +1,127 @@
+# content of test_checkpoint.py
+import numpy as np
+import xarray as xr
+from premise import checkpoint
+from premise.ecoinvent_modification import STAGES
+from premise.scheduler import Stage, StageScheduler
+
+
+def get_db():
+    db = [{
+        'code': 'argsthyfujgyftdgr',
+        'name': 'fake activity',
+        'reference product': 'fake product',
+        'location': 'IAI Area, Africa',
+        'unit': 'kilogram',
+        'exchanges': [
+            {'name': 'fake activity',
+             'product': 'fake product',
+             'amount': 1,
+             'type': 'production',
+             'unit': 'kilogram',
+             'input': ('dummy_db', '6543541'), },
+        ]
+    }]
+    return db
+
+
+def get_array(value):
+    return xr.DataArray(
+        np.array([[value, 2.0]]),
+        coords={"region": ["EUR"], "variables": ["SE|Electricity|Coal", "SE|Electricity|Gas"]},
+        dims=["region", "variables"],
+    )
+
+
+def test_fingerprint_of_arrays():
+    assert checkpoint.fingerprint(get_array(1.0)) == checkpoint.fingerprint(get_array(1.0))
+    assert checkpoint.fingerprint(get_array(1.0)) != checkpoint.fingerprint(get_array(1.5))
+    assert checkpoint.fingerprint({"a": 1, "b": 2}) == checkpoint.fingerprint({"b": 2, "a": 1})
+
+
+def test_only_changed_stages_are_recomputed(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_DIR", tmp_path)
+    calls = []
+
+    def scale(name):
+        def function(scenario, version):
+            calls.append(name)
+            for ds in scenario["database"]:
+                ds["exchanges"][0]["amount"] *= scenario["external data"][name]
+            return scenario
+        return function
+
+    stages = [
+        Stage("electricity", scale("electricity"), reads=["a"], writes=["a"],
+              inputs=lambda s: s["external data"]["electricity"]),
+        Stage("cement", scale("cement"), reads=["a", "b"], writes=["b"],
+              inputs=lambda s: s["external data"]["cement"]),
+        Stage("solar PV", scale("solar PV"), reads=["c"], writes=["c"],
+              inputs=lambda s: s["external data"]["solar PV"]),
+    ]
+    names = ["electricity", "cement", "solar PV"]
+
+    def run(external_data):
+        scenario = {
+            "model": "remind", "pathway": "SSP2-Base", "year": 2030,
+            "database": get_db(), "external data": external_data,
+        }
+        scenario = checkpoint.run_with_checkpoints(
+            StageScheduler(stages), scenario, "3.7.1", names, "key"
+        )
+        return scenario["database"][0]["exchanges"][0]["amount"]
+
+    assert run({"electricity": 2, "cement": 3, "solar PV": 5}) == 30
+    assert calls == names
+
+    calls.clear()
+    assert run({"electricity": 2, "cement": 3, "solar PV": 5}) == 30
+    assert calls == []
+
+    # solar PV does not depend on the other stages
+    calls.clear()
+    assert run({"electricity": 2, "cement": 3, "solar PV": 11}) == 66
+    assert calls == ["solar PV"]
+
+    # cement depends on electricity
+    calls.clear()
+    assert run({"electricity": 7, "cement": 3, "solar PV": 11}) == 231
+    assert calls == names
+
+
+def test_stages_are_recomputed_when_their_code_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_DIR", tmp_path / "checkpoints")
+    calls = []
+    code = tmp_path / "electricity.py"
+    code.write_text("FACTOR = 2")
+
+    def scale(scenario, version):
+        calls.append("electricity")
+        scenario["database"][0]["exchanges"][0]["amount"] *= 2
+        return scenario
+
+    stages = [Stage("electricity", scale, reads=["a"], writes=["a"], dependencies=[code])]
+
+    def run():
+        scenario = {
+            "model": "remind", "pathway": "SSP2-Base", "year": 2030,
+            "database": get_db(), "external data": {},
+        }
+        checkpoint.run_with_checkpoints(
+            StageScheduler(stages), scenario, "3.7.1", ["electricity"], "key"
+        )
+
+    run()
+    run()
+    assert calls == ["electricity"]
+
+    # The checkpoint is not reused once the code of the stage changed
+    code.write_text("FACTOR = 3")
+    run()
+    assert calls == ["electricity", "electricity"]
+
+
+def test_stage_dependencies_exist():
+    for stage in STAGES:
+        assert stage.dependencies
+        assert all(path.is_file() for path in stage.dependencies), stage.name
@@ -54,3 +54,42 @@ def test_validity_db():
 
     dbc = DatabaseCleaner("dummy_db", 'brightway', 'x')
     assert dbc.db[0]['name'] == 'fake activity'
+
+
+def test_fix_unset_locations():
+    dummy_db, dummy_bio = get_dict()
+    DatabaseChooser('dummy_bio').write(dummy_bio)
+    DatabaseChooser('dummy_db').write(dummy_db)
+    dbc = DatabaseCleaner("dummy_db", 'brightway', 'x')
+
+    dbc.db = [
+        {'name': 'unique', 'unit': 'kilogram', 'location': 'CH',
+         'exchanges': [
+             {'name': 'unique', 'unit': 'kilogram', 'amount': 1, 'type': 'production'},
+         ]},
+        {'name': 'twice', 'unit': 'kilogram', 'location': 'DE',
+         'exchanges': [
+             {'name': 'twice', 'unit': 'kilogram', 'amount': 1, 'type': 'production'},
+         ]},
+        {'name': 'twice', 'unit': 'kilogram', 'location': 'FR',
+         'exchanges': [
+             {'name': 'twice', 'unit': 'kilogram', 'amount': 1, 'type': 'production'},
+         ]},
+        {'name': 'consumer', 'unit': 'kilogram', 'location': 'RER',
+         'exchanges': [
+             {'name': 'consumer', 'unit': 'kilogram', 'amount': 1, 'type': 'production'},
+             {'name': 'unique', 'unit': 'kilogram', 'amount': 1, 'type': 'technosphere'},
+             {'name': 'twice', 'unit': 'kilogram', 'amount': 1, 'type': 'technosphere'},
+             {'name': 'missing', 'unit': 'kilogram', 'amount': 1, 'type': 'technosphere'},
+         ]},
+    ]
+    dbc.fix_unset_technosphere_and_production_exchange_locations()
+
+    exchanges = dbc.db[3]['exchanges']
+    assert [ds['exchanges'][0]['location'] for ds in dbc.db] == ['CH', 'DE', 'FR', 'RER']
+    assert exchanges[1]['location'] == 'CH'
+    assert 'location' not in exchanges[2]
+    assert 'location' not in exchanges[3]
+    assert dbc.get_locations_index()[('twice', 'kilogram')] == dbc.find_location_given_lookup_dict(
+        {'name': 'twice', 'unit': 'kilogram'}
+    )
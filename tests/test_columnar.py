@@ -0,0 +1,51 @@
+# content of test_columnar.py
+import copy
+
+import numpy as np
+import wurst
+
+from premise.columnar import ColumnarExchanges
+from premise.filters import contains, exclude
+from premise.synthetic_database import generate_database
+
+
+def get_db():
+    return generate_database(300)
+
+
+def test_rescale_matches_wurst():
+    db = get_db()
+    ref = copy.deepcopy(db)
+    factors = [0.5 + i / len(db) for i in range(len(db))]
+    emissions = contains("name", "dioxide")
+
+    for ds, factor in zip(ref, factors):
+        wurst.change_exchanges_by_constant_factor(ds, factor, [], [exclude(emissions)])
+        for exc in wurst.biosphere(ds, emissions):
+            if exc["amount"] == 0:
+                wurst.rescale_exchange(exc, 2.0 / 1, remove_uncertainty=True)
+            else:
+                wurst.rescale_exchange(exc, 2.0 / exc["amount"])
+
+    exchanges = ColumnarExchanges(db)
+    exchanges.rescale(
+        factors,
+        exchanges.select(types=("technosphere",))
+        | exchanges.select(exclude(emissions), types=("biosphere",)),
+    )
+    selected = exchanges.select(emissions, types=("biosphere",))
+    assert selected.any()
+    exchanges.rescale_to(np.full(len(exchanges.amount), 2.0), selected)
+    assert exchanges.write_back() > 0
+
+    assert db == ref
+
+
+def test_select():
+    db = get_db()
+    exchanges = ColumnarExchanges(db)
+    assert len(exchanges.amount) == sum(len(ds["exchanges"]) for ds in db)
+    production = exchanges.select(types=("production",))
+    assert production.sum() == len(db)
+    assert (exchanges.consumer[production] == np.arange(len(db))).all()
+    assert not exchanges.select(contains("name", "does not exist")).any()
@@ -0,0 +1,91 @@
+# content of test_compact.py
+import copy
+import json
+import pickle
+
+import pytest
+import wurst
+import wurst.searching as ws
+
+from premise.compact import CompactExchange, compact_database, expand_database, get_size
+from premise.copy_on_write import copy_on_write_database
+from premise import ecoinvent_modification
+from premise.synthetic_database import generate_database
+
+
+def get_db():
+    return pickle.loads(pickle.dumps(generate_database(200)))
+
+
+def test_compact_exchanges_behave_like_dictionaries():
+    db = get_db()
+    ref = copy.deepcopy(db)
+    size = get_size(db)
+    # Compacting warns that the exchanges must be expanded before serializing the database
+    with pytest.warns(UserWarning, match="expand_database"):
+        compact_database(db)
+
+    assert db == ref
+    assert get_size(db) < size
+    assert all(isinstance(exc, CompactExchange) for ds in db for exc in ds["exchanges"])
+
+    exc = db[0]["exchanges"][0]
+    assert dict(exc) == {**exc} == ref[0]["exchanges"][0]
+    assert list(ws.technosphere(db[0])) == list(ws.technosphere(ref[0]))
+
+    exc["comment"] = "a field without a slot"
+    exc["unit"] = "megajoule"
+    assert exc["comment"] == "a field without a slot" and exc["unit"] == "megajoule"
+    assert exc.pop("comment") == "a field without a slot" and "comment" not in exc
+    del exc["unit"]
+    assert exc.get("unit") is None and len(exc) == len(ref[0]["exchanges"][0]) - 1
+
+    amount = exc["amount"]
+    wurst.rescale_exchange(exc, 2.0)
+    assert exc["amount"] == 2 * amount
+
+    for other in (copy.deepcopy(exc), pickle.loads(pickle.dumps(exc)), exc.copy()):
+        assert isinstance(other, CompactExchange) and other == exc and other is not exc
+
+
+def test_expand_database():
+    with pytest.warns(UserWarning):
+        db = compact_database(get_db())
+    scenario = copy_on_write_database(db)
+    expanded = expand_database(scenario)
+    assert expanded == db
+    assert all(type(exc) is dict for ds in expanded for exc in ds["exchanges"])
+    # The base database is left unchanged
+    expanded[0]["exchanges"][0]["amount"] = -1
+    assert db[0]["exchanges"][0]["amount"] != -1
+
+
+
+class RecordingExport:
+    """Records the databases given to the exporter."""
+    databases = []
+
+    def __init__(self, database, *args):
+        self.databases.append(database)
+
+    def export_db_to_matrices(self):
+        pass
+
+    export_db_to_simapro = export_db_to_matrices
+
+
+def test_exports_expand_the_exchanges(monkeypatch):
+    with pytest.warns(UserWarning):
+        db = compact_database(get_db())
+    # The C encoder of json reads the hash table, which compact exchanges leave empty
+    assert json.dumps(db[0]["exchanges"][0]) == "{}"
+
+    monkeypatch.setattr(ecoinvent_modification, "Export", RecordingExport)
+    scenario = {"model": "remind", "pathway": "SSP2-Base", "year": 2030,
+                "database": copy_on_write_database(db)}
+    for fmt in ("matrices", "simapro"):
+        ecoinvent_modification.export_scenario(scenario, fmt, "")
+
+    assert len(RecordingExport.databases) == 2
+    for database in RecordingExport.databases:
+        assert json.dumps(database) == json.dumps(expand_database(db))
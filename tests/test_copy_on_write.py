@@ -0,0 +1,68 @@
+# content of test_copy_on_write.py
+import copy
+from premise.copy_on_write import copy_on_write_database, count_materialized_datasets
+
+
+def get_db():
+    db = [{
+        'code': 'argsthyfujgyftdgr',
+        'name': 'fake activity',
+        'reference product': 'fake product',
+        'location': 'IAI Area, Africa',
+        'unit': 'kilogram',
+        'parameters': {'efficiency': 0.5},
+        'exchanges': [
+            {'name': 'fake activity',
+             'product': 'fake product',
+             'amount': 1,
+             'type': 'production',
+             'unit': 'kilogram',
+             'input': ('dummy_db', '6543541'), },
+        ]
+    },
+    {
+        'code': 'yxcvbnmasdfghjkl',
+        'name': 'other fake activity',
+        'reference product': 'fake product',
+        'location': 'CH',
+        'unit': 'kilogram',
+        'exchanges': [
+            {'name': 'other fake activity',
+             'product': 'fake product',
+             'amount': 1,
+             'type': 'production',
+             'unit': 'kilogram',
+             'input': ('dummy_db', '6543542'), },
+        ]
+    }]
+    return db
+
+
+def test_base_is_not_modified():
+    db = get_db()
+    original = copy.deepcopy(db)
+    scenario = copy_on_write_database(db)
+
+    scenario[0]['exchanges'][0]['amount'] = 2
+    scenario[0]['parameters']['efficiency'] /= 2
+    scenario[1]['location'] = 'DE'
+    dict(scenario[1])['exchanges'].append({})
+    copy.copy(scenario[1])['exchanges'].append({})
+    scenario.append(copy.deepcopy(scenario[1]))
+
+    assert db == original
+    assert scenario[0]['exchanges'][0]['amount'] == 2
+    assert scenario[0]['parameters']['efficiency'] == 0.25
+    assert len(scenario) == 3
+
+
+def test_only_accessed_datasets_are_copied():
+    db = get_db()
+    scenario = copy_on_write_database(db)
+    assert [ds['name'] for ds in scenario if ds['location'] == 'CH'] == ['other fake activity']
+    assert count_materialized_datasets(scenario) == (0, 2)
+
+    assert scenario[1]['exchanges'] == db[1]['exchanges']
+    assert scenario[1]['exchanges'] is not db[1]['exchanges']
+    assert count_materialized_datasets(scenario) == (1, 2)
+    assert scenario == db
@@ -0,0 +1,52 @@
+# content of test_data_collection.py
+import csv
+import numpy as np
+import xarray as xr
+from premise.data_collection import (
+    IAMDataCollection,
+    IAM_ELEC_MARKETS,
+    IAM_ELEC_EFFICIENCIES,
+    IAM_ELEC_EMISSIONS,
+)
+
+
+def get_gains_data():
+    with open(IAM_ELEC_EMISSIONS) as f:
+        sectors = sorted(set(row[2] for row in csv.reader(f, delimiter=";")))
+    sectors += ["CEMENT", "STEEL"]
+    years = list(range(2005, 2055, 5))
+    return xr.DataArray(
+        np.random.rand(2, 2, len(years), len(sectors)),
+        coords={"region": ["EUR", "CHA"], "pollutant": ["NOx", "SO2"], "year": years, "sector": sectors},
+        dims=["region", "pollutant", "year", "sector"],
+    )
+
+
+def write_remind_file(directory):
+    variables = set()
+    for filepath in (IAM_ELEC_MARKETS, IAM_ELEC_EFFICIENCIES):
+        with open(filepath) as f:
+            variables.update(row[2] for row in csv.reader(f, delimiter=";") if row[0] == "remind")
+
+    years = list(range(2005, 2105, 5))
+    with open(directory / "remind_SSP2-Base.mif", "w") as f:
+        f.write(";".join(["Model", "Scenario", "Region", "Variable", "Unit"] + [str(y) for y in years]) + ";\n")
+        for r, region in enumerate(["EUR", "CHA", "World"]):
+            for v, variable in enumerate(sorted(variables)):
+                values = [str(1 + r + v + (y - 2005) / 10) for y in years]
+                f.write(";".join(["REMIND", "SSP2-Base", region, variable, "EJ/yr"] + values) + ";\n")
+
+
+def test_for_years_matches_single_years(tmp_path, monkeypatch):
+    write_remind_file(tmp_path)
+    gains_data = get_gains_data()
+    monkeypatch.setattr(IAMDataCollection, "get_gains_data", staticmethod(lambda: gains_data))
+
+    collections = IAMDataCollection.for_years("remind", "SSP2-Base", [2035, 2020], tmp_path)
+    assert list(collections) == [2020, 2035]
+
+    single = IAMDataCollection("remind", "SSP2-Base", 2035, tmp_path)
+    assert collections[2035].year == 2035
+    assert collections[2035].data is single.data
+    for attr in IAMDataCollection.YEAR_DEPENDENT_ATTRIBUTES:
+        xr.testing.assert_allclose(getattr(collections[2035], attr), getattr(single, attr))
@@ -0,0 +1,120 @@
+# content of test_database_index.py
+import copy
+import pickle
+
+import wurst.searching as ws
+
+from premise.copy_on_write import copy_on_write_database, count_materialized_datasets
+from premise.database_index import IndexedDatabase
+from premise.filters import contains, either, equals
+from premise.synthetic_database import generate_database
+
+
+def get_db():
+    return generate_database(1000)
+
+
+def check_indexes(db):
+    fresh = IndexedDatabase(db)
+    for field, index in db._indexes.items():
+        assert {k: set(v) for k, v in index.items()} == {
+            k: set(v) for k, v in fresh._indexes[field].items()
+        }
+
+
+def test_queries_match_wurst():
+    db = get_db()
+    indexed = IndexedDatabase(db)
+    queries = [
+        [equals("name", "clinker production")],
+        [either(equals("location", "CH"), equals("location", "DE")), equals("unit", "kilowatt hour")],
+        [either(*[equals("name", ds["name"]) for ds in db[:50]]),
+         either(*[equals("location", ds["location"]) for ds in db[:50]])],
+        [contains("name", "electricity"), equals("location", "FR")],
+        [contains("name", "steel")],
+        [equals("name", "does not exist")],
+    ]
+    for funcs in queries:
+        assert indexed.get_many(*funcs) == list(ws.get_many(db, *funcs))
+
+    ds = db[0]
+    assert indexed.get_one(equals("name", ds["name"]), equals("location", ds["location"]),
+                           equals("reference product", ds["reference product"])) is ds
+
+
+def test_indexes_follow_changes():
+    db = IndexedDatabase(get_db())
+    new = copy.deepcopy(db[0])
+    new["location"] = "new location"
+    db.append(new)
+    assert db.get_many(equals("location", "new location")) == [new]
+
+    db.remove(new)
+    assert db.get_many(equals("location", "new location")) == []
+
+    removed = db.remove_datasets(lambda ds: "market" in ds["name"])
+    assert removed and not any("market" in ds["name"] for ds in db)
+    assert db.get_many(contains("name", "market")) == []
+    check_indexes(db)
+
+    db[0]["name"] = "renamed"
+    db.reindex(db[0])
+    assert db.get_many(equals("name", "renamed")) == [db[0]]
+    check_indexes(db)
+
+    del db[:10]
+    db.pop()
+    check_indexes(db)
+
+
+def test_pickle():
+    db = IndexedDatabase(get_db())
+    other = pickle.loads(pickle.dumps(db))
+    assert isinstance(other, IndexedDatabase)
+    assert other == db
+    check_indexes(other)
+
+
+def test_consumers():
+    db = get_db()
+    indexed = IndexedDatabase(copy_on_write_database(db))
+    name = "market for electricity, high voltage"
+    funcs = [equals("name", name), equals("product", "electricity, high voltage")]
+
+    consumers = indexed.get_consumers(*funcs)
+    expected = [
+        (ds["code"], exc["location"])
+        for ds in db
+        for exc in ds["exchanges"]
+        if exc["type"] == "technosphere" and exc["name"] == name
+    ]
+    assert consumers and [(ds["code"], exc["location"]) for ds, exc in consumers] == expected
+    # Only the consumers are copied from the base database
+    assert count_materialized_datasets(indexed)[0] == len({ds["code"] for ds, _ in consumers})
+
+    ds, exc = consumers[0]
+    indexed.relink_exchange(ds, exc, location="new location")
+    assert "input" not in exc
+    assert indexed.get_consumers(equals("name", name), equals("location", "new location")) == [
+        (ds, exc)
+    ]
+    assert len(indexed.get_consumers(*funcs)) == len(consumers)
+
+    indexed.remove_datasets(lambda x: x is ds)
+    assert indexed.get_consumers(equals("name", name), equals("location", "new location")) == []
+
+    new = copy.deepcopy(db[-1])
+    new["exchanges"].append(
+        {"name": "new supplier", "product": "x", "location": "GLO", "unit": "kilogram",
+         "amount": 1, "type": "technosphere"}
+    )
+    indexed.append(new)
+    assert indexed.get_consumers(contains("name", "new supp")) == [(new, new["exchanges"][-1])]
+
+    # Exchanges modified in place are indexed again, without their previous suppliers
+    new["exchanges"][-1]["name"] = "other supplier"
+    indexed.reindex(new)
+    assert indexed.get_consumers(contains("name", "other supp")) == [(new, new["exchanges"][-1])]
+    assert "new supplier" not in indexed._consumers
+    assert indexed.get_many(equals("code", new["code"]))[-1] is new
+    check_indexes(indexed)
@@ -0,0 +1,101 @@
+# content of test_ecoinvent_modification.py
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+import pytest
+from premise.profiling import Profiler
+from premise.ecoinvent_modification import (
+    NewDatabase,
+    UPDATE_ALL_ORDER,
+    check_export,
+    expand_scenarios,
+    run_in_executor,
+    transform_scenario,
+)
+from premise.copy_on_write import copy_on_write_database
+
+
+def get_db():
+    db = [{
+        'code': 'argsthyfujgyftdgr',
+        'name': 'fake activity',
+        'reference product': 'fake product',
+        'location': 'IAI Area, Africa',
+        'unit': 'kilogram',
+        'exchanges': [
+            {'name': 'fake activity',
+             'product': 'fake product',
+             'amount': 1,
+             'type': 'production',
+             'unit': 'kilogram',
+             'input': ('dummy_db', '6543541'), },
+        ]
+    }]
+    return db
+
+
+def test_check_export():
+    assert check_export(None) == []
+    assert check_export("matrices") == ["matrices"]
+    with pytest.raises(ValueError):
+        check_export(["brightway"], supported=["matrices", "simapro"])
+
+
+def test_transform_scenarios_in_worker_processes():
+    db = get_db()
+    scenarios = [
+        {"model": "remind", "pathway": "SSP2-Base", "year": y, "database": copy_on_write_database(db)}
+        for y in (2020, 2030)
+    ]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = run_in_executor(
+            executor, transform_scenario, [(s, "3.7.1", []) for s in scenarios]
+        )
+
+    assert [s["year"] for s in results] == [2020, 2030]
+    assert all(s["database"] == db for s in results)
+
+
+def test_forked_workers_require_export():
+    with pytest.raises(ValueError):
+        NewDatabase.update_all_in_forked_workers(SimpleNamespace(scenarios=[]))
+
+
+def test_expand_scenarios():
+    scenarios = expand_scenarios(
+        [
+            {"model": "remind", "pathway": "SSP2-Base", "years": [2020, 2030]},
+            {"model": "image", "pathway": "SSP2-Base", "year": 2040},
+        ]
+    )
+    assert [(s["model"], s["year"]) for s in scenarios] == [
+        ("remind", 2020), ("remind", 2030), ("image", 2040)
+    ]
+    assert all("years" not in s for s in scenarios)
+
+    with pytest.raises(ValueError):
+        expand_scenarios([{"model": "remind", "year": 2020, "years": [2030]}])
+
+
+def test_stream_releases_each_scenario():
+    ndb = NewDatabase.__new__(NewDatabase)
+    ndb.db = get_db()
+    ndb.version = "3.7.1"
+    ndb.use_checkpoints = False
+    ndb.database_key = None
+    ndb.max_cache_size = 0
+    ndb.profiler = Profiler()
+    ndb.scenarios = [
+        {"model": "remind", "pathway": "SSP2-Base", "year": y,
+         "exclude": UPDATE_ALL_ORDER, "database": None}
+        for y in (2020, 2030)
+    ]
+
+    years = []
+    for scenario in ndb.stream():
+        assert scenario["database"] == ndb.db
+        assert all(s["database"] is None for s in ndb.scenarios if s is not scenario)
+        years.append(scenario["year"])
+
+    assert years == [2020, 2030]
+    assert all(s["database"] is None for s in ndb.scenarios)
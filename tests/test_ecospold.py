@@ -0,0 +1,41 @@
+# content of test_ecospold.py
+import bw2io
+from premise.ecospold import ParallelEcospold2Importer, shard, split_strategies
+from premise.synthetic_database import write_ecospold_files
+
+
+def test_shard():
+    filenames = [str(i) for i in range(10)]
+    shards = shard(filenames, 4)
+    assert [len(s) for s in shards] == [3, 3, 2, 2]
+    assert sum(shards, []) == filenames
+    assert shard(filenames[:2], 4) == [["0"], ["1"]]
+
+
+def test_split_strategies():
+    def normalize_units(data):
+        return data
+
+    def link_internal_technosphere_by_composite_code(data):
+        return data
+
+    def create_composite_code(data):
+        return data
+
+    strategies = [normalize_units, link_internal_technosphere_by_composite_code, create_composite_code]
+    assert split_strategies(strategies) == (strategies[:1], strategies[1:])
+
+
+def test_parallel_extraction(tmp_path):
+    write_ecospold_files(tmp_path, 50, n_exchanges=5)
+
+    serial = bw2io.SingleOutputEcospold2Importer(str(tmp_path), "test", use_mp=False)
+    serial.apply_strategies()
+    parallel = ParallelEcospold2Importer(str(tmp_path), "test", max_workers=2)
+    parallel.apply_strategies()
+
+    assert len(parallel.data) == 50
+    assert parallel.data == serial.data
+    assert all(
+        "input" in exc for ds in parallel.data for exc in ds["exchanges"]
+    )
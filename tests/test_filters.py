@@ -0,0 +1,58 @@
+# content of test_filters.py
+import wurst.searching as ws
+
+from premise.filters import (
+    ContainsAny,
+    In,
+    compile_filter,
+    contains,
+    doesnt_contain_any,
+    either,
+    equals,
+    exclude,
+    filter_rows,
+    startswith,
+)
+from premise.synthetic_database import generate_database
+
+
+def get_db():
+    return generate_database(1000)
+
+
+def test_compile_filter():
+    fltr = compile_filter(
+        either(equals("name", "a"), equals("name", "b"), contains("name", "c"),
+               contains("name", "d"), equals("location", "CH"))
+    )
+    assert isinstance(fltr.funcs[0], In) and fltr.funcs[0].value == {"a", "b"}
+    assert isinstance(fltr.funcs[1], ContainsAny) and fltr.funcs[1].value == ("c", "d")
+    assert fltr.funcs[2].field == "location"
+
+    # Regular expression characters are matched literally
+    fltr = compile_filter(either(contains("name", "a (b)"), contains("name", "c.d")))
+    assert fltr({"name": "x a (b)"}) and not fltr({"name": "cxd"})
+
+
+def test_same_results_as_wurst():
+    db = get_db()
+    names = list({ds["name"] for ds in db})[:30]
+    locations = list({ds["location"] for ds in db})[:10]
+
+    for funcs in (
+        [either(*[equals("name", n) for n in names]),
+         either(*[equals("location", l) for l in locations])],
+        [either(*[contains("name", x) for x in ("electricity", "cement", "steel")]),
+         exclude(equals("unit", "kilowatt hour"))],
+        [doesnt_contain_any("name", ["market", "clinker"]), startswith("location", "C")],
+        [either(startswith("name", "market"), startswith("name", "cement")),
+         either(equals("unit", "kilogram"), contains("reference product", "steel"))],
+    ):
+        expected = list(ws.get_many(db, *funcs))
+        assert expected
+        assert filter_rows(db, *funcs) == expected
+        assert list(ws.get_many(db, *[compile_filter(f) for f in funcs])) == expected
+
+    exchanges = [exc for ds in db for exc in ds["exchanges"]]
+    fltr = either(*[contains("name", x) for x in ("Carbon dioxide", "Sulfur dioxide")])
+    assert filter_rows(exchanges, fltr) == list(ws.get_many(exchanges, fltr))
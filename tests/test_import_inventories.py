@@ -2,8 +2,9 @@
 import pytest
 from premise.inventory_imports import \
     BaseInventoryImport, CarmaCCSInventory,\
-    BiofuelInventory, CarculatorInventory
+    BiofuelInventory, CarculatorInventory, InventoryMerger, load_inventories
 from pathlib import Path
+from bw2io.importers.base_lci import LCIImporter
 from premise import INVENTORY_DIR, DATA_DIR
 
 
@@ -81,6 +82,80 @@ def test_biosphere_dict_2():
 
     testpath.unlink()
 
+def test_add_biosphere_links():
+    db, version = get_db()
+    inventory = LCIImporter('test')
+    inventory.data = [{
+        'name': 'fake activity',
+        'exchanges': [
+            {'name': '1,4-Butanediol',
+             'categories': 'air::urban air close to ground',
+             'unit': 'kilogram',
+             'amount': 1,
+             'type': 'biosphere'},
+            {'name': 'Unknown flow',
+             'categories': ('air',),
+             'unit': 'kilogram',
+             'amount': 1,
+             'type': 'biosphere'},
+        ]
+    }]
+    dbc = BaseInventoryImport(db, version, Path("."), import_db=inventory, is_migrated=False)
+    with pytest.raises(KeyError):
+        dbc.add_biosphere_links()
+
+    dbc.add_biosphere_links(delete_missing=True)
+    assert dbc.import_db.data[0]['exchanges'] == [
+        {'name': '1,4-Butanediol',
+         'categories': ('air', 'urban air close to ground'),
+         'unit': 'kilogram',
+         'amount': 1,
+         'type': 'biosphere',
+         'input': ('biosphere3', '38a622c6-f086-4763-a952-7c6b3b1c42ba')},
+    ]
+
+
+def test_add_product_field_to_exchanges():
+    db, version = get_db()
+    inventory = LCIImporter('test')
+    inventory.data = [{
+        'name': 'fake activity',
+        'reference product': 'imported product',
+        'location': 'IAI Area, Africa',
+        'unit': 'kilogram',
+        'code': 'imported',
+        'exchanges': [
+            {'name': 'fake activity',
+             'location': 'IAI Area, Africa',
+             'unit': 'kilogram',
+             'amount': 1,
+             'type': 'technosphere'},
+        ]
+    }]
+    dbc = BaseInventoryImport(db, version, Path("."), import_db=inventory)
+    exc = {'name': 'fake activity', 'location': 'IAI Area, Africa', 'unit': 'kilogram',
+           'amount': 1, 'type': 'technosphere'}
+
+    # The imported datasets are searched before the database
+    dbc.add_product_field_to_exchanges()
+    assert inventory.data[0]['exchanges'][0]['product'] == 'imported product'
+    assert dbc.correct_product_field(exc) == 'imported product'
+    inventory.data[0]['name'] = 'other activity'
+    assert dbc.correct_product_field(exc) == 'fake product'
+
+    # All the exchanges without supplier are reported at once
+    inventory.data[0]['exchanges'] = [
+        {'name': 'missing', 'location': 'GLO', 'unit': 'kilogram',
+         'amount': 1, 'type': 'technosphere'},
+        {'name': 'also missing', 'location': 'CH', 'unit': 'kilogram',
+         'amount': 1, 'type': 'technosphere'},
+    ]
+    with pytest.raises(IndexError) as wrapped_error:
+        dbc.add_product_field_to_exchanges()
+    assert 'also missing' in str(wrapped_error.value)
+    assert str(wrapped_error.value).startswith('2 inventory exchanges in test')
+
+
 def test_load_carma():
     db, version = get_db()
     carma = CarmaCCSInventory(db, version, FILEPATH_CARMA_INVENTORIES)
@@ -93,6 +168,59 @@ def test_load_biofuel():
     assert len(bio.import_db.data) == 36
 
 
+def test_load_inventories():
+    db, version = get_db()
+    inventories = [
+        (CarmaCCSInventory, FILEPATH_CARMA_INVENTORIES),
+        (BiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES),
+    ]
+    loaded = load_inventories(inventories, version, max_workers=2)
+    assert [len(import_db.data) for import_db, _ in loaded] == [148, 36]
+
+    # The inventories are loaded, but not migrated
+    carma = CarmaCCSInventory(db, version, FILEPATH_CARMA_INVENTORIES)
+    assert loaded[0][0].data == carma.import_db.data
+    carma = CarmaCCSInventory(db, version, FILEPATH_CARMA_INVENTORIES, import_db=loaded[0][0], is_migrated=False)
+    assert not carma.is_migrated
+
+
+def test_load_inventories_serial_by_default(monkeypatch):
+    db, version = get_db()
+    # No pool of processes is started unless `max_workers` is greater than 1
+    monkeypatch.setattr("premise.inventory_imports.ProcessPoolExecutor", None)
+    loaded = load_inventories([(BiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES)] * 2, version)
+    assert [len(import_db.data) for import_db, _ in loaded] == [36, 36]
+
+
+def test_inventory_merger():
+    db, version = get_db()
+    merger = InventoryMerger(db)
+    datasets = [
+        {'code': 'argsthyfujgyftdgr', 'name': 'a', 'reference product': 'b', 'location': 'GLO'},
+        {'code': 'new', 'name': 'fake activity', 'reference product': 'fake product', 'location': 'IAI Area, Africa'},
+        {'code': 'other', 'name': 'new activity', 'reference product': 'new product', 'location': 'GLO'},
+    ]
+    assert merger.remove_duplicates(datasets, 'first.xlsx') == datasets[2:]
+    assert [ds[3] for ds in merger.duplicates] == ['first.xlsx', 'first.xlsx']
+
+    # The index is updated as the inventories are merged
+    merger.add(datasets[2:])
+    assert merger.remove_duplicates(datasets[2:], 'second.xlsx') == []
+    assert merger.duplicates[-1] == ('new activity', 'new product', 'GLO', 'second.xlsx')
+
+
+def test_inventory_merger_reports_duplicates_once():
+    db, version = get_db()
+    merger = InventoryMerger(db)
+    existing = db[0]
+    # Same code and same (name, reference product, location) as a dataset of the database
+    datasets = [dict(existing)]
+    assert merger.remove_duplicates(datasets, 'first.xlsx') == []
+    assert merger.duplicates == [
+        (existing['name'], existing['reference product'], existing['location'], 'first.xlsx')
+    ]
+
+
 def test_load_carculator():
     db, version = get_db()
     carc = CarculatorInventory(
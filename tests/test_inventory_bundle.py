@@ -0,0 +1,70 @@
+# content of test_inventory_bundle.py
+from premise import INVENTORY_DIR
+from premise import inventory_bundle
+from premise.inventory_bundle import build_inventory_bundle, load_inventory_bundle, read_bundle
+from premise.inventory_imports import BiofuelInventory, CarmaCCSInventory
+
+FILEPATH_CARMA_INVENTORIES = INVENTORY_DIR / "lci-Carma-CCS.xlsx"
+FILEPATH_BIOFUEL_INVENTORIES = INVENTORY_DIR / "lci-biofuels.xlsx"
+
+
+class CountingBiofuelInventory(BiofuelInventory):
+    count = 0
+
+    def load_inventory(self, path):
+        CountingBiofuelInventory.count += 1
+        return super().load_inventory(path)
+
+
+def test_bundle(tmp_path):
+    # The files are loaded in this process, where the loads are counted
+    inventories = [
+        (CarmaCCSInventory, FILEPATH_CARMA_INVENTORIES),
+        (CountingBiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES),
+    ]
+    bundle = load_inventory_bundle(inventories, "3.7.1", tmp_path, max_workers=1)
+    assert CountingBiofuelInventory.count == 1
+
+    carma = CarmaCCSInventory([], "3.7.1", FILEPATH_CARMA_INVENTORIES)
+    carma.migrate_inventory()
+    assert bundle["lci-Carma-CCS.xlsx"].data == carma.import_db.data
+
+    # Inventories whose file did not change are not loaded again
+    assert load_inventory_bundle(inventories, "3.7.1", tmp_path, max_workers=1)["lci-biofuels.xlsx"].data == \
+        bundle["lci-biofuels.xlsx"].data
+    assert CountingBiofuelInventory.count == 1
+
+    entries = read_bundle("3.7.1", tmp_path)
+    entries["lci-biofuels.xlsx"]["hash"] = "changed"
+    build_inventory_bundle(inventories, "3.7.1", tmp_path, entries, max_workers=1)
+    assert CountingBiofuelInventory.count == 2
+    assert read_bundle("3.6", tmp_path) == {}
+
+    # Inventories read from the bundle are not migrated again
+    biofuel = BiofuelInventory([], "3.7.1", FILEPATH_BIOFUEL_INVENTORIES, import_db=bundle["lci-biofuels.xlsx"])
+    assert biofuel.is_migrated
+
+
+def test_bundle_depends_on_biosphere_migrations_and_code(tmp_path, monkeypatch):
+    inventories = [(BiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES)]
+    load_inventory_bundle(inventories, "3.7.1", tmp_path, max_workers=1)
+    assert read_bundle("3.7.1", tmp_path)
+
+    # Bundles migrated with other tables are not read
+    monkeypatch.setattr(inventory_bundle, "MIGRATION_MAPS", ({"changed": []},))
+    assert read_bundle("3.7.1", tmp_path) == {}
+    monkeypatch.undo()
+    assert read_bundle("3.7.1", tmp_path)
+
+    # Nor bundles linked with other biosphere flows
+    flows = tmp_path / "dict_biosphere.txt"
+    flows.write_text("flow;air;unspecified;kilogram;code\n")
+    monkeypatch.setattr(inventory_bundle, "FILEPATH_BIOSPHERE_FLOWS", flows)
+    assert read_bundle("3.7.1", tmp_path) == {}
+    monkeypatch.undo()
+
+    # Nor bundles loaded by another version of the importers
+    importer = tmp_path / "inventory_imports.py"
+    importer.write_text("# changed")
+    monkeypatch.setattr(inventory_bundle, "DEPENDENCIES", [importer])
+    assert read_bundle("3.7.1", tmp_path) == {}
@@ -0,0 +1,71 @@
+# content of test_profiling.py
+import csv
+import json
+from premise.copy_on_write import copy_on_write_database
+from premise.profiling import PROFILE_FIELDS, Profiler, write_profile
+from premise.scheduler import Stage, StageScheduler
+
+
+def get_db():
+    db = [
+        {
+            "name": "fake activity {}".format(i),
+            "location": "GLO",
+            "exchanges": [{"name": "fake activity {}".format(i), "amount": 1, "type": "production"}],
+        }
+        for i in range(3)
+    ]
+    return db
+
+
+def add_dataset(scenario, version):
+    scenario["database"].append({"name": "new activity", "location": "GLO", "exchanges": []})
+    return scenario
+
+
+def scale_first_dataset(scenario, version):
+    for ds in scenario["database"][:2]:
+        for exc in ds["exchanges"]:
+            # reads the exchanges of two datasets, modifies one
+            if ds["name"] == "fake activity 0":
+                exc["amount"] *= 2
+    return scenario
+
+
+def test_stages_are_recorded(tmp_path):
+    stages = [
+        Stage("add", add_dataset, adds=["a"]),
+        Stage("scale", scale_first_dataset, writes=["b"]),
+    ]
+    profiler = Profiler(detailed=True, cprofile=True, directory=tmp_path)
+    base = get_db()
+    scenario = {
+        "model": "remind",
+        "pathway": "SSP2-Base",
+        "year": 2030,
+        "database": copy_on_write_database(base),
+    }
+    scenario = StageScheduler(stages, profiler=profiler).run(scenario, "3.7.1", ["add", "scale"])
+
+    add, scale = scenario["profile"]
+    assert (add["stage"], add["year"]) == ("add", 2030)
+    assert (add["datasets added"], add["datasets removed"], add["datasets modified"]) == (1, 0, 0)
+    assert (scale["datasets added"], scale["datasets modified"], scale["exchanges scanned"]) == (0, 1, 2)
+    assert scale["wall time (s)"] >= 0
+    assert len(list(tmp_path.glob("*.prof"))) == 2
+
+    assert scenario["database"][0]["exchanges"][0]["amount"] == 2
+    assert base[0]["exchanges"][0]["amount"] == 1
+
+    with profiler.measure("import", get_db=lambda: base):
+        base.append({"name": "imported activity"})
+    assert profiler.get_records([scenario])[0]["datasets added"] == 1
+
+    records = profiler.get_records([scenario])
+    with open(write_profile(records, "csv", tmp_path / "profile.csv")) as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    assert list(rows[0]) == PROFILE_FIELDS
+    assert [r["stage"] for r in rows] == ["import", "add", "scale"]
+
+    with open(write_profile(records, "json", tmp_path / "profile.json")) as f:
+        assert json.load(f) == records
@@ -0,0 +1,68 @@
+# content of test_scheduler.py
+from premise.ecoinvent_modification import STAGES, UPDATE_ALL_ORDER
+from premise.scheduler import Stage, StageScheduler
+
+
+def get_db():
+    db = [
+        {"name": "fake activity {}".format(i), "location": "GLO", "exchanges": []}
+        for i in range(3)
+    ]
+    return db
+
+
+def add_dataset(scenario, version):
+    scenario["database"].append({"name": "new activity", "location": "GLO", "exchanges": []})
+    return scenario
+
+
+def remove_first_dataset(scenario, version):
+    scenario["database"] = scenario["database"][1:]
+    return scenario
+
+
+def test_plan_update_all():
+    waves = StageScheduler(STAGES).plan(UPDATE_ALL_ORDER)
+    assert [[s.name for s in wave] for wave in waves] == [
+        ["update_cars", "update_trucks", "update_solar_PV"],
+        ["update_electricity"],
+        ["update_cement"],
+        ["update_steel"],
+    ]
+
+
+def test_independent_stages():
+    stages = [
+        Stage("add", add_dataset, adds=["a"]),
+        Stage("remove", remove_first_dataset, writes=["b"]),
+    ]
+    scheduler = StageScheduler(stages)
+    assert len(scheduler.plan(["add", "remove"])) == 1
+
+    db = get_db()
+    scenario = scheduler.run({"database": db}, "3.7.1", ["add", "remove"])
+    assert [ds["name"] for ds in scenario["database"]] == [
+        "fake activity 1",
+        "fake activity 2",
+        "new activity",
+    ]
+
+
+def test_up_to_date_stages_are_skipped():
+    stages = [
+        Stage("add", add_dataset, reads=["a"], adds=["a"]),
+        Stage("remove", remove_first_dataset, writes=["b"]),
+        Stage("touch", lambda scenario, version: scenario, writes=["a"]),
+    ]
+    scheduler = StageScheduler(stages, skip_up_to_date=True)
+    scenario = scheduler.run({"database": get_db()}, "3.7.1", ["add"])
+    scenario = scheduler.run(scenario, "3.7.1", ["remove", "add"])
+    assert len(scenario["database"]) == 3
+
+    # "add" runs again once one of its inputs has changed
+    scenario = scheduler.run(scenario, "3.7.1", ["touch", "add"])
+    assert len(scenario["database"]) == 4
+
+    # By default, stages are applied every time they are requested
+    scenario = StageScheduler(stages).run(scenario, "3.7.1", ["add"])
+    assert len(scenario["database"]) == 5
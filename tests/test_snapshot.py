@@ -0,0 +1,62 @@
+# content of test_snapshot.py
+import pickle
+
+import numpy as np
+import pytest
+from premise.snapshot import SNAPSHOT_VERSION, open_snapshot, write_snapshot
+from premise.synthetic_database import generate_database
+
+
+def get_db():
+    db = generate_database(200)
+    # Values that do not fit in the arrays of the snapshot
+    exchanges = db[0]["exchanges"]
+    exchanges[0]["amount"] = 1
+    exchanges[0]["location"] = None
+    exchanges[1]["uncertainty type"] = np.int64(2)
+    exchanges[1]["input"] = ("ecoinvent", 5)
+    exchanges[1]["comment"] = "é ✓"
+    return db
+
+
+def test_snapshot_is_read_lazily(tmp_path):
+    db = get_db()
+    filepath = write_snapshot(db, tmp_path / "db.snapshot")
+
+    snapshot = open_snapshot(filepath)
+    assert len(snapshot) == len(db)
+    assert snapshot.count_loaded_datasets() == 0
+    assert snapshot[-1] == db[-1]
+    assert snapshot[-1] is snapshot[len(db) - 1]
+    assert snapshot.count_loaded_datasets() == 1
+
+    assert list(snapshot) == db
+    assert type(snapshot[0]["exchanges"][0]["amount"]) is int
+    assert list(pickle.loads(pickle.dumps(snapshot))) == db
+
+
+def test_pickled_snapshot_keeps_the_built_datasets(tmp_path):
+    db = get_db()
+    snapshot = open_snapshot(write_snapshot(db, tmp_path / "db.snapshot"))
+    snapshot[3]["name"] = "modified"
+    snapshot[5]["exchanges"].pop()
+
+    other = pickle.loads(pickle.dumps(snapshot))
+    # Only the datasets built before pickling are sent, the others are read from the file
+    assert other.count_loaded_datasets() == 2
+    assert other[3]["name"] == "modified"
+    assert len(other[5]["exchanges"]) == len(db[5]["exchanges"]) - 1
+    assert other[4] == db[4]
+
+
+def test_snapshot_version(tmp_path):
+    filepath = write_snapshot(get_db(), tmp_path / "db.snapshot")
+    data = bytearray(filepath.read_bytes())
+    data[16:24] = (SNAPSHOT_VERSION + 1).to_bytes(8, "little")
+    filepath.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        open_snapshot(filepath)
+
+    filepath.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        open_snapshot(filepath)
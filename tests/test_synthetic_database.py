@@ -0,0 +1,38 @@
+# content of test_synthetic_database.py
+from premise.data_collection import read_iam_file
+from premise.synthetic_database import generate_database, write_iam_file
+
+
+def test_generated_database_is_consistent():
+    db = generate_database(1000)
+    assert len(db) == 1000
+    assert db == generate_database(1000)
+
+    codes = {ds["code"] for ds in db}
+    assert len(codes) == len(db)
+
+    for ds in db:
+        production = [exc for exc in ds["exchanges"] if exc["type"] == "production"]
+        assert len(production) == 1
+        for exc in ds["exchanges"]:
+            if exc["type"] == "technosphere":
+                assert exc["input"][1] in codes
+            elif exc["type"] == "biosphere":
+                assert exc["input"][0] == "biosphere3"
+
+    names = {ds["name"] for ds in db}
+    for name in (
+        "market for electricity, high voltage",
+        "market group for electricity, low voltage",
+        "clinker production",
+        "cement production, Portland",
+        "steel production, converter, low-alloyed",
+    ):
+        assert name in names
+
+
+def test_iam_file_is_readable(tmp_path):
+    data = read_iam_file("remind", write_iam_file(tmp_path))
+    assert "World" in data.region.values
+    assert "Production|Industry|Steel" in data.variables.values
+    assert 2030 in data.year.values